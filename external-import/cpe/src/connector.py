@@ -1,4 +1,3 @@
-import math
 import os
 import sys
 import time
@@ -15,6 +14,36 @@ from urllib3.util import Retry
 
 APP_VERSION = "1.0.0"
 
+# NIST NVD API rate limits, in requests per rolling 30 seconds window
+RATE_LIMIT_WINDOW = 30
+RATE_LIMIT_WITH_API_KEY = 50
+RATE_LIMIT_WITHOUT_API_KEY = 5
+
+
+class RateLimiter:
+    """
+    Token bucket of capacity 1 spreading the requests evenly over the NIST NVD
+    API rate limit window
+    """
+
+    def __init__(self, limit: int, window: int):
+        """
+        Args:
+            limit (int): The number of requests allowed per window
+            window (int): The window in seconds
+        """
+        self.interval = window / limit
+        self.next_request = time.monotonic()
+
+    def wait(self) -> None:
+        """
+        Blocks until a new request is allowed
+        """
+        now = time.monotonic()
+        if self.next_request > now:
+            time.sleep(self.next_request - now)
+        self.next_request = max(now, self.next_request) + self.interval
+
 
 class CPEConnector:
     def __init__(self):
@@ -56,6 +85,27 @@ class CPEConnector:
             "NIST_API_KEY", ["cpe", "api_key"], config, False
         )
 
+        # Requests allowed per 30 seconds, depending on whether an API key is used
+        self.rate_limit = get_config_variable(
+            "CPE_RATE_LIMIT", ["cpe", "rate_limit"], config, True
+        ) or (RATE_LIMIT_WITH_API_KEY if self.api_key else RATE_LIMIT_WITHOUT_API_KEY)
+        self.rate_limiter = RateLimiter(self.rate_limit, RATE_LIMIT_WINDOW)
+
+        self.session = requests.Session()
+        self.session.headers.update(
+            {
+                "apiKey": self.api_key,
+                "User-Agent": f"OpenCTI-cpe-connector/{APP_VERSION}",
+            }
+        )
+        retry_strategy = Retry(
+            total=4,  # Maximum number of retries
+            backoff_factor=6,  # Exponential backoff factor (e.g., 2 means 1, 2, 4, 8 seconds, ...)
+            status_forcelist=[429, 500, 502, 503, 504],  # HTTP status codes to retry on
+        )
+        adapter = HTTPAdapter(max_retries=retry_strategy)
+        self.session.mount("https://", adapter)
+
     def _get_interval(self) -> int:
         """
         Returns the interval to use for the connector
@@ -84,92 +134,25 @@ class CPEConnector:
                 f"Error when converting CONNECTOR_RUN_EVERY environment variable: '{self.interval}'. {str(e)}"
             )
 
-    def _get_request_params(self, api_url) -> dict:
-        """
-        Collects the request parameters from the NIST API
-
-        Args:
-            api_url (str): The URL to use to collect the request parameters
-
-        Returns:
-            dict: The request parameters
-        """
-
-        self.helper.log_info("Retrieving the API request parameters...")
-
-        session = requests.Session()
-
-        headers = {
-            "api_key": self.api_key,
-            "User-Agent": f"OpenCTI-cpe-connector/{APP_VERSION}",
-        }
-
-        retry_strategy = Retry(
-            total=4,  # Maximum number of retries
-            backoff_factor=6,  # Exponential backoff factor (e.g., 2 means 1, 2, 4, 8 seconds, ...)
-            status_forcelist=[429, 500, 502, 503, 504],  # HTTP status codes to retry on
-        )
-
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("https://", adapter)
-
-        # Make the HTTP request to the NIST CPE API URL
-        response = session.get(str(api_url), headers=headers)
-
-        parameters = {}
-
-        if response.status_code == 200:
-            resultsPerPage = response.json().get("resultsPerPage")
-            startIndex = response.json().get("startIndex")
-            totalResults = response.json().get("totalResults")
-
-            parameters = dict(
-                resultsPerPage=resultsPerPage,
-                startIndex=startIndex,
-                totalResults=totalResults,
-            )
-
-            self.helper.log_info("API request parameters retrieved!")
-
-            return parameters
-        else:
-            self.helper.log_error(
-                f"Error retrieving the API request parameters from the NIST API: {response.status_code}"
-            )
-            return parameters
-
-    def _get_cpe_list(self, api_url) -> list:
+    def _get_cpe_list(self, api_url) -> dict:
         """
-        Collects the CPE list from the NIST API
+        Collects a page of the CPE list from the NIST API
 
         Args:
             api_url (str): The URL to use to collect the CPE list
 
         Returns:
-            list: The CPE list
+            dict: The page of the CPE list
         """
 
         # Get the CPE list from the NIST API
         self.helper.log_debug(api_url)
 
-        session = requests.Session()
-
-        headers = {
-            "api_key": self.api_key,
-            "User-Agent": f"OpenCTI-cpe-connector/{APP_VERSION}",
-        }
-
-        retry_strategy = Retry(
-            total=4,  # Maximum number of retries
-            backoff_factor=6,  # Exponential backoff factor (e.g., 2 means 1, 2, 4, 8 seconds, ...)
-            status_forcelist=[429, 500, 502, 503, 504],  # HTTP status codes to retry on
-        )
-
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("https://", adapter)
+        # Wait for the NIST NVD API rate limit to allow a new request
+        self.rate_limiter.wait()
 
         # Make the HTTP request to the NIST CPE API URL
-        response = session.get(api_url, headers=headers)
+        response = self.session.get(api_url)
 
         # Process the response
         if response.status_code == 200:
@@ -178,10 +161,9 @@ class CPEConnector:
             )
             return response.json()
         else:
-            self.helper.log_error(
+            raise ValueError(
                 f"Error retrieving the CPE list from the NIST API: {response.status_code}"
             )
-            return []
 
     def _get_date_iso(self, timestamp: int) -> str:
         """
@@ -347,48 +329,104 @@ class CPEConnector:
 
         return cpe_title
 
-    def _import_all(self, work_id) -> None:
+    def _get_progress(self) -> dict:
         """
-        Imports all the CPEs from the NIST API
+        Returns the progress of the import interrupted during a previous run
 
-        Args:
-            work_id (str): The work ID to use
+        Returns:
+            dict: The progress stored in state, None if there is none
         """
+        current_state = self.helper.get_state()
+        if current_state is None:
+            return None
+        return current_state.get("import_progress")
 
-        self.helper.log_info(
-            f"{self.helper.connect_name} connector is starting the collection of all CPEs..."
-        )
+    def _set_progress(self, start_index: int, start_date, end_date) -> None:
+        """
+        Stores the progress of the current import in state
 
-        api_url = self._get_api_url(0, None, None)
-        parameters = self._get_request_params(api_url)
+        Args:
+            start_index (int): The index of the next page to import
+            start_date (str): The start date of the import, None to import all
+            end_date (str): The end date of the import, None to import all
+        """
+        current_state = self.helper.get_state() or {}
+        current_state["import_progress"] = {
+            "start_index": start_index,
+            "last_mod_start_date": start_date,
+            "last_mod_end_date": end_date,
+        }
+        self.helper.set_state(current_state)
 
-        if parameters["totalResults"] == 0:
-            self.helper.log_info("No CPEs to import!")
-            return
+    def _import_pages(self, work_id, start_date, end_date, start_index=0) -> None:
+        """
+        Imports the CPEs from the NIST API page by page, sending a bundle and
+        checkpointing the next startIndex in state for each page
 
-        total_request = math.ceil(
-            parameters["totalResults"] / parameters["resultsPerPage"]
-        )
-        stix_objects = []
+        Args:
+            work_id (str): The work ID to use
+            start_date (str): The start date to use, None to import all
+            end_date (str): The end date to use, None to import all
+            start_index (int): The index to start from
+        """
+        while True:
+            api_url = self._get_api_url(start_index, start_date, end_date)
+            json_objects = self._get_cpe_list(api_url)
 
-        for i in range(total_request):
-            api_url = self._get_api_url(i * parameters["resultsPerPage"], None, None)
+            if json_objects["totalResults"] == 0:
+                self.helper.log_info("No CPEs to import!")
+                return
 
-            json_objects = self._get_cpe_list(api_url)
             stix_objects = self._json_to_stix(json_objects)
 
-            bundle = stix2.Bundle(objects=stix_objects, allow_custom=True).serialize()
+            if len(stix_objects) > 0:
+                bundle = stix2.Bundle(
+                    objects=stix_objects, allow_custom=True
+                ).serialize()
+
+                self.helper.log_info(
+                    f"Sending {len(stix_objects)} STIX objects to OpenCTI..."
+                )
+                self.helper.send_stix2_bundle(
+                    bundle,
+                    update=False,
+                    work_id=work_id,
+                )
 
+            start_index += json_objects["resultsPerPage"]
+            self._set_progress(start_index, start_date, end_date)
             self.helper.log_info(
-                f"Sending {len(stix_objects)} STIX objects to OpenCTI..."
+                f"{min(start_index, json_objects['totalResults'])} of "
+                f"{json_objects['totalResults']} CPEs processed"
             )
-            self.helper.send_stix2_bundle(
-                bundle,
-                update=False,
-                work_id=work_id,
+
+            if (
+                json_objects["resultsPerPage"] == 0
+                or start_index >= json_objects["totalResults"]
+            ):
+                return
+
+    def _import_all(self, work_id) -> None:
+        """
+        Imports all the CPEs from the NIST API
+
+        Args:
+            work_id (str): The work ID to use
+        """
+
+        self.helper.log_info(
+            f"{self.helper.connect_name} connector is starting the collection of all CPEs..."
+        )
+
+        start_index = 0
+        progress = self._get_progress()
+        if progress is not None and progress["last_mod_start_date"] is None:
+            start_index = progress["start_index"]
+            self.helper.log_info(
+                f"{self.helper.connect_name} connector is resuming the collection of all CPEs at index {start_index}"
             )
 
-            time.sleep(6)  # Sleep for 6 seconds as recommanded by NIST NVD API
+        self._import_pages(work_id, None, None, start_index)
 
     def _import_date(self, work_id) -> None:
         """
@@ -405,38 +443,21 @@ class CPEConnector:
         last_run_date = self._get_date_iso(self.last_run)
         current_date = self._get_date_iso(self.current_run)
 
-        api_url = self._get_api_url(0, last_run_date, current_date)
-        parameters = self._get_request_params(api_url)
-
-        if parameters["totalResults"] == 0:
-            self.helper.log_info("No CPEs to import!")
-            return
-
-        total_request = math.ceil(
-            parameters["totalResults"] / parameters["resultsPerPage"]
-        )
-        stix_objects = []
-
-        for i in range(total_request):
-            api_url = self._get_api_url(
-                i * parameters["resultsPerPage"], last_run_date, current_date
-            )
-
-            json_objects = self._get_cpe_list(api_url)
-            stix_objects = self._json_to_stix(json_objects)
-
-            bundle = stix2.Bundle(objects=stix_objects, allow_custom=True).serialize()
-
+        progress = self._get_progress()
+        if progress is not None and progress["last_mod_start_date"] == last_run_date:
+            # Finish the interrupted import with the same query, for the page indexes to match
             self.helper.log_info(
-                f"Sending {len(stix_objects)} STIX objects to OpenCTI..."
+                f"{self.helper.connect_name} connector is resuming the collection of CPEs at index {progress['start_index']}"
             )
-            self.helper.send_stix2_bundle(
-                bundle,
-                update=False,
-                work_id=work_id,
+            self._import_pages(
+                work_id,
+                last_run_date,
+                progress["last_mod_end_date"],
+                progress["start_index"],
             )
+            last_run_date = progress["last_mod_end_date"]
 
-            time.sleep(6)  # Sleep for 6 seconds as recommanded by NIST NVD API
+        self._import_pages(work_id, last_run_date, current_date)
 
     def run(self) -> None:
         """
@@ -492,8 +513,11 @@ class CPEConnector:
                     try:
                         self._import_all(work_id)
                     except Exception as e:
-                        # self.helper.log_error(str(e)) message originel
-                        self.helper.log_debug(str(e))
+                        # Keep last_run and the checkpoint, the import resumes on next run
+                        self.helper.api.work.to_processed(
+                            work_id, str(e), in_error=True
+                        )
+                        raise
 
                     # Store the current timestamp as a last run
                     message = (
@@ -508,6 +532,7 @@ class CPEConnector:
                     current_state = self.helper.get_state()
                     if current_state:
                         current_state["last_run"] = self.current_run
+                        current_state.pop("import_progress", None)
                     else:
                         current_state = {"last_run": self.current_run}
                     self.helper.set_state(current_state)
@@ -537,8 +562,11 @@ class CPEConnector:
                         try:
                             self._import_date(work_id)
                         except Exception as e:
-                            # self.helper.log_error(str(e)) message originel
-                            self.helper.log_debug(str(e))
+                            # Keep last_run and the checkpoint, the import resumes on next run
+                            self.helper.api.work.to_processed(
+                                work_id, str(e), in_error=True
+                            )
+                            raise
 
                         # Store the current timestamp as a last run
                         message = (
@@ -553,6 +581,7 @@ class CPEConnector:
                         current_state = self.helper.get_state()
                         if current_state:
                             current_state["last_run"] = self.current_run
+                            current_state.pop("import_progress", None)
                         else:
                             current_state = {"last_run": self.current_run}
                         self.helper.set_state(current_state)
@@ -17,6 +17,7 @@ class CVEConnector:
         self.config = ConfigCVE()
         self.helper = OpenCTIConnectorHelper(self.config.load)
         self.converter = CVEConverter(self.helper)
+        self.history_progress = None
 
     def run(self) -> None:
         """
@@ -87,6 +88,7 @@ class CVEConnector:
         date_range = timedelta(days=self.config.max_date_range)
         start_date = now - date_range
 
+        self.converter.sync_mirror(start_date, now)
         cve_params = self._update_cve_params(start_date, now)
 
         self.converter.send_bundle(cve_params, work_id)
@@ -100,6 +102,8 @@ class CVEConnector:
         :param end_date: End date in datetime
         :param work_id: Work id in string
         """
+        self.converter.sync_mirror(start_date, end_date)
+
         years = range(start_date.year, end_date.year + 1)
         start, end = start_date, end_date + timedelta(1)
 
@@ -135,41 +139,76 @@ class CVEConnector:
                     end_date_current_year = start_date_current_year + timedelta(
                         days=days_in_year
                     )
-                    # Update date range
-                    cve_params = self._update_cve_params(
-                        start_date_current_year, end_date_current_year
+                    self._send_history_window(
+                        start_date_current_year, end_date_current_year, work_id
                     )
-
-                    self.converter.send_bundle(cve_params, work_id)
                     days_in_year = 0
 
-                """
-                Retrieving for each year MAX_AUTHORIZED = 120 days
-                1 year % 120 days => 5 or 6 (depends if it is a leap year or not)
-                """
-                if days_in_year > 6:
-                    # Update date range
-                    cve_params = self._update_cve_params(
-                        start_date_current_year, end_date_current_year
+                # Retrieving for each year MAX_AUTHORIZED = 120 days
+                # 1 year % 120 days => 5 or 6 (depends if it is a leap year or not)
+                elif days_in_year > 6:
+                    self._send_history_window(
+                        start_date_current_year, end_date_current_year, work_id
                     )
-
-                    self.converter.send_bundle(cve_params, work_id)
                     start_date_current_year += timedelta(days=MAX_AUTHORIZED)
                     days_in_year -= MAX_AUTHORIZED
                 else:
                     end_date_current_year = start_date_current_year + timedelta(
                         days=days_in_year
                     )
-                    # Update date range
-                    cve_params = self._update_cve_params(
-                        start_date_current_year, end_date_current_year
+                    self._send_history_window(
+                        start_date_current_year, end_date_current_year, work_id
                     )
-                    self.converter.send_bundle(cve_params, work_id)
                     days_in_year = 0
 
             info_msg = f"[CONNECTOR] Importing CVE history for year {year} finished"
             self.helper.log_info(info_msg)
 
+    def _send_history_window(
+        self, start_date: datetime, end_date: datetime, work_id: str
+    ) -> None:
+        """
+        Import CVEs of a history window, checkpointing the progress after each page
+        Resume from the last checkpoint if the previous run stopped within the window
+        :param start_date: Start date in datetime
+        :param end_date: End date in datetime
+        :param work_id: Work id in string
+        """
+        # Update date range
+        cve_params = self._update_cve_params(start_date, end_date)
+
+        progress = self.history_progress
+        if progress is not None:
+            progress_start_date = datetime.fromisoformat(progress["lastModStartDate"])
+            if start_date < progress_start_date:
+                info_msg = (
+                    f"[CONNECTOR] CVE history from {cve_params['lastModStartDate']} "
+                    "already imported, skipping"
+                )
+                self.helper.log_info(info_msg)
+                return
+            if start_date == progress_start_date:
+                # Replay the exact same query for the page indexes to match
+                cve_params["lastModEndDate"] = progress["lastModEndDate"]
+                cve_params["startIndex"] = progress["startIndex"]
+                info_msg = (
+                    f"[CONNECTOR] Resuming CVE history from {cve_params['lastModStartDate']} "
+                    f"at index {progress['startIndex']}"
+                )
+                self.helper.log_info(info_msg)
+            self.history_progress = None
+
+        def checkpoint(start_index: int) -> None:
+            current_state = self.helper.get_state() or {}
+            current_state["history_progress"] = {
+                "lastModStartDate": cve_params["lastModStartDate"],
+                "lastModEndDate": cve_params["lastModEndDate"],
+                "startIndex": start_index,
+            }
+            self.helper.set_state(current_state)
+
+        self.converter.send_bundle(cve_params, work_id, checkpoint)
+
     def _maintain_data(self, now: datetime, last_run: float, work_id: str) -> None:
         """
         Maintain data updated if maintain_data config is True
@@ -180,6 +219,7 @@ class CVEConnector:
         self.helper.log_info("[CONNECTOR] Getting the last CVEs since the last run...")
 
         last_run_ts = datetime.utcfromtimestamp(last_run)
+        self.converter.sync_mirror(last_run_ts, now)
 
         # Update date range
         cve_params = self._update_cve_params(last_run_ts, now)
@@ -240,6 +280,10 @@ class CVEConnector:
                 =================================================================
                 """
                 if self.config.pull_history:
+                    # Resume the history import if the previous run was interrupted
+                    self.history_progress = (current_state or {}).get(
+                        "history_progress"
+                    )
                     start_date = datetime(self.config.history_start_year, 1, 1)
                     end_date = now
                     self._import_history(start_date, end_date, work_id)
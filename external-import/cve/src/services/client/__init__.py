@@ -1,2 +1,3 @@
 from .api import CVEClient  # noqa: F401
+from .mirror import CVEMirror  # noqa: F401
 from .vulnerability import CVEVulnerability  # noqa: F401
@@ -1,10 +1,10 @@
-import time
-
 import requests
 from requests.adapters import HTTPAdapter
+from services.utils import RATE_LIMIT_WINDOW  # type: ignore
 from urllib3.util import Retry
 
 from .endpoints import BASE_URL
+from .rateLimiter import TokenBucket
 
 
 class CVEClient:
@@ -12,12 +12,14 @@ class CVEClient:
     Working with CVE API
     """
 
-    def __init__(self, api_key, helper, header):
+    def __init__(self, api_key, helper, header, rate_limit=5, num_workers=1):
         """
         Initialize CVE API with necessary configurations
         :param api_key: API key in string
         :param helper: OCTI helper
         :param header:
+        :param rate_limit: Number of requests allowed per 30 seconds
+        :param num_workers: Number of pages retrieved concurrently
         """
         headers = {"apiKey": api_key, "User-Agent": header}
         self.token = api_key
@@ -25,6 +27,26 @@ class CVEClient:
         self.session = requests.Session()
         self.session.headers.update(headers)
 
+        # Never send more concurrent requests than the rate limit allows at once
+        self.num_workers = max(1, min(num_workers, rate_limit))
+        # Requests are paced one by one at the rate limit, the workers only
+        # overlap the response times of the pages
+        self.rate_limiter = TokenBucket(rate_limit, RATE_LIMIT_WINDOW)
+
+        # Define the retry strategy
+        retry_strategy = Retry(
+            total=4,  # Maximum number of retries
+            backoff_factor=6,  # Exponential backoff factor (e.g., 2 means 1, 2, 4, 8 seconds, ...)
+            status_forcelist=[429, 500, 502, 503, 504],  # HTTP status codes to retry on
+        )
+        # Create an HTTP adapter with the retry strategy and mount it to session
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy, pool_maxsize=max(10, self.num_workers)
+        )
+
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
     @staticmethod
     def _request_data(self, api_url: str, params=None):
         """
@@ -46,23 +68,12 @@ class CVEClient:
             return None
 
     def request(self, api_url, params):
-        # Define the retry strategy
-        retry_strategy = Retry(
-            total=4,  # Maximum number of retries
-            backoff_factor=6,  # Exponential backoff factor (e.g., 2 means 1, 2, 4, 8 seconds, ...)
-            status_forcelist=[429, 500, 502, 503, 504],  # HTTP status codes to retry on
-        )
-        # Create an HTTP adapter with the retry strategy and mount it to session
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        # Wait for the rate limit (NIST) to allow a new request
+        self.rate_limiter.acquire()
 
         response = self.session.get(api_url, params=params)
 
         if response.status_code == 200:
-            # It is recommended that users "sleep" their scripts for six seconds between requests (NIST)
-            time.sleep(6)
             return response
         else:
             raise Exception(
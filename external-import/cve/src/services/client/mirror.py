@@ -0,0 +1,191 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+from services.utils import MAX_AUTHORIZED  # type: ignore
+
+from .vulnerability import CVEVulnerability
+
+
+class CVEMirror:
+    """
+    Local SQLite mirror of the raw NVD CVE JSON, keyed by CVE ID and lastModified
+    """
+
+    def __init__(self, path: str, helper, page_size: int = 2000):
+        """
+        Open (and create if needed) the mirror database
+        :param path: Path of the SQLite file in string
+        :param helper: OCTI helper
+        :param page_size: Number of CVEs read from the mirror at once
+        """
+        self.helper = helper
+        self.page_size = page_size
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cves (
+                cve_id TEXT PRIMARY KEY,
+                last_modified TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS cves_last_modified
+                ON cves (last_modified, cve_id);
+            CREATE TABLE IF NOT EXISTS sync (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+
+    def get_synced_range(self):
+        """
+        :return: Tuple of the dates between which the mirror is synced with NVD,
+        None if never synced
+        """
+        rows = dict(
+            self.connection.execute(
+                "SELECT key, value FROM sync "
+                "WHERE key IN ('synced_from', 'synced_until')"
+            ).fetchall()
+        )
+        if "synced_until" not in rows:
+            return None
+        synced_until = datetime.fromisoformat(rows["synced_until"])
+        # Mirrors synced before the lower bound was stored cover an unknown range
+        synced_from = (
+            datetime.fromisoformat(rows["synced_from"])
+            if "synced_from" in rows
+            else synced_until
+        )
+        return synced_from, synced_until
+
+    def covers(self, cve_params: dict) -> bool:
+        """
+        Check if the mirror is synced over the lastModified range of the params
+        :param cve_params: Dict of params
+        :return: True if the CVEs can be read from the mirror
+        """
+        synced_range = self.get_synced_range()
+        if synced_range is None:
+            return False
+        synced_from, synced_until = synced_range
+        return (
+            synced_from <= datetime.fromisoformat(cve_params["lastModStartDate"])
+            and datetime.fromisoformat(cve_params["lastModEndDate"]) <= synced_until
+        )
+
+    def _set_synced_bound(self, key: str, value: datetime) -> None:
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sync (key, value) VALUES (?, ?)",
+                (key, value.isoformat()),
+            )
+
+    def store(self, cve_vulnerabilities: list) -> None:
+        """
+        Insert or update raw CVEs in the mirror
+        :param cve_vulnerabilities: List of dicts of CVE as returned by NVD
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO cves (cve_id, last_modified, data) "
+                "VALUES (?, ?, ?)",
+                [
+                    (
+                        cve_vulnerability["cve"]["id"],
+                        cve_vulnerability["cve"]["lastModified"],
+                        json.dumps(cve_vulnerability),
+                    )
+                    for cve_vulnerability in cve_vulnerabilities
+                ],
+            )
+
+    def sync(self, client_api, start_date: datetime, end_date: datetime) -> None:
+        """
+        Download the CVEs missing from the mirror between start_date and
+        end_date, by lastModified date ranges. The synced range is extended
+        backward to start_date, then forward to end_date, and stored after
+        each range so that an interrupted sync is resumed
+        :param client_api: CVE client used to query NVD
+        :param start_date: Start date in datetime
+        :param end_date: End date in datetime
+        """
+        synced_range = self.get_synced_range()
+        if synced_range is None:
+            self._set_synced_bound("synced_from", start_date)
+            self._set_synced_bound("synced_until", start_date)
+            synced_from = synced_until = start_date
+        else:
+            synced_from, synced_until = synced_range
+
+        # Backfill the dates before the synced range
+        while start_date < synced_from:
+            window_start = max(synced_from - timedelta(days=MAX_AUTHORIZED), start_date)
+            self._sync_window(client_api, window_start, synced_from)
+            self._set_synced_bound("synced_from", window_start)
+            synced_from = window_start
+
+        # Catch up with the dates after the synced range
+        while synced_until < end_date:
+            window_end = min(synced_until + timedelta(days=MAX_AUTHORIZED), end_date)
+            self._sync_window(client_api, synced_until, window_end)
+            self._set_synced_bound("synced_until", window_end)
+            synced_until = window_end
+
+    def _sync_window(
+        self, client_api, start_date: datetime, end_date: datetime
+    ) -> None:
+        info_msg = (
+            f"[MIRROR] Syncing CVEs modified from {start_date.isoformat()} "
+            f"to {end_date.isoformat()}"
+        )
+        self.helper.log_info(info_msg)
+
+        cve_params = {
+            "lastModStartDate": start_date.isoformat(),
+            "lastModEndDate": end_date.isoformat(),
+        }
+        for cve_collection in client_api.get_pages(cve_params):
+            self.store(cve_collection["vulnerabilities"])
+
+    def get_vulnerabilities(self, cve_params: dict):
+        """
+        Read and filter CVE with scoring system V3 from the mirror, page by page
+        Same contract as CVEVulnerability.get_vulnerabilities, without any API call
+        :param cve_params: Dict of params
+        :return: Generator of (list of dicts of CVE, start index of the next page)
+        """
+        start_index = cve_params.get("startIndex", 0)
+
+        while True:
+            rows = self.connection.execute(
+                "SELECT data FROM cves "
+                "WHERE last_modified >= ? AND last_modified <= ? "
+                "ORDER BY last_modified, cve_id LIMIT ? OFFSET ?",
+                (
+                    cve_params["lastModStartDate"],
+                    cve_params["lastModEndDate"],
+                    self.page_size,
+                    start_index,
+                ),
+            ).fetchall()
+            if len(rows) == 0:
+                break
+
+            cve_vulnerabilities = [json.loads(row[0]) for row in rows]
+            start_index += len(rows)
+
+            cve_vulnerabilities_filtered = CVEVulnerability.filter_vulnerabilities(
+                cve_vulnerabilities
+            )
+            info_msg = (
+                f"[MIRROR] Read {len(cve_vulnerabilities)} CVEs from the mirror, "
+                f"{len(cve_vulnerabilities_filtered)} with CVSS 3.1"
+            )
+            self.helper.log_info(info_msg)
+
+            yield cve_vulnerabilities_filtered, start_index
+
+            if len(rows) < self.page_size:
+                break
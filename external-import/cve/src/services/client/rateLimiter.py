@@ -0,0 +1,39 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting the number of requests sent to the API
+    """
+
+    def __init__(self, limit: int, window: int, burst: int = 1):
+        """
+        Initialize the bucket so that requests are sent at `limit` per
+        `window` in steady state, `burst` of them being sendable at once
+        :param limit: Maximum number of requests per window in integer
+        :param window: Window in seconds
+        :param burst: Capacity of the bucket in integer
+        """
+        self.capacity = max(1, min(burst, limit))
+        self.rate = limit / window
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Block until a token is available, then consume it
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
@@ -1,14 +1,17 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
 from .api import CVEClient
 
 
 class CVEVulnerability(CVEClient):
-    def get_vulnerabilities(self, cve_params=None) -> list:
+    def _get_page(self, cve_params: dict) -> dict:
         """
-        Get and filter CVE with scoring system V3
+        Get a page of CVE
         :param cve_params: Dict of params
-        :return: A list of dicts of CVE
+        :return: Dict of the CVE collection page
         """
-
         cve_collection = self.get_complete_collection(cve_params)
 
         if cve_collection is None:
@@ -16,61 +19,100 @@ class CVEVulnerability(CVEClient):
                 "Attempting to retrieve data failed. " "Wait for connector to re-run..."
             )
 
+        return cve_collection
+
+    def get_pages(self, cve_params=None):
+        """
+        Get every page of CVE, the pages after the first one being retrieved
+        concurrently within the rate limit
+        :param cve_params: Dict of params
+        :return: Generator of CVE collection pages, in order
+        """
+        cve_params = dict(cve_params or {})
+        first_index = cve_params.get("startIndex", 0)
+        cve_collection = self._get_page(cve_params)
+
         page_size = cve_collection["resultsPerPage"]
-        cve_vulnerabilities_total = cve_collection["vulnerabilities"]
         total_items = cve_collection["totalResults"]
+        received = first_index + page_size
 
         if page_size == 0:
             msg = "[API] No Vulnerabilities to retrieve..."
             self.helper.log_info(msg)
-        elif page_size >= total_items:
+        elif received >= total_items:
             msg = f"[API] Received all {page_size} items. Pagination not required."
             self.helper.log_info(msg)
         else:
-            msg = f"[API] Received first {page_size} items of {total_items} total items, start pagination..."
+            msg = f"[API] Received first {received} items of {total_items} total items, start pagination..."
             self.helper.log_info(msg)
 
-            start_index = page_size
-
-            while start_index < total_items:
-                cve_params.update(
-                    {"startIndex": start_index, "resultsPerPage": page_size}
-                )
+        yield cve_collection
 
-                cve_collection = self.get_complete_collection(cve_params)
+        if page_size == 0 or received >= total_items:
+            return
 
-                if cve_collection is None:
-                    raise Exception(
-                        "Attempting to retrieve data failed. "
-                        "Wait for connector to re-run..."
-                    )
+        start_indexes = iter(range(received, total_items, page_size))
+        executor = ThreadPoolExecutor(max_workers=self.num_workers)
 
-                page_size = cve_collection["resultsPerPage"]
-                start_index += page_size
+        def submit(start_index):
+            return executor.submit(
+                self._get_page,
+                dict(cve_params, startIndex=start_index, resultsPerPage=page_size),
+            )
 
-                msg = f"[API] Received next {page_size} items, currently received {start_index} items of {total_items} total items."
+        try:
+            # Keep a bounded number of pages in flight, yielding them in order
+            pending = deque(
+                submit(start_index)
+                for start_index in islice(start_indexes, self.num_workers)
+            )
+            while pending:
+                cve_collection = pending.popleft().result()
+                start_index = next(start_indexes, None)
+                if start_index is not None:
+                    pending.append(submit(start_index))
+
+                received += cve_collection["resultsPerPage"]
+                msg = f"[API] Received next {cve_collection['resultsPerPage']} items, currently received {received} items of {total_items} total items."
                 self.helper.log_info(msg)
 
-                cve_vulnerabilities_total += cve_collection["vulnerabilities"]
-
-        info_msg = (
-            f"[API] All CVEs are retrieved. "
-            f"Getting {len(cve_vulnerabilities_total)} vulnerabilities in total"
-        )
-        self.helper.log_info(info_msg)
-
-        cve_vulnerabilities_filtered = []
-        for cve_vulnerability in cve_vulnerabilities_total:
-            metric_exist = cve_vulnerability["cve"]["metrics"]
-            if metric_exist:
-                for key, value in metric_exist.items():
-                    if key == "cvssMetricV31":
-                        cve_vulnerabilities_filtered.append(cve_vulnerability)
-
-        info_msg = (
-            f"[API] Filter for only CVSS 3.1 CVEs. "
-            f"Getting {len(cve_vulnerabilities_filtered)} vulnerabilities in total"
-        )
-        self.helper.log_info(info_msg)
-
-        return cve_vulnerabilities_filtered
+                yield cve_collection
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_vulnerabilities(self, cve_params=None):
+        """
+        Get and filter CVE with scoring system V3, page by page
+        :param cve_params: Dict of params
+        :return: Generator of (list of dicts of CVE, start index of the next page)
+        """
+        start_index = (cve_params or {}).get("startIndex", 0)
+        for cve_collection in self.get_pages(cve_params):
+            cve_vulnerabilities = cve_collection["vulnerabilities"]
+            start_index += cve_collection["resultsPerPage"]
+
+            cve_vulnerabilities_filtered = self.filter_vulnerabilities(
+                cve_vulnerabilities
+            )
+
+            info_msg = (
+                f"[API] Filter for only CVSS 3.1 CVEs. "
+                f"Getting {len(cve_vulnerabilities_filtered)} of "
+                f"{len(cve_vulnerabilities)} vulnerabilities"
+            )
+            self.helper.log_info(info_msg)
+
+            yield cve_vulnerabilities_filtered, start_index
+
+    @staticmethod
+    def filter_vulnerabilities(cve_vulnerabilities: list) -> list:
+        """
+        Filter CVE with scoring system V3.1
+        :param cve_vulnerabilities: List of dicts of CVE
+        :return: A list of dicts of CVE
+        """
+        return [
+            cve_vulnerability
+            for cve_vulnerability in cve_vulnerabilities
+            if "cvssMetricV31" in (cve_vulnerability["cve"]["metrics"] or {})
+        ]
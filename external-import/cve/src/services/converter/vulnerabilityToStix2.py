@@ -4,7 +4,7 @@ import stix2
 from pycti import Identity, StixCoreRelationship, Vulnerability  # type: ignore
 from services.utils import APP_VERSION, ConfigCVE  # type: ignore
 
-from ..client import CVEVulnerability  # type: ignore
+from ..client import CVEMirror, CVEVulnerability  # type: ignore
 
 
 class CVEConverter:
@@ -15,45 +15,70 @@ class CVEConverter:
             api_key=self.config.api_key,
             helper=self.helper,
             header=f"OpenCTI-cve/{APP_VERSION}",
+            rate_limit=self.config.rate_limit,
+            num_workers=self.config.num_workers,
+        )
+        self.mirror = (
+            CVEMirror(self.config.mirror_path, self.helper)
+            if self.config.mirror_path
+            else None
         )
         self.author = self._create_author()
 
-    def send_bundle(self, cve_params: dict, work_id: str) -> None:
+    def sync_mirror(self, start_date: datetime.datetime, end_date: datetime.datetime):
+        """
+        Update the local mirror with the CVEs it misses between the dates
+        :param start_date: Start date in datetime
+        :param end_date: End date in datetime
+        :return:
         """
-        Send bundle to API
+        if self.mirror is not None and self.config.mirror_sync:
+            self.mirror.sync(self.client_api, start_date, end_date)
+
+    def send_bundle(self, cve_params: dict, work_id: str, checkpoint=None) -> None:
+        """
+        Send a bundle to API for each page of CVEs, as soon as it is retrieved
         :param cve_params: Dict of params
         :param work_id: work id in string
+        :param checkpoint: Optional callable receiving the start index of the
+        next page, once the current page has been sent
         :return:
         """
-        vulnerabilities_objects = self.vulnerabilities_to_stix2(cve_params)
-
-        if len(vulnerabilities_objects) != 0:
-            vulnerabilities_objects.append(self.author)
-            vulnerabilities_bundle = self._to_stix_bundle(vulnerabilities_objects)
-            vulnerabilities_to_json = self._to_json_bundle(vulnerabilities_bundle)
-
-            # Retrieve the author object for the info message
-            info_msg = (
-                f"[CONVERTER] Sending bundle to server with {len(vulnerabilities_bundle)} objects, "
-                f"concerning {len(vulnerabilities_objects) - 1} vulnerabilities"
-            )
-            self.helper.log_info(info_msg)
-
-            self.helper.send_stix2_bundle(
-                vulnerabilities_to_json,
-                work_id=work_id,
-            )
+        # Read from the local mirror if enabled and synced over the dates,
+        # without any API call
+        if self.mirror is not None and self.mirror.covers(cve_params):
+            source = self.mirror
         else:
-            pass
-
-    def vulnerabilities_to_stix2(self, cve_params: dict) -> list:
+            source = self.client_api
+        for vulnerabilities, next_index in source.get_vulnerabilities(cve_params):
+            vulnerabilities_objects = self.vulnerabilities_to_stix2(vulnerabilities)
+
+            if len(vulnerabilities_objects) != 0:
+                vulnerabilities_objects.append(self.author)
+                vulnerabilities_bundle = self._to_stix_bundle(vulnerabilities_objects)
+                vulnerabilities_to_json = self._to_json_bundle(vulnerabilities_bundle)
+
+                # Retrieve the author object for the info message
+                info_msg = (
+                    f"[CONVERTER] Sending bundle to server with {len(vulnerabilities_bundle)} objects, "
+                    f"concerning {len(vulnerabilities_objects) - 1} vulnerabilities"
+                )
+                self.helper.log_info(info_msg)
+
+                self.helper.send_stix2_bundle(
+                    vulnerabilities_to_json,
+                    work_id=work_id,
+                )
+
+            if checkpoint is not None:
+                checkpoint(next_index)
+
+    def vulnerabilities_to_stix2(self, vulnerabilities: list) -> list:
         """
-        Retrieve all CVEs from NVD to convert into STIX2 format
-        :param cve_params: Dict of params
+        Convert CVEs from NVD into STIX2 format
+        :param vulnerabilities: List of dicts of CVE
         :return: List of data converted into STIX2
         """
-        vulnerabilities = self.client_api.get_vulnerabilities(cve_params)
-
         vulnerabilities_to_stix2 = []
 
         for vulnerability in vulnerabilities:
@@ -1,3 +1,3 @@
 from .configVariables import ConfigCVE  # noqa: F401
-from .constants import MAX_AUTHORIZED  # noqa: F401
+from .constants import MAX_AUTHORIZED, RATE_LIMIT_WINDOW  # noqa: F401
 from .version import __version__ as APP_VERSION  # noqa: F401
@@ -4,7 +4,11 @@ import yaml
 from pycti import get_config_variable  # type: ignore
 
 from .common import convert_hours_to_seconds
-from .constants import CONFIG_FILE_PATH
+from .constants import (
+    CONFIG_FILE_PATH,
+    RATE_LIMIT_WITH_API_KEY,
+    RATE_LIMIT_WITHOUT_API_KEY,
+)
 
 
 class ConfigCVE:
@@ -76,3 +80,32 @@ class ConfigCVE:
             self.load,
             isNumber=True,
         )
+
+        # Requests allowed per 30 seconds, depending on whether an API key is used
+        self.rate_limit = get_config_variable(
+            "CVE_RATE_LIMIT",
+            ["cve", "rate_limit"],
+            self.load,
+            isNumber=True,
+        ) or (RATE_LIMIT_WITH_API_KEY if self.api_key else RATE_LIMIT_WITHOUT_API_KEY)
+
+        self.num_workers = get_config_variable(
+            "CVE_NUM_WORKERS",
+            ["cve", "num_workers"],
+            self.load,
+            isNumber=True,
+            default=4,
+        )
+
+        self.mirror_path = get_config_variable(
+            "CVE_MIRROR_PATH",
+            ["cve", "mirror_path"],
+            self.load,
+        )
+
+        self.mirror_sync = get_config_variable(
+            "CVE_MIRROR_SYNC",
+            ["cve", "mirror_sync"],
+            self.load,
+            default=True,
+        )
@@ -2,3 +2,9 @@ from pathlib import Path
 
 CONFIG_FILE_PATH = Path(__file__).parents[2].joinpath("config.yml")
 MAX_AUTHORIZED = 120
+
+# NVD API rate limits, in requests per rolling window
+# See https://nvd.nist.gov/developers/start-here#divRateLimits
+RATE_LIMIT_WINDOW = 30
+RATE_LIMIT_WITH_API_KEY = 50
+RATE_LIMIT_WITHOUT_API_KEY = 5
@@ -0,0 +1,12 @@
+import os
+import sys
+from pathlib import Path
+
+src_dir = str(Path(__file__).parent.parent.joinpath("src").absolute())
+
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+# The services load the connector configuration when imported
+os.environ.setdefault("CVE_BASE_URL", "https://services.nvd.nist.gov/rest/json/cves")
+os.environ.setdefault("CVE_INTERVAL", "6")
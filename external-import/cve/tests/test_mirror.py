@@ -0,0 +1,83 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+from services.client.mirror import CVEMirror
+
+
+class FakeClient:
+    """NVD client recording the lastModified ranges it is queried for"""
+
+    def __init__(self):
+        self.ranges = []
+
+    def get_pages(self, cve_params):
+        start_date = cve_params["lastModStartDate"]
+        end_date = cve_params["lastModEndDate"]
+        self.ranges.append((start_date, end_date))
+        yield {
+            "vulnerabilities": [
+                {"cve": {"id": f"CVE-{start_date}", "lastModified": start_date}}
+            ]
+        }
+
+
+def params(start_date: datetime, end_date: datetime) -> dict:
+    return {
+        "lastModStartDate": start_date.isoformat(),
+        "lastModEndDate": end_date.isoformat(),
+    }
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    return CVEMirror(str(tmp_path / "mirror.db"), MagicMock())
+
+
+def test_sync_records_the_synced_range(mirror):
+    client = FakeClient()
+    start_date, end_date = datetime(2024, 1, 1), datetime(2024, 2, 1)
+
+    mirror.sync(client, start_date, end_date)
+
+    assert mirror.get_synced_range() == (start_date, end_date)
+    assert client.ranges == [(start_date.isoformat(), end_date.isoformat())]
+    assert mirror.covers(params(start_date, end_date))
+
+
+def test_sync_backfills_the_dates_before_the_synced_range(mirror):
+    client = FakeClient()
+    mirror.sync(client, datetime(2024, 6, 1), datetime(2024, 6, 10))
+    assert not mirror.covers(params(datetime(2024, 1, 1), datetime(2024, 6, 10)))
+
+    client.ranges = []
+    mirror.sync(client, datetime(2024, 1, 1), datetime(2024, 6, 10))
+
+    # MAX_AUTHORIZED days windows going backward from the synced range
+    assert client.ranges == [
+        ("2024-02-02T00:00:00", "2024-06-01T00:00:00"),
+        ("2024-01-01T00:00:00", "2024-02-02T00:00:00"),
+    ]
+    assert mirror.get_synced_range() == (datetime(2024, 1, 1), datetime(2024, 6, 10))
+    assert mirror.covers(params(datetime(2024, 1, 1), datetime(2024, 6, 10)))
+
+
+def test_sync_only_downloads_the_missing_dates(mirror):
+    client = FakeClient()
+    mirror.sync(client, datetime(2024, 1, 1), datetime(2024, 2, 1))
+
+    client.ranges = []
+    mirror.sync(client, datetime(2024, 1, 15), datetime(2024, 2, 5))
+
+    assert client.ranges == [("2024-02-01T00:00:00", "2024-02-05T00:00:00")]
+    assert mirror.get_synced_range() == (datetime(2024, 1, 1), datetime(2024, 2, 5))
+
+
+def test_mirror_synced_without_lower_bound_covers_nothing_before(mirror):
+    with mirror.connection:
+        mirror.connection.execute(
+            "INSERT INTO sync (key, value) VALUES ('synced_until', ?)",
+            (datetime(2024, 2, 1).isoformat(),),
+        )
+
+    assert not mirror.covers(params(datetime(2024, 1, 1), datetime(2024, 2, 1)))
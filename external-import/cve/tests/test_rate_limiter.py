@@ -0,0 +1,59 @@
+import pytest
+from services.client import rateLimiter
+from services.client.rateLimiter import TokenBucket
+from services.utils.constants import (
+    RATE_LIMIT_WINDOW,
+    RATE_LIMIT_WITH_API_KEY,
+    RATE_LIMIT_WITHOUT_API_KEY,
+)
+
+
+class FakeClock:
+    """Monotonic clock advanced by the sleeps of the token bucket"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        # Sleep at least the clock resolution, as a real sleep does
+        self.now += max(seconds, 1e-6)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(rateLimiter.time, "monotonic", fake_clock.monotonic)
+    monkeypatch.setattr(rateLimiter.time, "sleep", fake_clock.sleep)
+    return fake_clock
+
+
+@pytest.mark.parametrize("limit", [RATE_LIMIT_WITHOUT_API_KEY, RATE_LIMIT_WITH_API_KEY])
+@pytest.mark.parametrize("burst", [1, 4])
+def test_steady_state_throughput_matches_the_rate_limit(clock, limit, burst):
+    bucket = TokenBucket(limit, RATE_LIMIT_WINDOW, burst=burst)
+
+    # Drain the initial burst, then measure the steady state
+    for _ in range(bucket.capacity):
+        bucket.acquire()
+    start = clock.now
+    for _ in range(limit * 4):
+        bucket.acquire()
+
+    assert clock.now - start == pytest.approx(RATE_LIMIT_WINDOW * 4, abs=1e-3)
+
+
+@pytest.mark.parametrize("limit", [RATE_LIMIT_WITHOUT_API_KEY, RATE_LIMIT_WITH_API_KEY])
+def test_rolling_window_stays_within_the_rate_limit(clock, limit):
+    bucket = TokenBucket(limit, RATE_LIMIT_WINDOW)
+
+    sent_at = []
+    for _ in range(limit * 4):
+        bucket.acquire()
+        sent_at.append(clock.now)
+
+    for i, start in enumerate(sent_at):
+        in_window = [t for t in sent_at[i:] if t < start + RATE_LIMIT_WINDOW]
+        assert len(in_window) <= limit
@@ -2,7 +2,6 @@
 
 import json
 import os
-import ssl
 import sys
 import time
 import urllib
@@ -10,6 +9,7 @@ from datetime import datetime
 from typing import Optional
 
 import yaml
+from download_cache import DownloadCache
 from pycti import OpenCTIConnectorHelper, get_config_variable
 
 
@@ -37,6 +37,14 @@ class DisarmFramework:
             ["connector", "update_existing_data"],
             config,
         )
+        self.download_cache = DownloadCache(
+            get_config_variable(
+                "DISARM_FRAMEWORK_DOWNLOAD_CACHE_DIR",
+                ["disarm_framework", "download_cache_dir"],
+                config,
+                default=os.path.dirname(os.path.abspath(__file__)) + "/cache",
+            )
+        )
 
     def get_interval(self):
         return int(self.disarm_framework_interval) * 60 * 60 * 24
@@ -53,17 +61,15 @@ class DisarmFramework:
         Returns
         -------
         str
-            A string with the content or None in case of failure.
+            A string with the content or None in case of failure or if it did
+            not change since the last run.
         """
         try:
-            return (
-                urllib.request.urlopen(
-                    url,
-                    context=ssl.create_default_context(),
-                )
-                .read()
-                .decode("utf-8")
-            )
+            content = self.download_cache.fetch(url)
+            if content is None:
+                self.helper.log_info(f"{url} not modified, skipping")
+                return None
+            return content.decode("utf-8")
         except (
             urllib.error.URLError,
             urllib.error.HTTPError,
@@ -107,23 +113,29 @@ class DisarmFramework:
             ):
                 self.helper.log_info("Connector will run!")
 
-                now = datetime.utcfromtimestamp(timestamp)
-                friendly_name = "DISARM Framework run @ " + now.strftime(
-                    "%Y-%m-%d %H:%M:%S"
-                )
-                work_id = self.helper.api.work.initiate_work(
-                    self.helper.connect_id, friendly_name
-                )
                 # DISARM FRAMEWORK
+                disarm_data = None
                 if (
                     self.disarm_framework_file_url is not None
                     and len(self.disarm_framework_file_url) > 0
                 ):
                     disarm_data = self.retrieve_data(self.disarm_framework_file_url)
+
+                # Only initiate a work if the data changed since the last run
+                work_id = None
+                if disarm_data is not None:
+                    now = datetime.utcfromtimestamp(timestamp)
+                    friendly_name = "DISARM Framework run @ " + now.strftime(
+                        "%Y-%m-%d %H:%M:%S"
+                    )
+                    work_id = self.helper.api.work.initiate_work(
+                        self.helper.connect_id, friendly_name
+                    )
                     disarm_data_with_proper_kill_chain = self.change_kill_chain_name(
                         disarm_data
                     )
-                    self.send_bundle(work_id, disarm_data_with_proper_kill_chain)
+                    if self.send_bundle(work_id, disarm_data_with_proper_kill_chain):
+                        self.download_cache.save()
 
                 # Store the current timestamp as a last run
                 message = "Connector successfully run, storing last_run as " + str(
@@ -131,7 +143,8 @@ class DisarmFramework:
                 )
                 self.helper.log_info(message)
                 self.helper.set_state({"last_run": timestamp})
-                self.helper.api.work.to_processed(work_id, message)
+                if work_id is not None:
+                    self.helper.api.work.to_processed(work_id, message)
                 self.helper.log_info(
                     "Last_run stored, next run in: "
                     + str(round(self.get_interval() / 60 / 60 / 24, 2))
@@ -161,7 +174,7 @@ class DisarmFramework:
                 self.process_data()
                 time.sleep(60)
 
-    def send_bundle(self, work_id: str, serialized_bundle: str) -> None:
+    def send_bundle(self, work_id: str, serialized_bundle: str) -> bool:
         try:
             self.helper.send_stix2_bundle(
                 serialized_bundle,
@@ -169,8 +182,10 @@ class DisarmFramework:
                 update=self.update_existing_data,
                 work_id=work_id,
             )
+            return True
         except Exception as e:
             self.helper.log_error(f"Error while sending bundle: {e}")
+        return False
 
 
 if __name__ == "__main__":
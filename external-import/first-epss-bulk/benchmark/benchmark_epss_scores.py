@@ -0,0 +1,118 @@
+"""
+Benchmark of the loading of the EPSS scores file.
+
+Compare the previous dict of dicts, loaded from an in-memory copy of the whole
+file, with the EPSSScores typed arrays, loaded while the file is read. Report
+the load time, the peak memory and the memory retained by the scores. The
+sample file is generated if it does not exist.
+
+Usage: python benchmark/benchmark_epss_scores.py [--cves 300000] [--file sample.csv.gz]
+"""
+
+import argparse
+import csv
+import gc
+import gzip
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+# pylint:disable=wrong-import-position
+from connector.epss_scores import EPSSScores  # noqa: E402
+
+
+def generate_file(path: str, cves: int) -> None:
+    """Write a sample file in the format of the EPSS daily export"""
+
+    rand = random.Random(0)
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as fd:
+        fd.write("#model_version:v2023.03.01,score_date:2024-05-02T00:00:00+0000\n")
+        writer = csv.writer(fd)
+        writer.writerow(["cve", "epss", "percentile"])
+        # Sorted by CVE identifier as a string, like the real file
+        rows = sorted(f"CVE-{1999 + i % 26}-{i // 26 + 1:04d}" for i in range(cves))
+        for cve in rows:
+            writer.writerow([cve, f"{rand.random() / 10:.5f}", f"{rand.random():.5f}"])
+
+
+def load_dicts(path: str) -> dict:
+    """Previous loading, one dict per CVE from an in-memory copy of the file"""
+
+    with open(path, "rb") as fd:
+        content = fd.read()
+    with gzip.open(io.BytesIO(content), "rt", encoding="utf-8") as f:
+        next(f)
+        reader = csv.DictReader(f)
+        return {
+            row["cve"]: {
+                "epss": float(row["epss"]),
+                "percentile": float(row["percentile"]),
+            }
+            for row in reader
+        }
+
+
+def load_arrays(path: str) -> EPSSScores:
+    """Loading of the connector, into typed arrays while reading the file"""
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        next(f)
+        reader = csv.reader(f)
+        headers = next(reader)
+        columns = [headers.index(name) for name in ("cve", "epss", "percentile")]
+        return EPSSScores([row[column] for column in columns] for row in reader)
+
+
+def measure(name: str, load, path: str):
+    """Load the file, report the time and memory, return the scores"""
+
+    # Memory is traced in a second load, as tracing slows the load down
+    gc.collect()
+    start = time.perf_counter()
+    load(path)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    scores = load(path)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mib = 1024 * 1024
+    print(
+        f"{name:>6}: {elapsed:.2f}s, peak {peak / mib:.1f} MiB, "
+        f"retained {retained / mib:.1f} MiB"
+    )
+    return scores
+
+
+def main() -> None:
+    """Run the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--cves", type=int, default=300000)
+    parser.add_argument("--file", default="epss_sample.csv.gz")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.file):
+        print(f"Generating {args.cves} CVEs in {args.file}")
+        generate_file(args.file, args.cves)
+
+    dicts = measure("dicts", load_dicts, args.file)
+    arrays = measure("arrays", load_arrays, args.file)
+
+    assert len(dicts) == len(arrays), "The number of scores differ"
+    for cve, score in dicts.items():
+        assert arrays.get(cve) == (score["epss"], score["percentile"]), cve
+
+
+if __name__ == "__main__":
+    main()
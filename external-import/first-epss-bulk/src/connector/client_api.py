@@ -2,12 +2,13 @@
 
 import csv
 import gzip
-import io
 from datetime import datetime, timezone
-from typing import Any, Optional, Union
+from typing import Optional
 
 import requests
 
+from .epss_scores import EPSSScores
+
 
 class ConnectorClient:
     # pylint: disable=too-few-public-methods
@@ -25,31 +26,31 @@ class ConnectorClient:
         self.session = requests.Session()
         self.session.headers.update(headers)
 
-    def request_data(
-        self, api_url: str, params=None
-    ) -> Optional[dict[Union[str, Any], dict[str, float]]]:
+    def request_data(self, api_url: str, params=None) -> Optional[EPSSScores]:
         """
         Internal method to handle API requests
-        :return: Response in JSON format
+        The file is decompressed and parsed while it is being downloaded
+        :return: EPSS scores of every CVE
         """
         try:
             utc_date = datetime.now(tz=timezone.utc).strftime("%Y-%m-%d")
             url = f"{api_url}/epss_scores-{utc_date}.csv.gz"
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
+            with self.session.get(url, params=params, stream=True) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
 
-            with gzip.open(io.BytesIO(response.content), "rt", encoding="utf-8") as f:
-                # Skip first line
-                next(f)
-                # Read csv by defaut taking in the headers cve,epss,percentile
-                reader = csv.DictReader(f)
-                epss_data = {
-                    row["cve"]: {
-                        "epss": float(row["epss"]),
-                        "percentile": float(row["percentile"]),
-                    }
-                    for row in reader
-                }
+                with gzip.open(response.raw, "rt", encoding="utf-8") as f:
+                    # Skip first line
+                    next(f)
+                    # Read csv by defaut taking in the headers cve,epss,percentile
+                    reader = csv.reader(f)
+                    headers = next(reader)
+                    columns = [
+                        headers.index(name) for name in ("cve", "epss", "percentile")
+                    ]
+                    epss_data = EPSSScores(
+                        [row[column] for column in columns] for row in reader
+                    )
 
             return epss_data
         except requests.exceptions.RequestException as e:
@@ -60,3 +60,19 @@ class ConfigConnector:
             default="https://epss.cyentia.com",
             required=True,
         )
+
+        self.update_threshold = float(
+            get_config_variable(
+                "FIRST_EPSS_UPDATE_THRESHOLD",
+                ["first_epss", "update_threshold"],
+                self.load,
+                default=0,
+            )
+        )
+
+        self.sent_scores_path = get_config_variable(
+            "FIRST_EPSS_SENT_SCORES_PATH",
+            ["first_epss", "sent_scores_path"],
+            self.load,
+            default=str(Path(__file__).parents[1].joinpath("epss_sent_scores.bin")),
+        )
@@ -9,7 +9,8 @@ from pytz import UTC
 from .client_api import ConnectorClient
 from .config_variables import ConfigConnector
 from .converter_to_stix import ConverterToStix
-from .utils import is_cve_format
+from .epss_scores import EPSSScores
+from .sent_scores import SentScores
 
 
 class FirstEPSSConnector:
@@ -23,6 +24,7 @@ class FirstEPSSConnector:
         self.helper = OpenCTIConnectorHelper(self.config.load, playbook_compatible=True)
         self.client = ConnectorClient(self.helper, self.config)
         self.converter_to_stix = ConverterToStix(self.helper)
+        self.sent_scores = SentScores(self.helper, self.config.sent_scores_path)
 
         self.author = None
 
@@ -52,9 +54,11 @@ class FirstEPSSConnector:
         return opencti_data
 
     def _update_vuln_data_with_epss(
-        self, vuln_data: list, epss_data: dict
+        self, vuln_data: list, epss_data: EPSSScores
     ) -> list[dict]:
         """Update vulnerability data with EPSS score and convert into STIX object
+        Only the CVEs whose score or percentile moved by more than the update
+        threshold since they were last sent are converted
         :param vuln_data: Vulnerability names from OpenCTI
         :param epss_data: EPSS data from First EPSS
         :return: list of STIX objects
@@ -68,16 +72,24 @@ class FirstEPSSConnector:
 
         for vuln_name in vuln_data:
             epss_info = epss_data.get(vuln_name)
-            if epss_info and is_cve_format(vuln_name):
+            if epss_info and self.sent_scores.has_changed(
+                vuln_name, *epss_info, self.config.update_threshold
+            ):
+                score, percentile = epss_info
                 vulnerability_stix_object = self.converter_to_stix.create_vulnerability(
                     {
                         "name": vuln_name,
-                        "x_opencti_epss_score": float(epss_info["epss"]),
-                        "x_opencti_epss_percentile": float(epss_info["percentile"]),
+                        "x_opencti_epss_score": score,
+                        "x_opencti_epss_percentile": percentile,
                     },
                 )
                 stix_objects.append(vulnerability_stix_object)
 
+        self.helper.connector_logger.info(
+            "[CONNECTOR] Vulnerabilities with an EPSS update to send",
+            {"count": len(stix_objects), "total": len(vuln_data)},
+        )
+
         if stix_objects:
             stix_objects.append(self.author)
 
@@ -142,7 +154,13 @@ class FirstEPSSConnector:
             updated_stix_objects = self._update_vuln_data_with_epss(
                 vuln_data, epss_data
             )
-            self._process_submission(updated_stix_objects)
+            if updated_stix_objects:
+                try:
+                    self._process_submission(updated_stix_objects)
+                except Exception:
+                    self.sent_scores.discard()
+                    raise
+                self.sent_scores.save()
 
             # Store the current timestamp as a last run of the connector
             connector_stop = datetime.now(UTC).isoformat()
@@ -0,0 +1,49 @@
+"""EPSS Scores."""
+
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+from .utils import cve_to_key, is_cve_format
+
+
+class EPSSScores:
+    """EPSS score and percentile of every CVE.
+
+    Scores are kept in typed arrays indexed by a sorted array of integer CVE
+    keys (24 bytes per CVE) instead of one dict per CVE.
+    """
+
+    def __init__(self, rows: Iterable[tuple[str, str, str]]):
+        """Load the scores
+        :param rows: Iterable of (cve, epss, percentile) CSV rows
+        """
+        keys = array("q")
+        scores = array("d")
+        percentiles = array("d")
+        for cve, score, percentile in rows:
+            keys.append(cve_to_key(cve))
+            scores.append(float(score))
+            percentiles.append(float(percentile))
+
+        # The file is sorted by CVE identifier as a string, not as a number
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = array("q", (keys[index] for index in order))
+        self.scores = array("d", (scores[index] for index in order))
+        self.percentiles = array("d", (percentiles[index] for index in order))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, cve: str) -> Optional[tuple[float, float]]:
+        """Get the EPSS score and percentile of a CVE
+        :param cve: CVE identifier
+        :return: Tuple of score and percentile, None if the CVE has no score
+        """
+        if not is_cve_format(cve):
+            return None
+        key = cve_to_key(cve)
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return self.scores[index], self.percentiles[index]
+        return None
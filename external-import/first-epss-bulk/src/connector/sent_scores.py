@@ -0,0 +1,110 @@
+"""Sent Scores Store."""
+
+import os
+from array import array
+from bisect import bisect_left
+from typing import Optional
+
+from .utils import cve_to_key
+
+# EPSS scores and percentiles are published with 5 decimals
+SCALE = 100000
+
+
+class SentScores:
+    """EPSS score and percentile last sent to OpenCTI for each CVE.
+
+    Values are kept as sorted integer arrays (16 bytes per CVE) and persisted
+    in a binary file between runs.
+    """
+
+    def __init__(self, helper, path: str):
+        """Load the scores sent during the previous runs
+        :param helper: OpenCTI connector helper
+        :param path: Path of the file storing the scores
+        """
+        self.helper = helper
+        self.path = path
+        self.keys = array("q")
+        self.scores = array("i")
+        self.percentiles = array("i")
+        self.pending = {}
+        self._load()
+
+    def _load(self) -> None:
+        """Load the arrays from the file, if any"""
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "rb") as file:
+                count = int.from_bytes(file.read(8), "little")
+                self.keys.fromfile(file, count)
+                self.scores.fromfile(file, count)
+                self.percentiles.fromfile(file, count)
+        except (OSError, EOFError, ValueError) as err:
+            self.helper.connector_logger.warning(
+                "[SENT SCORES] Unable to load the previously sent scores, "
+                "all scores will be sent",
+                {"path": self.path, "error": str(err)},
+            )
+            self.keys = array("q")
+            self.scores = array("i")
+            self.percentiles = array("i")
+
+    def _get(self, key: int) -> Optional[tuple]:
+        """Get the last sent score and percentile of a CVE key
+        :param key: CVE key
+        :return: Tuple of scaled score and percentile, None if never sent
+        """
+        if key in self.pending:
+            return self.pending[key]
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return self.scores[index], self.percentiles[index]
+        return None
+
+    def has_changed(
+        self, cve: str, score: float, percentile: float, threshold: float
+    ) -> bool:
+        """Check whether a CVE score or percentile moved by more than the
+        threshold since it was last sent, and record it as sent if so
+        :param cve: CVE identifier
+        :param score: EPSS score
+        :param percentile: EPSS percentile
+        :param threshold: Minimal absolute change to send an update
+        :return: True if the CVE must be sent
+        """
+        key = cve_to_key(cve)
+        new_value = round(score * SCALE), round(percentile * SCALE)
+        previous_value = self._get(key)
+        if previous_value is not None and all(
+            abs(new - previous) <= threshold * SCALE
+            for new, previous in zip(new_value, previous_value)
+        ):
+            return False
+        self.pending[key] = new_value
+        return True
+
+    def discard(self) -> None:
+        """Forget the scores recorded since the last save"""
+        self.pending = {}
+
+    def save(self) -> None:
+        """Merge the recorded scores and write them to the file"""
+        if not self.pending:
+            return
+        merged = dict(zip(self.keys, zip(self.scores, self.percentiles)))
+        merged.update(self.pending)
+        keys = sorted(merged)
+        self.keys = array("q", keys)
+        self.scores = array("i", (merged[key][0] for key in keys))
+        self.percentiles = array("i", (merged[key][1] for key in keys))
+        self.pending = {}
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(len(keys).to_bytes(8, "little"))
+            self.keys.tofile(file)
+            self.scores.tofile(file)
+            self.percentiles.tofile(file)
+        os.replace(tmp_path, self.path)
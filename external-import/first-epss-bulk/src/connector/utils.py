@@ -17,5 +17,14 @@ def is_cve_format(string: str) -> bool:
     return False
 
 
+def cve_to_key(cve: str) -> int:
+    """Encode a CVE identifier into an integer
+    :param cve: CVE identifier, e.g. CVE-2024-12345
+    :return: Integer key, e.g. 20240012345
+    """
+    _, year, number = cve.split("-")
+    return int(year) * 10_000_000 + int(number)
+
+
 def time_from_unixtime(timestamp: int):
     return datetime.utcfromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
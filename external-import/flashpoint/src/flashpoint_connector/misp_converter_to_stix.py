@@ -1,7 +1,9 @@
 import re
 from datetime import datetime
 
+import misp_engine
 import stix2
+from misp_engine import FILETYPES, OPENCTISTIX2, PATTERNTYPES
 from pycti import (
     AttackPattern,
     CustomObservableHostname,
@@ -21,50 +23,6 @@ from pycti import (
     Tool,
 )
 
-PATTERN_TYPES = ["yara", "sigma", "pcre", "snort", "suricata"]
-OPENCTI_STIX2 = {
-    "autonomous-system": {
-        "type": "autonomous-system",
-        "path": ["number"],
-        "transform": {"operation": "remove_string", "value": "AS"},
-    },
-    "mac-addr": {"type": "mac-addr", "path": ["value"]},
-    "hostname": {"type": "hostname", "path": ["value"]},
-    "domain": {"type": "domain-name", "path": ["value"]},
-    "ipv4-addr": {"type": "ipv4-addr", "path": ["value"]},
-    "ipv6-addr": {"type": "ipv6-addr", "path": ["value"]},
-    "url": {"type": "url", "path": ["value"]},
-    "link": {"type": "url", "path": ["value"]},
-    "email-address": {"type": "email-addr", "path": ["value"]},
-    "email-subject": {"type": "email-message", "path": ["subject"]},
-    "mutex": {"type": "mutex", "path": ["name"]},
-    "file-name": {"type": "file", "path": ["name"]},
-    "file-path": {"type": "file", "path": ["name"]},
-    "file-md5": {"type": "file", "path": ["hashes", "MD5"]},
-    "file-sha1": {"type": "file", "path": ["hashes", "SHA-1"]},
-    "file-sha256": {"type": "file", "path": ["hashes", "SHA-256"]},
-    "directory": {"type": "directory", "path": ["path"]},
-    "registry-key": {"type": "windows-registry-key", "path": ["key"]},
-    "registry-key-value": {"type": "windows-registry-value-type", "path": ["data"]},
-    "pdb-path": {"type": "file", "path": ["name"]},
-    "x509-certificate-issuer": {"type": "x509-certificate", "path": ["issuer"]},
-    "x509-certificate-serial-number": {
-        "type": "x509-certificate",
-        "path": ["serial_number"],
-    },
-    "text": {"type": "text", "path": ["value"]},
-    "user-agent": {"type": "user-agent", "path": ["value"]},
-    "phone-number": {"type": "phone-number", "path": ["value"]},
-    "user-account": {"type": "user-account", "path": ["account_login"]},
-    "user-account-github": {
-        "type": "user-account",
-        "path": ["account_login"],
-        "account_type": "github",
-    },
-    "identity-individual": {"type": "identity", "identity_class": "individual"},
-}
-FILETYPES = ["file-name", "file-md5", "file-sha1", "file-sha256"]
-
 
 class MISPConverterToStix:
     """
@@ -666,137 +624,10 @@ class MISPConverterToStix:
                         added_names.append(name)
         return elements
 
-    @staticmethod
-    def _detect_ip_version(value, type=False):
-        """
-        :param value:
-        :param type:
-        :return:
-        """
-        if re.match(
-            r"^((25[0-5]|(2[0-4]|1\d|[1-9]|)\d)\.?\b){4}(\/([1-9]|[1-2]\d|3[0-2]))?$",
-            value,
-        ):
-            if type:
-                return "IPv4-Addr"
-            return "ipv4-addr"
-        else:
-            if type:
-                return "IPv6-Addr"
-            return "ipv6-addr"
-
     def _resolve_type(self, attr_type, attr_value):
-        """
-        :param attr_type:
-        :param attr_value:
-        :return:
-        """
-        types = {
-            "yara": [{"resolver": "yara"}],
-            "sigma": [{"resolver": "sigma"}],
-            "md5": [{"resolver": "file-md5", "type": "File"}],
-            "sha1": [{"resolver": "file-sha1", "type": "File"}],
-            "sha256": [{"resolver": "file-sha256", "type": "File"}],
-            "filename": [{"resolver": "file-name", "type": "File"}],
-            "pdb": [{"resolver": "pdb-path", "type": "File"}],
-            "filename|md5": [
-                {"resolver": "file-name", "type": "File"},
-                {"resolver": "file-md5", "type": "File"},
-            ],
-            "filename|sha1": [
-                {"resolver": "file-name", "type": "File"},
-                {"resolver": "file-sha1", "type": "File"},
-            ],
-            "filename|sha256": [
-                {"resolver": "file-name", "type": "File"},
-                {"resolver": "file-sha256", "type": "File"},
-            ],
-            "ip-src": [{"resolver": "ipv4-addr", "type": "IPv4-Addr"}],
-            "ip-dst": [{"resolver": "ipv4-addr", "type": "IPv4-Addr"}],
-            "ip-src|port": [
-                {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
-                {"resolver": "text", "type": "Text"},
-            ],
-            "ip-dst|port": [
-                {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
-                {"resolver": "text", "type": "Text"},
-            ],
-            "hostname": [{"resolver": "hostname", "type": "Hostname"}],
-            "hostname|port": [
-                {"resolver": "hostname", "type": "Hostname"},
-                {"resolver": "text", "type": "Text"},
-            ],
-            "domain": [{"resolver": "domain", "type": "Domain-Name"}],
-            "domain|ip": [
-                {"resolver": "domain", "type": "Domain-Name"},
-                {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
-            ],
-            "email-subject": [{"resolver": "email-subject", "type": "Email-Message"}],
-            "email": [{"resolver": "email-address", "type": "Email-Addr"}],
-            "email-src": [{"resolver": "email-address", "type": "Email-Addr"}],
-            "email-dst": [{"resolver": "email-address", "type": "Email-Addr"}],
-            "url": [{"resolver": "url", "type": "Url"}],
-            "windows-scheduled-task": [
-                {"resolver": "windows-scheduled-task", "type": "Text"}
-            ],
-            "regkey": [{"resolver": "registry-key", "type": "Windows-Registry-Key"}],
-            "user-agent": [{"resolver": "user-agent", "type": "User-Agent"}],
-            "phone-number": [{"resolver": "phone-number", "type": "Phone-Number"}],
-            "whois-registrant-email": [
-                {"resolver": "email-address", "type": "Email-Addr"}
-            ],
-            "text": [{"resolver": "text", "type": "Text"}],
-            "github-username": [
-                {"resolver": "user-account-github", "type": "User-Account"}
-            ],
-            "full-name": [{"resolver": "identity-individual", "type": "Identity"}],
-        }
-        if attr_type in types:
-            resolved_types = types[attr_type]
-            if len(resolved_types) == 2:
-                values = attr_value.split("|")
-                if len(values) == 2:
-                    if resolved_types[0]["resolver"] == "ipv4-addr":
-                        resolver_0 = self._detect_ip_version(values[0])
-                        type_0 = self._detect_ip_version(values[0], True)
-                    else:
-                        resolver_0 = resolved_types[0]["resolver"]
-                        type_0 = resolved_types[0]["type"]
-                    if resolved_types[1]["resolver"] == "ipv4-addr":
-                        resolver_1 = self._detect_ip_version(values[1])
-                        type_1 = self._detect_ip_version(values[1], True)
-                    else:
-                        resolver_1 = resolved_types[1]["resolver"]
-                        type_1 = resolved_types[1]["type"]
-                    return [
-                        {"resolver": resolver_0, "type": type_0, "value": values[0]},
-                        {"resolver": resolver_1, "type": type_1, "value": values[1]},
-                    ]
-                else:
-                    return None
-            else:
-                if resolved_types[0] == "ipv4-addr":
-                    resolver_0 = self._detect_ip_version(attr_value)
-                    type_0 = self._detect_ip_version(attr_value, True)
-                else:
-                    resolver_0 = resolved_types[0]["resolver"]
-                    type_0 = (
-                        resolved_types[0]["type"]
-                        if "type" in resolved_types[0]
-                        else None
-                    )
-                return [{"resolver": resolver_0, "type": type_0, "value": attr_value}]
-        # If not found, return text observable as a fallback
-        if self.misp_feed_import_unsupported_observables_as_text:
-            return [
-                {
-                    "resolver": "text",
-                    "type": "Text",
-                    "value": attr_value + " (type=" + attr_type + ")",
-                }
-            ]
-        else:
-            return None
+        return misp_engine.resolve_type(
+            attr_type, attr_value, self.misp_feed_import_unsupported_observables_as_text
+        )
 
     @staticmethod
     def _threat_level_to_score(threat_level):
@@ -916,7 +747,7 @@ class MISPConverterToStix:
             pattern_type = "stix"
             pattern = None
             # observable type is yara or sigma for instance
-            if observable_resolver in PATTERN_TYPES:
+            if observable_resolver in PATTERNTYPES:
                 pattern_type = observable_resolver
                 pattern = observable_value
                 name = (
@@ -925,22 +756,22 @@ class MISPConverterToStix:
                     else observable_type
                 )
             # observable type is not in stix 2
-            elif observable_resolver not in OPENCTI_STIX2:
+            elif observable_resolver not in OPENCTISTIX2:
                 return None
             # observable type is in stix
-            elif "path" in OPENCTI_STIX2[observable_resolver]:
-                if "transform" in OPENCTI_STIX2[observable_resolver]:
+            elif "path" in OPENCTISTIX2[observable_resolver]:
+                if "transform" in OPENCTISTIX2[observable_resolver]:
                     if (
-                        OPENCTI_STIX2[observable_resolver]["transform"]["operation"]
+                        OPENCTISTIX2[observable_resolver]["transform"]["operation"]
                         == "remove_string"
                     ):
                         observable_value = observable_value.replace(
-                            OPENCTI_STIX2[observable_resolver]["transform"]["value"],
+                            OPENCTISTIX2[observable_resolver]["transform"]["value"],
                             "",
                         )
                 lhs = stix2.ObjectPath(
-                    OPENCTI_STIX2[observable_resolver]["type"],
-                    OPENCTI_STIX2[observable_resolver]["path"],
+                    OPENCTISTIX2[observable_resolver]["type"],
+                    OPENCTISTIX2[observable_resolver]["path"],
                 )
                 genuine_pattern = str(
                     stix2.ObservationExpression(
@@ -994,165 +825,14 @@ class MISPConverterToStix:
                         "created_by_ref": author["id"],
                         "external_references": attribute_external_references,
                     }
-                    observable = None
-                    if observable_type == "Autonomous-System":
-                        observable = stix2.AutonomousSystem(
-                            number=observable_value.replace("AS", ""),
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Mac-Addr":
-                        observable = stix2.MACAddress(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Hostname":
-                        observable = CustomObservableHostname(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Domain-Name":
-                        observable = stix2.DomainName(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "IPv4-Addr":
-                        observable = stix2.IPv4Address(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "IPv6-Addr":
-                        observable = stix2.IPv6Address(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Url":
-                        observable = stix2.URL(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Email-Addr":
-                        observable = stix2.EmailAddress(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Email-Message":
-                        observable = stix2.EmailMessage(
-                            subject=observable_value,
-                            is_multipart=True,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Mutex":
-                        observable = stix2.Mutex(
-                            name=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "User-Account":
-                        if "account_type" in OPENCTI_STIX2[observable_resolver]:
-                            observable = stix2.UserAccount(
-                                account_login=observable_value,
-                                account_type=OPENCTI_STIX2[observable_resolver][
-                                    "account_type"
-                                ],
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        else:
-                            observable = stix2.UserAccount(
-                                account_login=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                    elif observable_type == "File":
-                        if OPENCTI_STIX2[observable_resolver]["path"][0] == "name":
-                            observable = stix2.File(
-                                name=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        elif OPENCTI_STIX2[observable_resolver]["path"][0] == "hashes":
-                            hashes = {}
-                            hashes[OPENCTI_STIX2[observable_resolver]["path"][1]] = (
-                                observable_value
-                            )
-                            observable = stix2.File(
-                                name=file_name,
-                                hashes=hashes,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                    elif observable_type == "Directory":
-                        observable = stix2.Directory(
-                            path=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Windows-Registry-Key":
-                        observable = stix2.WindowsRegistryKey(
-                            key=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Windows-Registry-Value-Type":
-                        observable = stix2.WindowsRegistryValueType(
-                            data=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "X509-Certificate":
-                        if OPENCTI_STIX2[observable_resolver]["path"][0] == "issuer":
-                            observable = stix2.File(
-                                issuer=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        elif (
-                            OPENCTI_STIX2[observable_resolver]["path"][1]
-                            == "serial_number"
-                        ):
-                            observable = stix2.File(
-                                serial_number=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        elif observable_type == "Phone-Number":
-                            observable = CustomObservablePhoneNumber(
-                                value=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        elif observable_type == "Text":
-                            observable = CustomObservableText(
-                                value=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        elif observable_type == "Identity":
-                            observable = stix2.Identity(
-                                id=Identity.generate_id(
-                                    observable_value,
-                                    OPENCTI_STIX2[observable_resolver][
-                                        "identity_class"
-                                    ],
-                                ),
-                                name=observable_value,
-                                identity_class=OPENCTI_STIX2[observable_resolver][
-                                    "identity_class"
-                                ],
-                                description=attribute["comment"],
-                                labels=attribute_tags,
-                                created_by_ref=author["id"],
-                                external_references=attribute_external_references,
-                            )
+                    observable = misp_engine.build_observable(
+                        observable_type,
+                        observable_resolver,
+                        observable_value,
+                        attribute_markings,
+                        custom_properties,
+                        file_name,
+                    )
                 except Exception as e:
                     self.helper.log_error(
                         f"Error creating observable type {observable_type} with value {observable_value}: {e}"
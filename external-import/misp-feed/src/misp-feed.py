@@ -1,18 +1,26 @@
+import functools
+import hashlib
 import json
 import os
 import re
 import ssl
 import sys
 import time
+import urllib.parse
 import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional
 
 import boto3
+import misp_engine
 import pytz
 import stix2
+import urllib3
 import yaml
 from dateutil.parser import parse
+from misp_engine import FILETYPES, OPENCTISTIX2, PATTERNTYPES
 from pycti import (
     AttackPattern,
     CustomObservableHostname,
@@ -33,49 +41,9 @@ from pycti import (
     get_config_variable,
 )
 
-PATTERNTYPES = ["yara", "sigma", "pcre", "snort", "suricata"]
-OPENCTISTIX2 = {
-    "autonomous-system": {
-        "type": "autonomous-system",
-        "path": ["number"],
-        "transform": {"operation": "remove_string", "value": "AS"},
-    },
-    "mac-addr": {"type": "mac-addr", "path": ["value"]},
-    "hostname": {"type": "hostname", "path": ["value"]},
-    "domain": {"type": "domain-name", "path": ["value"]},
-    "ipv4-addr": {"type": "ipv4-addr", "path": ["value"]},
-    "ipv6-addr": {"type": "ipv6-addr", "path": ["value"]},
-    "url": {"type": "url", "path": ["value"]},
-    "link": {"type": "url", "path": ["value"]},
-    "email-address": {"type": "email-addr", "path": ["value"]},
-    "email-subject": {"type": "email-message", "path": ["subject"]},
-    "mutex": {"type": "mutex", "path": ["name"]},
-    "file-name": {"type": "file", "path": ["name"]},
-    "file-path": {"type": "file", "path": ["name"]},
-    "file-md5": {"type": "file", "path": ["hashes", "MD5"]},
-    "file-sha1": {"type": "file", "path": ["hashes", "SHA-1"]},
-    "file-sha256": {"type": "file", "path": ["hashes", "SHA-256"]},
-    "directory": {"type": "directory", "path": ["path"]},
-    "registry-key": {"type": "windows-registry-key", "path": ["key"]},
-    "registry-key-value": {"type": "windows-registry-value-type", "path": ["data"]},
-    "pdb-path": {"type": "file", "path": ["name"]},
-    "x509-certificate-issuer": {"type": "x509-certificate", "path": ["issuer"]},
-    "x509-certificate-serial-number": {
-        "type": "x509-certificate",
-        "path": ["serial_number"],
-    },
-    "text": {"type": "text", "path": ["value"]},
-    "user-agent": {"type": "user-agent", "path": ["value"]},
-    "phone-number": {"type": "phone-number", "path": ["value"]},
-    "user-account": {"type": "user-account", "path": ["account_login"]},
-    "user-account-github": {
-        "type": "user-account",
-        "path": ["account_login"],
-        "account_type": "github",
-    },
-    "identity-individual": {"type": "identity", "identity_class": "individual"},
-}
-FILETYPES = ["file-name", "file-md5", "file-sha1", "file-sha256"]
+S3_DELETE_BATCH_SIZE = 1000  # maximum number of keys per S3 DeleteObjects call
+# Event fields bumped when an event is republished, left out of its fingerprint
+VOLATILE_EVENT_FIELDS = ("timestamp", "publish_timestamp")
 
 
 class MispFeed:
@@ -194,6 +162,31 @@ class MispFeed:
         self.misp_feed_interval = get_config_variable(
             "MISP_FEED_INTERVAL", ["misp_feed", "interval"], config, True
         )
+        self.misp_feed_num_workers = get_config_variable(
+            "MISP_FEED_NUM_WORKERS",
+            ["misp_feed", "num_workers"],
+            config,
+            isNumber=True,
+            default=1,
+        )
+        self.misp_feed_fingerprints_file = (
+            get_config_variable(
+                "MISP_FEED_FINGERPRINTS_FILE",
+                ["misp_feed", "fingerprints_file"],
+                config,
+                default=None,
+            )
+            or None
+        )
+        # Connections are kept alive and shared by the download workers
+        self.http = urllib3.PoolManager(
+            maxsize=max(self.misp_feed_num_workers, 1),
+            ssl_context=ssl.create_default_context(),
+        )
+        # Proxies of the environment (HTTP_PROXY, HTTPS_PROXY, NO_PROXY)
+        self.http_proxies = self._build_proxy_managers(
+            max(self.misp_feed_num_workers, 1)
+        )
 
         # Initialize MISP
         if self.source_type == "s3":
@@ -206,10 +199,51 @@ class MispFeed:
             )
 
             self.s3 = boto3.resource("s3").Bucket(bucket_name)
+            self.misp_feed_s3_streaming = get_config_variable(
+                "MISP_FEED_S3_STREAMING",
+                ["misp_feed", "s3_streaming"],
+                config,
+                default=False,
+            )
 
     def _get_interval(self):
         return int(self.misp_feed_interval) * 60
 
+    @staticmethod
+    def _build_proxy_managers(maxsize: int) -> dict:
+        """
+        Build a connection pool for each proxy set in the environment.
+
+        Returns
+        -------
+        dict
+            The proxy manager of each url scheme.
+        """
+        proxy_managers = {}
+        for scheme, proxy_url in urllib.request.getproxies().items():
+            if scheme not in ("http", "https"):
+                continue
+            if "://" not in proxy_url:
+                proxy_url = "http://" + proxy_url
+            proxy_managers[scheme] = urllib3.ProxyManager(
+                proxy_url,
+                maxsize=maxsize,
+                ssl_context=ssl.create_default_context(),
+            )
+        return proxy_managers
+
+    def _pool_for(self, url: str) -> urllib3.PoolManager:
+        """
+        Select the proxy of the url scheme, unless the host is in NO_PROXY.
+        """
+        parsed_url = urllib.parse.urlsplit(url)
+        proxy_manager = self.http_proxies.get(parsed_url.scheme)
+        if proxy_manager is None or urllib.request.proxy_bypass(
+            parsed_url.hostname or ""
+        ):
+            return self.http
+        return proxy_manager
+
     def _retrieve_data(self, url: str) -> Optional[str]:
         """
         Retrieve data from the given url.
@@ -225,30 +259,147 @@ class MispFeed:
             A string with the content or None in case of failure.
         """
         try:
-            return (
-                urllib.request.urlopen(
-                    url,
-                    context=ssl.create_default_context(),
-                )
-                .read()
-                .decode("utf-8")
-            )
-        except (
-            urllib.error.URLError,
-            urllib.error.HTTPError,
-            urllib.error.ContentTooShortError,
-        ) as urllib_error:
+            response = self._pool_for(url).request("GET", url)
+            if response.status >= 400:
+                raise urllib3.exceptions.HTTPError(f"HTTP Error {response.status}")
+            return response.data.decode("utf-8")
+        except urllib3.exceptions.HTTPError as urllib_error:
             self.helper.log_error(f"Error retrieving url {url}: {urllib_error}")
         return None
 
-    def _send_bundle(self, work_id: str, serialized_bundle: str) -> None:
+    def _load_fingerprints(self) -> dict:
+        if self.misp_feed_fingerprints_file is None or not os.path.isfile(
+            self.misp_feed_fingerprints_file
+        ):
+            return {}
+        try:
+            with open(self.misp_feed_fingerprints_file, "r") as fingerprints_file:
+                return json.load(fingerprints_file)
+        except (OSError, ValueError) as e:
+            self.helper.log_error(f"Error loading event fingerprints: {e}")
+            return {}
+
+    def _save_fingerprints(self, fingerprints: dict) -> None:
+        if self.misp_feed_fingerprints_file is None:
+            return
+        tmp_file_path = self.misp_feed_fingerprints_file + ".tmp"
+        try:
+            with open(tmp_file_path, "w") as fingerprints_file:
+                json.dump(fingerprints, fingerprints_file, separators=(",", ":"))
+            os.replace(tmp_file_path, self.misp_feed_fingerprints_file)
+        except OSError as e:
+            self.helper.log_error(f"Error saving event fingerprints: {e}")
+
+    @staticmethod
+    def _fingerprint(event) -> str:
+        """
+        Compute a compact fingerprint of the content of an event.
+
+        The fields bumped when an event is republished are left out, so an
+        event republished without edits keeps its fingerprint, while any edit
+        of the event, its attributes or objects changes it.
+        """
+        content = {
+            key: value
+            for key, value in event["Event"].items()
+            if key not in VOLATILE_EVENT_FIELDS
+        }
+        return hashlib.sha1(
+            json.dumps(content, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def _retrieve_and_process_event(self, item, fingerprints=None):
+        """
+        Download and convert the event of a manifest entry.
+
+        Returns the fingerprint of the event, None without fingerprints, and
+        its bundle, None when the event did not change since it was sent.
+        """
+        event = json.loads(
+            self._retrieve_data(self.misp_feed_url + "/" + item["event_key"] + ".json")
+        )
+        if fingerprints is None:
+            return None, self._process_event(event)
+        fingerprint = self._fingerprint(event)
+        if fingerprints.get(item["event_key"]) == fingerprint:
+            return fingerprint, None
+        return fingerprint, self._process_event(event)
+
+    def _retrieve_and_process_s3_object(self, key: str) -> Optional[str]:
+        try:
+            events = json.load(self.s3.Object(key).get()["Body"])
+            return self._process_event(events)
+        except Exception as e:
+            self.helper.log_error(f"Error processing S3 object {key}: {e}")
+            return None
+
+    def _delete_s3_objects(self, keys) -> None:
+        if len(keys) == 0:
+            return
+        self.s3.delete_objects(
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+        )
+        self.helper.set_state({"last_file": keys[-1].split("/")[-1]})
+
+    def _process_s3_objects(self, work_id: str, objects) -> None:
+        # Object bodies are parsed in memory, sent objects are deleted by batch
+        sent_keys = []
+        for key, bundle in self._process_items(
+            (obj.key for obj in objects), self._retrieve_and_process_s3_object
+        ):
+            if bundle is None:
+                continue
+            self.helper.log_info("Sending event STIX2 bundle...")
+            if self._send_bundle(work_id, bundle):
+                sent_keys.append(key)
+            if len(sent_keys) >= S3_DELETE_BATCH_SIZE:
+                self._delete_s3_objects(sent_keys)
+                sent_keys = []
+        self._delete_s3_objects(sent_keys)
+
+    def _process_items(self, items, process=None):
+        """
+        Download and convert the given items (manifest entries by default),
+        yielding them in order.
+
+        With more than one worker, the next items are downloaded and converted
+        while the previous ones are being sent, so the caller still receives
+        (and stores the state of) the events in their original order.
+        """
+        if process is None:
+            process = self._retrieve_and_process_event
+        if self.misp_feed_num_workers <= 1:
+            for item in items:
+                yield item, process(item)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=self.misp_feed_num_workers)
+        pending = deque()
+        items = iter(items)
+        try:
+            while True:
+                while len(pending) < 2 * self.misp_feed_num_workers:
+                    item = next(items, None)
+                    if item is None:
+                        break
+                    pending.append((item, executor.submit(process, item)))
+                if len(pending) == 0:
+                    return
+                item, future = pending.popleft()
+                yield item, future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _send_bundle(self, work_id: str, serialized_bundle: str) -> bool:
         try:
             self.helper.send_stix2_bundle(
                 serialized_bundle,
                 work_id=work_id,
             )
+            return True
         except Exception as e:
             self.helper.log_error(f"Error while sending bundle: {e}")
+            return False
 
     def _resolve_markings(self, tags, with_default=True):
         markings = []
@@ -802,129 +953,9 @@ class MispFeed:
         return opencti_tags
 
     def _resolve_type(self, type, value):
-        types = {
-            "yara": [{"resolver": "yara"}],
-            "sigma": [{"resolver": "sigma"}],
-            "md5": [{"resolver": "file-md5", "type": "File"}],
-            "sha1": [{"resolver": "file-sha1", "type": "File"}],
-            "sha256": [{"resolver": "file-sha256", "type": "File"}],
-            "filename": [{"resolver": "file-name", "type": "File"}],
-            "pdb": [{"resolver": "pdb-path", "type": "File"}],
-            "filename|md5": [
-                {"resolver": "file-name", "type": "File"},
-                {"resolver": "file-md5", "type": "File"},
-            ],
-            "filename|sha1": [
-                {"resolver": "file-name", "type": "File"},
-                {"resolver": "file-sha1", "type": "File"},
-            ],
-            "filename|sha256": [
-                {"resolver": "file-name", "type": "File"},
-                {"resolver": "file-sha256", "type": "File"},
-            ],
-            "ip-src": [{"resolver": "ipv4-addr", "type": "IPv4-Addr"}],
-            "ip-dst": [{"resolver": "ipv4-addr", "type": "IPv4-Addr"}],
-            "ip-src|port": [
-                {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
-                {"resolver": "text", "type": "Text"},
-            ],
-            "ip-dst|port": [
-                {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
-                {"resolver": "text", "type": "Text"},
-            ],
-            "hostname": [{"resolver": "hostname", "type": "Hostname"}],
-            "hostname|port": [
-                {"resolver": "hostname", "type": "Hostname"},
-                {"resolver": "text", "type": "Text"},
-            ],
-            "domain": [{"resolver": "domain", "type": "Domain-Name"}],
-            "domain|ip": [
-                {"resolver": "domain", "type": "Domain-Name"},
-                {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
-            ],
-            "email-subject": [{"resolver": "email-subject", "type": "Email-Message"}],
-            "email": [{"resolver": "email-address", "type": "Email-Addr"}],
-            "email-src": [{"resolver": "email-address", "type": "Email-Addr"}],
-            "email-dst": [{"resolver": "email-address", "type": "Email-Addr"}],
-            "url": [{"resolver": "url", "type": "Url"}],
-            "windows-scheduled-task": [
-                {"resolver": "windows-scheduled-task", "type": "Text"}
-            ],
-            "regkey": [{"resolver": "registry-key", "type": "Windows-Registry-Key"}],
-            "user-agent": [{"resolver": "user-agent", "type": "User-Agent"}],
-            "phone-number": [{"resolver": "phone-number", "type": "Phone-Number"}],
-            "whois-registrant-email": [
-                {"resolver": "email-address", "type": "Email-Addr"}
-            ],
-            "text": [{"resolver": "text", "type": "Text"}],
-            "github-username": [
-                {"resolver": "user-account-github", "type": "User-Account"}
-            ],
-            "full-name": [{"resolver": "identity-individual", "type": "Identity"}],
-        }
-        if type in types:
-            resolved_types = types[type]
-            if len(resolved_types) == 2:
-                values = value.split("|")
-                if len(values) == 2:
-                    if resolved_types[0]["resolver"] == "ipv4-addr":
-                        resolver_0 = self._detect_ip_version(values[0])
-                        type_0 = self._detect_ip_version(values[0], True)
-                    else:
-                        resolver_0 = resolved_types[0]["resolver"]
-                        type_0 = resolved_types[0]["type"]
-                    if resolved_types[1]["resolver"] == "ipv4-addr":
-                        resolver_1 = self._detect_ip_version(values[1])
-                        type_1 = self._detect_ip_version(values[1], True)
-                    else:
-                        resolver_1 = resolved_types[1]["resolver"]
-                        type_1 = resolved_types[1]["type"]
-                    return [
-                        {"resolver": resolver_0, "type": type_0, "value": values[0]},
-                        {"resolver": resolver_1, "type": type_1, "value": values[1]},
-                    ]
-                else:
-                    return None
-            else:
-                if (
-                    "resolver" in resolved_types[0]
-                    and resolved_types[0]["resolver"] == "ipv4-addr"
-                    or resolved_types[0] == "ipv4-addr"
-                ):
-                    resolver_0 = self._detect_ip_version(value)
-                    type_0 = self._detect_ip_version(value, True)
-                else:
-                    resolver_0 = resolved_types[0]["resolver"]
-                    type_0 = (
-                        resolved_types[0]["type"]
-                        if "type" in resolved_types[0]
-                        else None
-                    )
-                return [{"resolver": resolver_0, "type": type_0, "value": value}]
-        # If not found, return text observable as a fallback
-        if self.misp_feed_import_unsupported_observables_as_text:
-            return [
-                {
-                    "resolver": "text",
-                    "type": "Text",
-                    "value": value + " (type=" + type + ")",
-                }
-            ]
-        else:
-            return None
-
-    def _detect_ip_version(self, value, type=False):
-        if re.match(
-            r"^((25[0-5]|(2[0-4]|1\d|[1-9]|)\d)\.?\b){4}(\/([1-9]|[1-2]\d|3[0-2]))?$",
-            value,
-        ):
-            if type:
-                return "IPv4-Addr"
-            return "ipv4-addr"
-        else:
-            if type:
-                return "IPv6-Addr"
-            return "ipv6-addr"
+        return misp_engine.resolve_type(
+            type, value, self.misp_feed_import_unsupported_observables_as_text
+        )
 
     def _get_pdf_file(self, attribute):
         if not self.misp_feed_import_with_attachments:
@@ -1113,163 +1144,14 @@ class MispFeed:
                         "created_by_ref": author["id"],
                         "external_references": attribute_external_references,
                     }
-                    observable = None
-                    if observable_type == "Autonomous-System":
-                        observable = stix2.AutonomousSystem(
-                            number=observable_value.replace("AS", ""),
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Mac-Addr":
-                        observable = stix2.MACAddress(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Hostname":
-                        observable = CustomObservableHostname(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Domain-Name":
-                        observable = stix2.DomainName(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "IPv4-Addr":
-                        observable = stix2.IPv4Address(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "IPv6-Addr":
-                        observable = stix2.IPv6Address(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Url":
-                        observable = stix2.URL(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Email-Addr":
-                        observable = stix2.EmailAddress(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Email-Message":
-                        observable = stix2.EmailMessage(
-                            subject=observable_value,
-                            is_multipart=True,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Mutex":
-                        observable = stix2.Mutex(
-                            name=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "User-Account":
-                        if "account_type" in OPENCTISTIX2[observable_resolver]:
-                            observable = stix2.UserAccount(
-                                account_login=observable_value,
-                                account_type=OPENCTISTIX2[observable_resolver][
-                                    "account_type"
-                                ],
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        else:
-                            observable = stix2.UserAccount(
-                                account_login=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                    elif observable_type == "File":
-                        if OPENCTISTIX2[observable_resolver]["path"][0] == "name":
-                            observable = stix2.File(
-                                name=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        elif OPENCTISTIX2[observable_resolver]["path"][0] == "hashes":
-                            hashes = {}
-                            hashes[OPENCTISTIX2[observable_resolver]["path"][1]] = (
-                                observable_value
-                            )
-                            observable = stix2.File(
-                                name=file_name,
-                                hashes=hashes,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                    elif observable_type == "Directory":
-                        observable = stix2.Directory(
-                            path=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Windows-Registry-Key":
-                        observable = stix2.WindowsRegistryKey(
-                            key=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Windows-Registry-Value-Type":
-                        observable = stix2.WindowsRegistryValueType(
-                            data=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "X509-Certificate":
-                        if OPENCTISTIX2[observable_resolver]["path"][0] == "issuer":
-                            observable = stix2.File(
-                                issuer=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        elif (
-                            OPENCTISTIX2[observable_resolver]["path"][1]
-                            == "serial_number"
-                        ):
-                            observable = stix2.File(
-                                serial_number=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                    elif observable_type == "Phone-Number":
-                        observable = CustomObservablePhoneNumber(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Text":
-                        observable = CustomObservableText(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Identity":
-                        observable = stix2.Identity(
-                            id=Identity.generate_id(
-                                observable_value,
-                                OPENCTISTIX2[observable_resolver]["identity_class"],
-                            ),
-                            name=observable_value,
-                            identity_class=OPENCTISTIX2[observable_resolver][
-                                "identity_class"
-                            ],
-                            description=attribute["comment"],
-                            labels=attribute_tags,
-                            created_by_ref=author["id"],
-                            external_references=attribute_external_references,
-                        )
+                    observable = misp_engine.build_observable(
+                        observable_type,
+                        observable_resolver,
+                        observable_value,
+                        attribute_markings,
+                        custom_properties,
+                        file_name,
+                    )
                 except Exception as e:
                     self.helper.log_error(
                         f"Error creating observable type {observable_type} with value {observable_value}: {e}"
@@ -1644,24 +1526,31 @@ class MispFeed:
                 "sightings": sightings,
             }
 
-    def _find_type_by_uuid(self, uuid, bundle_objects):
-        # filter by uuid
-        i_result = list(filter(lambda o: o.id.endswith("--" + uuid), bundle_objects))
-
-        if len(i_result) > 0:
-            uuid = i_result[0]["id"]
+    def _index_by_uuid(self, bundle_objects, uuid_index=None):
+        # index objects by the uuid part of their id, first object wins
+        if uuid_index is None:
+            uuid_index = {}
+        for bundle_object in bundle_objects:
+            object_id = bundle_object["id"]
+            uuid_index.setdefault(object_id[object_id.index("--") + 2 :], bundle_object)
+        return uuid_index
+
+    def _find_type_by_uuid(self, uuid, uuid_index):
+        entity = uuid_index.get(uuid)
+        if entity is not None:
+            uuid = entity["id"]
             return {
-                "entity": i_result[0],
+                "entity": entity,
                 "type": uuid[: uuid.index("--")],
             }
         return None
 
     # Markdown object, attribute & tag links should be converted from MISP links to OpenCTI links
-    def _process_note(self, content, bundle_objects):
+    def _process_note(self, content, uuid_index):
         def reformat(match):
             type = match.group(1)
             uuid = match.group(2)
-            result = self._find_type_by_uuid(uuid, bundle_objects)
+            result = self._find_type_by_uuid(uuid, uuid_index)
             if result is None:
                 return "[{}:{}](/dashboard/search/{})".format(type, uuid, uuid)
             if result["type"] == "indicator":
@@ -1955,13 +1844,14 @@ class MispFeed:
                 added_observables.append(object_observable["id"])
 
         # Link all objects with each other, now so we can find the correct entity type prefix in bundle_objects
+        uuid_index = self._index_by_uuid(bundle_objects)
         for object in event["Event"].get("Object", []):
             for ref in object.get("ObjectReference", []):
                 ref_src = ref.get("source_uuid")
                 ref_target = ref.get("referenced_uuid")
                 if ref_src is not None and ref_target is not None:
-                    src_result = self._find_type_by_uuid(ref_src, bundle_objects)
-                    target_result = self._find_type_by_uuid(ref_target, bundle_objects)
+                    src_result = self._find_type_by_uuid(ref_src, uuid_index)
+                    target_result = self._find_type_by_uuid(ref_target, uuid_index)
                     if src_result is not None and target_result is not None:
                         objects_relationships.append(
                             stix2.Relationship(
@@ -2053,13 +1943,15 @@ class MispFeed:
                 allow_custom=True,
             )
             bundle_objects.append(report)
+            self._index_by_uuid(bundle_objects, uuid_index)
             for note in event["Event"].get("EventReport", []):
+                note_content = self._process_note(note["content"], uuid_index)
                 note = stix2.Note(
                     id=Note.generate_id(
                         datetime.utcfromtimestamp(int(note["timestamp"])).strftime(
                             "%Y-%m-%dT%H:%M:%SZ"
                         ),
-                        self._process_note(note["content"], bundle_objects),
+                        note_content,
                     ),
                     created=datetime.utcfromtimestamp(int(note["timestamp"])).strftime(
                         "%Y-%m-%dT%H:%M:%SZ"
@@ -2070,11 +1962,12 @@ class MispFeed:
                     created_by_ref=author["id"],
                     object_marking_refs=event_markings,
                     abstract=note["name"],
-                    content=self._process_note(note["content"], bundle_objects),
+                    content=note_content,
                     object_refs=[report],
                     allow_custom=True,
                 )
                 bundle_objects.append(note)
+                self._index_by_uuid([note], uuid_index)
         return stix2.Bundle(objects=bundle_objects, allow_custom=True).serialize()
 
     def process_data(self):
@@ -2092,6 +1985,10 @@ class MispFeed:
                 else:
                     objects = self.s3.objects.all()
 
+                if self.misp_feed_s3_streaming:
+                    self._process_s3_objects(work_id, objects)
+                    objects = []
+
                 for obj in objects:
                     try:
                         file_name = obj.key.split("/")[-1]
@@ -2155,9 +2052,29 @@ class MispFeed:
                         value["timestamp"] = int(value["timestamp"])
                         items.append({**value, "event_key": key})
                     items = sorted(items, key=lambda d: d["timestamp"])
-                    for item in items:
-                        if item["timestamp"] > last_event_timestamp:
-                            last_event_timestamp = item["timestamp"]
+                    fingerprints = self._load_fingerprints()
+                    new_items = [
+                        item
+                        for item in items
+                        if item["timestamp"] > last_event_timestamp
+                    ]
+                    process = functools.partial(
+                        self._retrieve_and_process_event,
+                        fingerprints=(
+                            dict(fingerprints)
+                            if self.misp_feed_fingerprints_file is not None
+                            else None
+                        ),
+                    )
+                    for item, (fingerprint, bundle) in self._process_items(
+                        new_items, process
+                    ):
+                        last_event_timestamp = item["timestamp"]
+                        if bundle is None:
+                            self.helper.log_info(
+                                "Skipping unchanged event " + item["event_key"]
+                            )
+                        else:
                             self.helper.log_info(
                                 "Processing event "
                                 + item["info"]
@@ -2169,41 +2086,38 @@ class MispFeed:
                                 .isoformat()
                                 + ")"
                             )
-
-                            event = json.loads(
-                                self._retrieve_data(
-                                    self.misp_feed_url
-                                    + "/"
-                                    + item["event_key"]
-                                    + ".json"
-                                )
-                            )
-                            bundle = self._process_event(event)
                             self.helper.log_info("Sending event STIX2 bundle...")
-                            self._send_bundle(work_id, bundle)
+                            if not self._send_bundle(work_id, bundle):
+                                # Send it again when it is next republished
+                                fingerprint = None
                             number_events = number_events + 1
-                            message = (
-                                "Event processed, storing state (last_run="
-                                + now.astimezone(pytz.utc).isoformat()
-                                + ", last_event="
-                                + datetime.utcfromtimestamp(last_event_timestamp)
+                        if fingerprint is not None:
+                            fingerprints[item["event_key"]] = fingerprint
+                            if bundle is not None and number_events % 100 == 0:
+                                self._save_fingerprints(fingerprints)
+                        message = (
+                            "Event processed, storing state (last_run="
+                            + now.astimezone(pytz.utc).isoformat()
+                            + ", last_event="
+                            + datetime.utcfromtimestamp(last_event_timestamp)
+                            .astimezone(pytz.UTC)
+                            .isoformat()
+                            + ", last_event_timestamp="
+                            + str(last_event_timestamp)
+                        )
+                        self.helper.set_state(
+                            {
+                                "last_run": now.astimezone(pytz.utc).isoformat(),
+                                "last_event": datetime.utcfromtimestamp(
+                                    last_event_timestamp
+                                )
                                 .astimezone(pytz.UTC)
-                                .isoformat()
-                                + ", last_event_timestamp="
-                                + str(last_event_timestamp)
-                            )
-                            self.helper.set_state(
-                                {
-                                    "last_run": now.astimezone(pytz.utc).isoformat(),
-                                    "last_event": datetime.utcfromtimestamp(
-                                        last_event_timestamp
-                                    )
-                                    .astimezone(pytz.UTC)
-                                    .isoformat(),
-                                    "last_event_timestamp": last_event_timestamp,
-                                }
-                            )
-                            self.helper.log_info(message)
+                                .isoformat(),
+                                "last_event_timestamp": last_event_timestamp,
+                            }
+                        )
+                        self.helper.log_info(message)
+                    self._save_fingerprints(fingerprints)
                 except Exception as e:
                     self.helper.log_error(str(e))
 
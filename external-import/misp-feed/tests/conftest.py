@@ -0,0 +1,21 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_PATH = Path(__file__).parent.parent.joinpath("src", "misp-feed.py")
+SHARED_PATH = Path(__file__).parent.parent.parent.parent.joinpath(
+    "shared", "misp_engine"
+)
+
+sys.path.insert(0, str(SHARED_PATH))
+
+
+@pytest.fixture(scope="session")
+def misp_feed_module():
+    """Load the connector module, whose file name is not importable"""
+    spec = importlib.util.spec_from_file_location("misp_feed", SRC_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,172 @@
+import copy
+
+EVENT_KEY = "5f2b8c1e-9f0e-4d3a-8b5e-3c1d2a4b6e7f"
+EVENT = {
+    "Event": {
+        "uuid": EVENT_KEY,
+        "info": "Phishing campaign",
+        "date": "2024-05-02",
+        "analysis": "2",
+        "threat_level_id": "3",
+        "published": True,
+        "timestamp": "1714640000",
+        "publish_timestamp": "1714640100",
+        "Orgc": {"name": "CIRCL", "uuid": "55f6ea5e-2c60-40e5-964f-47a8950d210f"},
+        "Tag": [{"name": "tlp:white", "colour": "#ffffff"}],
+        "Attribute": [
+            {
+                "uuid": "9a1f3c2e-1b2d-4e5f-8a9b-0c1d2e3f4a5b",
+                "type": "domain",
+                "category": "Network activity",
+                "value": "phishing.example.com",
+                "to_ids": True,
+                "timestamp": "1714640000",
+            }
+        ],
+    }
+}
+MANIFEST_ITEM = {"event_key": EVENT_KEY, "timestamp": 1714640000}
+
+
+def republished(event, timestamp):
+    """Return the event republished at the given timestamp, without edits"""
+    event = copy.deepcopy(event)
+    event["Event"]["timestamp"] = str(timestamp)
+    event["Event"]["publish_timestamp"] = str(timestamp)
+    return event
+
+
+def build_connector(misp_feed_module, event):
+    connector = misp_feed_module.MispFeed.__new__(misp_feed_module.MispFeed)
+    connector.misp_feed_url = "https://feed.example.com"
+    connector.processed_events = []
+    connector._retrieve_data = lambda url: misp_feed_module.json.dumps(event)
+
+    def process_event(processed_event):
+        connector.processed_events.append(processed_event)
+        return "bundle"
+
+    connector._process_event = process_event
+    return connector
+
+
+def test_republished_event_keeps_the_fingerprint(misp_feed_module):
+    fingerprint = misp_feed_module.MispFeed._fingerprint
+
+    assert fingerprint(republished(EVENT, 1714650000)) == fingerprint(EVENT)
+
+
+def test_edited_attribute_changes_the_fingerprint(misp_feed_module):
+    fingerprint = misp_feed_module.MispFeed._fingerprint
+    edited_event = republished(EVENT, 1714650000)
+    edited_event["Event"]["Attribute"][0]["value"] = "phishing.example.org"
+    edited_event["Event"]["Attribute"][0]["timestamp"] = "1714650000"
+
+    assert fingerprint(edited_event) != fingerprint(EVENT)
+
+
+def test_edited_event_changes_the_fingerprint(misp_feed_module):
+    fingerprint = misp_feed_module.MispFeed._fingerprint
+    edited_event = republished(EVENT, 1714650000)
+    edited_event["Event"]["Tag"].append({"name": "tlp:green"})
+
+    assert fingerprint(edited_event) != fingerprint(EVENT)
+
+
+def test_republished_event_with_identical_content_is_skipped(misp_feed_module):
+    fingerprints = {EVENT_KEY: misp_feed_module.MispFeed._fingerprint(EVENT)}
+    connector = build_connector(misp_feed_module, republished(EVENT, 1714650000))
+    item = {**MANIFEST_ITEM, "timestamp": 1714650000}
+
+    fingerprint, bundle = connector._retrieve_and_process_event(item, fingerprints)
+
+    assert bundle is None
+    assert fingerprint == fingerprints[EVENT_KEY]
+    assert connector.processed_events == []
+
+
+def test_edited_event_is_sent(misp_feed_module):
+    fingerprints = {EVENT_KEY: misp_feed_module.MispFeed._fingerprint(EVENT)}
+    edited_event = republished(EVENT, 1714650000)
+    edited_event["Event"]["Attribute"][0]["to_ids"] = False
+    connector = build_connector(misp_feed_module, edited_event)
+
+    fingerprint, bundle = connector._retrieve_and_process_event(
+        MANIFEST_ITEM, fingerprints
+    )
+
+    assert bundle == "bundle"
+    assert fingerprint != fingerprints[EVENT_KEY]
+    assert connector.processed_events == [edited_event]
+
+
+def test_events_are_sent_without_fingerprints(misp_feed_module):
+    connector = build_connector(misp_feed_module, EVENT)
+
+    fingerprint, bundle = connector._retrieve_and_process_event(MANIFEST_ITEM)
+
+    assert fingerprint is None
+    assert bundle == "bundle"
+
+
+class FakeHelper:
+    """Record the bundles sent and the state stored by a run"""
+
+    connect_id = "connector-id"
+
+    def __init__(self, state):
+        self.state = state
+        self.sent_bundles = []
+        work = type(
+            "Work",
+            (),
+            {
+                "initiate_work": lambda *args: "work-id",
+                "to_processed": lambda *args: None,
+            },
+        )()
+        self.api = type("Api", (), {"work": work})()
+
+    def get_state(self):
+        return self.state
+
+    def set_state(self, state):
+        self.state = state
+
+    def send_stix2_bundle(self, bundle, work_id):
+        self.sent_bundles.append(bundle)
+
+    def log_info(self, message):
+        pass
+
+    def log_error(self, message):
+        raise AssertionError(message)
+
+
+def test_run_skips_republished_event_with_identical_content(misp_feed_module, tmp_path):
+    republished_event = republished(EVENT, 1714650000)
+    connector = build_connector(misp_feed_module, republished_event)
+    manifest = {EVENT_KEY: {"timestamp": "1714650000", "info": "x", "date": "x"}}
+    connector._retrieve_data = lambda url: misp_feed_module.json.dumps(
+        manifest if url.endswith("/manifest.json") else republished_event
+    )
+    connector.source_type = "url"
+    connector.misp_feed_interval = 0
+    connector.misp_feed_num_workers = 1
+    connector.misp_feed_fingerprints_file = str(tmp_path / "fingerprints.json")
+    connector._save_fingerprints(
+        {EVENT_KEY: misp_feed_module.MispFeed._fingerprint(EVENT)}
+    )
+    connector.helper = FakeHelper(
+        {
+            "last_run": "2024-05-02T09:00:00+00:00",
+            "last_event": "2024-05-02T09:06:40+00:00",
+            "last_event_timestamp": 1714640000,
+        }
+    )
+
+    connector.process_data()
+
+    assert connector.helper.sent_bundles == []
+    assert connector.processed_events == []
+    assert connector.helper.state["last_event_timestamp"] == 1714650000
@@ -0,0 +1,52 @@
+import urllib3
+
+PROXY_VARIABLES = ["http_proxy", "https_proxy", "no_proxy", "all_proxy"]
+
+
+def build_connector(misp_feed_module, monkeypatch, environment):
+    for variable in PROXY_VARIABLES:
+        monkeypatch.delenv(variable, raising=False)
+        monkeypatch.delenv(variable.upper(), raising=False)
+    for variable, value in environment.items():
+        monkeypatch.setenv(variable, value)
+    connector = misp_feed_module.MispFeed.__new__(misp_feed_module.MispFeed)
+    connector.http = urllib3.PoolManager()
+    connector.http_proxies = connector._build_proxy_managers(4)
+    return connector
+
+
+def test_direct_connection_without_proxy(misp_feed_module, monkeypatch):
+    connector = build_connector(misp_feed_module, monkeypatch, {})
+
+    assert connector._pool_for("https://feed.example.com/manifest.json") is (
+        connector.http
+    )
+
+
+def test_proxy_of_the_url_scheme(misp_feed_module, monkeypatch):
+    connector = build_connector(
+        misp_feed_module,
+        monkeypatch,
+        {"HTTPS_PROXY": "proxy.internal:3128", "HTTP_PROXY": "http://other:8080"},
+    )
+
+    pool = connector._pool_for("https://feed.example.com/manifest.json")
+
+    assert isinstance(pool, urllib3.ProxyManager)
+    assert pool.proxy.host == "proxy.internal"
+    assert pool.proxy.port == 3128
+    assert pool.connection_pool_kw["maxsize"] == 4
+    assert connector._pool_for("http://feed.example.com/").proxy.host == "other"
+
+
+def test_no_proxy_hosts_connect_directly(misp_feed_module, monkeypatch):
+    connector = build_connector(
+        misp_feed_module,
+        monkeypatch,
+        {"HTTPS_PROXY": "http://proxy.internal:3128", "NO_PROXY": ".example.com"},
+    )
+
+    assert connector._pool_for("https://feed.example.com/") is connector.http
+    assert isinstance(
+        connector._pool_for("https://feed.example.org/"), urllib3.ProxyManager
+    )
@@ -0,0 +1,236 @@
+"""
+Benchmark of the conversion of a large MISP event by the connector.
+
+Convert a generated event with many attributes and an EventReport with many
+links through Misp.process_events, first with the previous resolution of the
+MISP uuids (a linear scan over the bundle objects per link, and every note
+rewritten twice), then with the uuid index built once per event. Both bundles
+must hold the same objects. The report links point to the indicators and
+observables of the event, a tenth of them to uuids which are not in the bundle.
+
+Usage: python benchmark/benchmark_uuid_index.py [--attributes 10000] [--links 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import OrderedDict
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, "..", "src"))
+# misp_engine.py is shared with other connectors
+sys.path.insert(
+    0, os.path.join(BENCHMARK_DIR, "..", "..", "..", "shared", "misp_engine")
+)
+
+# pylint:disable=wrong-import-position
+from misp import Misp  # noqa: E402
+
+EVENT_UUID = "5f2b8c1e-9f0e-4d3a-8b5e-3c1d2a4b6e7f"
+TIMESTAMP = "1714640000"
+
+
+class ScanMisp(Misp):
+    """Connector with the previous resolution of the MISP uuids"""
+
+    def index_by_uuid(self, bundle_objects, uuid_index=None):
+        # The bundle objects themselves are scanned, they include later objects
+        if uuid_index is None:
+            return bundle_objects
+        return uuid_index
+
+    def find_type_by_uuid(self, uuid, bundle_objects):
+        i_result = list(filter(lambda o: o.id.endswith("--" + uuid), bundle_objects))
+        if len(i_result) > 0:
+            uuid = i_result[0]["id"]
+            return {
+                "entity": i_result[0],
+                "type": uuid[: uuid.index("--")],
+            }
+        return None
+
+    def process_note(self, content, uuid_index):
+        # The note content was rewritten twice, for its id and its content
+        super().process_note(content, uuid_index)
+        return super().process_note(content, uuid_index)
+
+
+class FakeHelper:
+    """Collect the bundles of the connector instead of sending them"""
+
+    connect_name = "MISP"
+    connect_confidence_level = 100
+
+    def __init__(self):
+        self.bundles = []
+        self.metric = type("Metric", (), {"inc": lambda *args: None})()
+
+    def send_stix2_bundle(self, bundle, **kwargs):
+        self.bundles.append(bundle)
+
+    def log_info(self, message):
+        pass
+
+    def log_debug(self, message):
+        pass
+
+    def log_error(self, message):
+        raise AssertionError(message)
+
+
+def create_connector(connector_class):
+    """Create a connector with its settings, without MISP or OpenCTI"""
+
+    connector = connector_class.__new__(connector_class)
+    connector.helper = FakeHelper()
+    options = {
+        "misp_author_from_tags": False,
+        "misp_markings_from_tags": True,
+        "misp_guess_threats_from_tags": False,
+        "misp_create_tags_as_labels": True,
+        "misp_create_indicators": True,
+        "misp_create_observables": True,
+        "misp_create_object_observables": False,
+        "misp_create_reports": True,
+        "misp_report_type": "misp-event",
+        "misp_propagate_labels": False,
+        "misp_report_description_attribute_filter": {},
+        "misp_datetime_attribute": "timestamp",
+        "misp_reference_url": None,
+        "misp_url": "https://misp.example.com",
+        "misp_cache_size": 1000,
+        "misp_import_creator_orgs": None,
+        "misp_import_creator_orgs_not": None,
+        "misp_import_owner_orgs": None,
+        "misp_import_owner_orgs_not": None,
+        "import_distribution_levels": None,
+        "import_threat_levels": None,
+        "import_only_published": None,
+        "import_to_ids_no_score": 40,
+        "import_with_attachments": False,
+        "import_unsupported_observables_as_text": False,
+        "import_unsupported_observables_as_text_transparent": True,
+        "keep_original_tags_as_label": "",
+    }
+    for option, value in options.items():
+        setattr(connector, option, value)
+    connector.elements_cache = OrderedDict()
+    connector.elements_cache_counters = {}
+    return connector
+
+
+def generate_event(attributes: int) -> dict:
+    """Build a MISP event with attributes of a few observable types"""
+
+    values = {
+        "domain": lambda i: f"host{i}.example.com",
+        "url": lambda i: f"http://host{i}.example.com/payload.exe",
+        "ip-dst": lambda i: f"198.51.{i // 256 % 256}.{i % 256}",
+        "email-src": lambda i: f"sender{i}@example.com",
+    }
+    types = list(values)
+    return {
+        "Event": {
+            "uuid": EVENT_UUID,
+            "info": "Generated event",
+            "date": "2024-05-02",
+            "analysis": "2",
+            "threat_level_id": "2",
+            "published": True,
+            "timestamp": TIMESTAMP,
+            "publish_timestamp": TIMESTAMP,
+            "Orgc": {"name": "CIRCL"},
+            "Tag": [{"name": "tlp:white"}],
+            "Attribute": [
+                {
+                    "uuid": str(uuid.UUID(int=i)),
+                    "type": types[i % len(types)],
+                    "category": "Network activity",
+                    "value": values[types[i % len(types)]](i),
+                    "to_ids": i % 2 == 0,
+                    "comment": f"attribute {i}",
+                    "timestamp": TIMESTAMP,
+                }
+                for i in range(attributes)
+            ],
+            "Object": [],
+        }
+    }
+
+
+def add_report(event: dict, links: int) -> None:
+    """Add an EventReport linking to the objects the event converts to"""
+
+    # The uuids of the objects are only known once the event is converted
+    connector = create_connector(Misp)
+    connector.process_events("work-id", [event])
+    uuids = [
+        stix_object["id"][stix_object["id"].index("--") + 2 :]
+        for stix_object in json.loads(connector.helper.bundles.pop())["objects"]
+        if stix_object["type"] == "indicator" or "value" in stix_object
+    ]
+    rand = random.Random(0)
+    targets = [
+        rand.choice(uuids) if i % 10 else str(uuid.UUID(int=rand.getrandbits(128)))
+        for i in range(links)
+    ]
+    event["Event"]["EventReport"] = [
+        {
+            "name": "Generated report",
+            "timestamp": TIMESTAMP,
+            "content": "\n".join(
+                f"See @[attribute]({target}) and @[tag](tlp:white)"
+                for target in targets
+            ),
+        }
+    ]
+
+
+def bundle_objects(bundle: str) -> list:
+    """Objects of a serialized bundle, without the times of their creation"""
+
+    volatile = ("created", "modified", "valid_from")
+    return [
+        {key: value for key, value in stix_object.items() if key not in volatile}
+        for stix_object in json.loads(bundle)["objects"]
+    ]
+
+
+def measure(name: str, connector_class, event: dict) -> tuple:
+    """Convert the event, return the elapsed seconds and the bundle"""
+
+    # Each run has its own connector, for its caches to start empty
+    connector = create_connector(connector_class)
+    start = time.perf_counter()
+    connector.process_events("work-id", [event])
+    elapsed = time.perf_counter() - start
+    print(f"{name:>5}: {elapsed:.1f}s")
+    return elapsed, connector.helper.bundles.pop()
+
+
+def main() -> None:
+    """Run the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--attributes", type=int, default=10000)
+    parser.add_argument("--links", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"Event with {args.attributes} attributes and a {args.links}-link report")
+    event = generate_event(args.attributes)
+    add_report(event, args.links)
+
+    scan_elapsed, scan_bundle = measure("scan", ScanMisp, event)
+    index_elapsed, index_bundle = measure("index", Misp, event)
+    assert bundle_objects(scan_bundle) == bundle_objects(
+        index_bundle
+    ), "The bundles differ"
+    print(f"speedup: {scan_elapsed / index_elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
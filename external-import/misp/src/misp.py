@@ -5,16 +5,19 @@ import sys
 import time
 import traceback
 import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import misp_engine
 import pytz
 import stix2
 import yaml
 from dateutil.parser import parse
+from misp_engine import FILETYPES, OPENCTISTIX2, PATTERNTYPES
+from prometheus_client import Counter
 from pycti import (
     AttackPattern,
-    CustomObservableHostname,
-    CustomObservablePhoneNumber,
     CustomObservableText,
     Identity,
     Indicator,
@@ -32,49 +35,12 @@ from pycti import (
 )
 from pymisp import PyMISP
 
-PATTERNTYPES = ["yara", "sigma", "pcre", "snort", "suricata"]
-OPENCTISTIX2 = {
-    "autonomous-system": {
-        "type": "autonomous-system",
-        "path": ["number"],
-        "transform": {"operation": "remove_string", "value": "AS"},
-    },
-    "mac-addr": {"type": "mac-addr", "path": ["value"]},
-    "hostname": {"type": "hostname", "path": ["value"]},
-    "domain": {"type": "domain-name", "path": ["value"]},
-    "ipv4-addr": {"type": "ipv4-addr", "path": ["value"]},
-    "ipv6-addr": {"type": "ipv6-addr", "path": ["value"]},
-    "url": {"type": "url", "path": ["value"]},
-    "link": {"type": "url", "path": ["value"]},
-    "email-address": {"type": "email-addr", "path": ["value"]},
-    "email-subject": {"type": "email-message", "path": ["subject"]},
-    "mutex": {"type": "mutex", "path": ["name"]},
-    "file-name": {"type": "file", "path": ["name"]},
-    "file-path": {"type": "file", "path": ["name"]},
-    "file-md5": {"type": "file", "path": ["hashes", "MD5"]},
-    "file-sha1": {"type": "file", "path": ["hashes", "SHA-1"]},
-    "file-sha256": {"type": "file", "path": ["hashes", "SHA-256"]},
-    "directory": {"type": "directory", "path": ["path"]},
-    "registry-key": {"type": "windows-registry-key", "path": ["key"]},
-    "registry-key-value": {"type": "windows-registry-value-type", "path": ["data"]},
-    "pdb-path": {"type": "file", "path": ["name"]},
-    "x509-certificate-issuer": {"type": "x509-certificate", "path": ["issuer"]},
-    "x509-certificate-serial-number": {
-        "type": "x509-certificate",
-        "path": ["serial_number"],
-    },
-    "text": {"type": "text", "path": ["value"]},
-    "user-agent": {"type": "user-agent", "path": ["value"]},
-    "phone-number": {"type": "phone-number", "path": ["value"]},
-    "user-account": {"type": "user-account", "path": ["account_login"]},
-    "user-account-github": {
-        "type": "user-account",
-        "path": ["account_login"],
-        "account_type": "github",
-    },
-    "identity-individual": {"type": "identity", "identity_class": "individual"},
+# The MISP connector also imports snort and suricata attributes as indicators
+MISPTYPES = {
+    **misp_engine.MISPTYPES,
+    "snort": [{"resolver": "snort"}],
+    "suricata": [{"resolver": "suricata"}],
 }
-FILETYPES = ["file-name", "file-md5", "file-sha1", "file-sha256"]
 
 marking_tlp_clear = stix2.MarkingDefinition(
     id=MarkingDefinition.generate_id("TLP", "TLP:CLEAR"),
@@ -335,6 +301,40 @@ class Misp:
             config,
             default=False,
         )
+        self.misp_page_size = get_config_variable(
+            "MISP_PAGE_SIZE",
+            ["misp", "page_size"],
+            config,
+            isNumber=True,
+            default=10,
+        )
+        self.misp_prefetch_pages = get_config_variable(
+            "MISP_PREFETCH_PAGES",
+            ["misp", "prefetch_pages"],
+            config,
+            isNumber=True,
+            default=0,
+        )
+        self.misp_cache_size = get_config_variable(
+            "MISP_CACHE_SIZE",
+            ["misp", "cache_size"],
+            config,
+            isNumber=True,
+            default=1000,
+        )
+        self.elements_cache = OrderedDict()
+        self.elements_cache_counters = {}
+        if self.helper.metric.activated:
+            self.elements_cache_counters = {
+                "hit": Counter(
+                    "misp_elements_cache_hit",
+                    "Number of galaxy, tag and marking resolutions served from cache",
+                ),
+                "miss": Counter(
+                    "misp_elements_cache_miss",
+                    "Number of galaxy, tag and marking resolutions built from scratch",
+                ),
+            }
 
         # Initialize MISP
         self.misp = PyMISP(
@@ -437,36 +437,15 @@ class Misp:
             else:
                 current_page = 1
             number_events = 0
-            while True:
-                kwargs["limit"] = 10
-                kwargs["page"] = current_page
-                if self.misp_import_keyword is not None:
-                    kwargs["value"] = self.misp_import_keyword
-                    kwargs["searchall"] = True
-                if self.misp_enforce_warning_list is not None:
-                    kwargs["enforce_warninglist"] = self.misp_enforce_warning_list
-                self.helper.log_info(
-                    "Fetching MISP events with args: " + json.dumps(kwargs)
-                )
-                kwargs = json.loads(json.dumps(kwargs))
-                events = []
-                try:
-                    events = self.misp.search("events", **kwargs)
-                    if isinstance(events, dict):
-                        if "errors" in events:
-                            raise ValueError(events["message"])
-                except Exception as e:
-                    self.helper.log_error(f"Error fetching misp event: {e}")
-                    self.helper.metric.inc("client_error_count")
-                    try:
-                        events = self.misp.search("events", **kwargs)
-                        if isinstance(events, dict):
-                            if "errors" in events:
-                                raise ValueError(events["message"])
-                    except Exception as e:
-                        self.helper.log_error(f"Error fetching misp event again: {e}")
-                        self.helper.metric.inc("client_error_count")
-                        break
+            kwargs["limit"] = self.misp_page_size
+            if self.misp_import_keyword is not None:
+                kwargs["value"] = self.misp_import_keyword
+                kwargs["searchall"] = True
+            if self.misp_enforce_warning_list is not None:
+                kwargs["enforce_warninglist"] = self.misp_enforce_warning_list
+            for current_page, events in self.fetch_pages(kwargs, current_page):
+                if events is None:
+                    break
 
                 self.helper.log_info("MISP returned " + str(len(events)) + " events.")
                 number_events = number_events + len(events)
@@ -484,11 +463,10 @@ class Misp:
                     last_event_timestamp = processed_events_last_timestamp
 
                 # Next page
-                current_page += 1
                 if current_state is not None:
-                    current_state["current_page"] = current_page
+                    current_state["current_page"] = current_page + 1
                 else:
-                    current_state = {"current_page": current_page}
+                    current_state = {"current_page": current_page + 1}
                 self.helper.set_state(current_state)
             # Loop is over, storing the state
             # We cannot store the state before, because MISP events are NOT ordered properly
@@ -528,6 +506,56 @@ class Misp:
             self.helper.metric.state("idle")
             time.sleep(self.get_interval())
 
+    def fetch_events(self, kwargs):
+        self.helper.log_info("Fetching MISP events with args: " + json.dumps(kwargs))
+        kwargs = json.loads(json.dumps(kwargs))
+        try:
+            events = self.misp.search("events", **kwargs)
+            if isinstance(events, dict):
+                if "errors" in events:
+                    raise ValueError(events["message"])
+        except Exception as e:
+            self.helper.log_error(f"Error fetching misp event: {e}")
+            self.helper.metric.inc("client_error_count")
+            try:
+                events = self.misp.search("events", **kwargs)
+                if isinstance(events, dict):
+                    if "errors" in events:
+                        raise ValueError(events["message"])
+            except Exception as e:
+                self.helper.log_error(f"Error fetching misp event again: {e}")
+                self.helper.metric.inc("client_error_count")
+                return None
+        return events
+
+    def fetch_pages(self, kwargs, current_page):
+        # Without prefetch, a page is only requested once the previous one is processed
+        if self.misp_prefetch_pages <= 0:
+            while True:
+                yield current_page, self.fetch_events(dict(kwargs, page=current_page))
+                current_page += 1
+
+        # With prefetch, the next pages are requested while the current one is processed
+        executor = ThreadPoolExecutor(max_workers=self.misp_prefetch_pages)
+        pending = deque()
+        next_page = current_page
+        try:
+            while True:
+                while len(pending) <= self.misp_prefetch_pages:
+                    pending.append(
+                        (
+                            next_page,
+                            executor.submit(
+                                self.fetch_events, dict(kwargs, page=next_page)
+                            ),
+                        )
+                    )
+                    next_page += 1
+                page, future = pending.popleft()
+                yield page, future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def process_events(self, work_id, events):
         # Prepare filters
         import_creator_orgs = None
@@ -916,15 +944,14 @@ class Misp:
                     added_observables.append(object_observable["id"])
 
             # Link all objects with each other, now so we can find the correct entity type prefix in bundle_objects
+            uuid_index = self.index_by_uuid(bundle_objects)
             for object in event["Event"].get("Object", []):
                 for ref in object.get("ObjectReference", []):
                     ref_src = ref.get("source_uuid")
                     ref_target = ref.get("referenced_uuid")
                     if ref_src is not None and ref_target is not None:
-                        src_result = self.find_type_by_uuid(ref_src, bundle_objects)
-                        target_result = self.find_type_by_uuid(
-                            ref_target, bundle_objects
-                        )
+                        src_result = self.find_type_by_uuid(ref_src, uuid_index)
+                        target_result = self.find_type_by_uuid(ref_target, uuid_index)
                         if src_result is not None and target_result is not None:
                             objects_relationships.append(
                                 stix2.Relationship(
@@ -1023,13 +1050,15 @@ class Misp:
                     allow_custom=True,
                 )
                 bundle_objects.append(report)
+                self.index_by_uuid(bundle_objects, uuid_index)
                 for note in event["Event"].get("EventReport", []):
+                    note_content = self.process_note(note["content"], uuid_index)
                     note = stix2.Note(
                         id=Note.generate_id(
                             datetime.utcfromtimestamp(int(note["timestamp"])).strftime(
                                 "%Y-%m-%dT%H:%M:%SZ"
                             ),
-                            self.process_note(note["content"], bundle_objects),
+                            note_content,
                         ),
                         created=datetime.utcfromtimestamp(
                             int(note["timestamp"])
@@ -1040,11 +1069,12 @@ class Misp:
                         created_by_ref=author["id"],
                         object_marking_refs=event_markings,
                         abstract=note["name"],
-                        content=self.process_note(note["content"], bundle_objects),
+                        content=note_content,
                         object_refs=[report],
                         allow_custom=True,
                     )
                     bundle_objects.append(note)
+                    self.index_by_uuid([note], uuid_index)
             bundle = stix2.Bundle(objects=bundle_objects, allow_custom=True).serialize()
             self.helper.log_info("Sending event STIX2 bundle")
 
@@ -1237,163 +1267,14 @@ class Misp:
                         "created_by_ref": author["id"],
                         "external_references": attribute_external_references,
                     }
-                    observable = None
-                    if observable_type == "Autonomous-System":
-                        observable = stix2.AutonomousSystem(
-                            number=observable_value.replace("AS", ""),
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Mac-Addr":
-                        observable = stix2.MACAddress(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Hostname":
-                        observable = CustomObservableHostname(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Domain-Name":
-                        observable = stix2.DomainName(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "IPv4-Addr":
-                        observable = stix2.IPv4Address(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "IPv6-Addr":
-                        observable = stix2.IPv6Address(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Url":
-                        observable = stix2.URL(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Email-Addr":
-                        observable = stix2.EmailAddress(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Email-Message":
-                        observable = stix2.EmailMessage(
-                            subject=observable_value,
-                            is_multipart=True,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Mutex":
-                        observable = stix2.Mutex(
-                            name=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "User-Account":
-                        if "account_type" in OPENCTISTIX2[observable_resolver]:
-                            observable = stix2.UserAccount(
-                                account_login=observable_value,
-                                account_type=OPENCTISTIX2[observable_resolver][
-                                    "account_type"
-                                ],
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        else:
-                            observable = stix2.UserAccount(
-                                account_login=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                    elif observable_type == "File":
-                        if OPENCTISTIX2[observable_resolver]["path"][0] == "name":
-                            observable = stix2.File(
-                                name=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        elif OPENCTISTIX2[observable_resolver]["path"][0] == "hashes":
-                            hashes = {}
-                            hashes[OPENCTISTIX2[observable_resolver]["path"][1]] = (
-                                observable_value
-                            )
-                            observable = stix2.File(
-                                name=file_name,
-                                hashes=hashes,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                    elif observable_type == "Directory":
-                        observable = stix2.Directory(
-                            path=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Windows-Registry-Key":
-                        observable = stix2.WindowsRegistryKey(
-                            key=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Windows-Registry-Value-Type":
-                        observable = stix2.WindowsRegistryValueType(
-                            data=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "X509-Certificate":
-                        if OPENCTISTIX2[observable_resolver]["path"][0] == "issuer":
-                            observable = stix2.File(
-                                issuer=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        elif (
-                            OPENCTISTIX2[observable_resolver]["path"][1]
-                            == "serial_number"
-                        ):
-                            observable = stix2.File(
-                                serial_number=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                    elif observable_type == "Phone-Number":
-                        observable = CustomObservablePhoneNumber(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Text":
-                        observable = CustomObservableText(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Identity":
-                        observable = stix2.Identity(
-                            id=Identity.generate_id(
-                                observable_value,
-                                OPENCTISTIX2[observable_resolver]["identity_class"],
-                            ),
-                            name=observable_value,
-                            identity_class=OPENCTISTIX2[observable_resolver][
-                                "identity_class"
-                            ],
-                            description=attribute["comment"],
-                            labels=attribute_tags,
-                            created_by_ref=author["id"],
-                            external_references=attribute_external_references,
-                        )
+                    observable = misp_engine.build_observable(
+                        observable_type,
+                        observable_resolver,
+                        observable_value,
+                        attribute_markings,
+                        custom_properties,
+                        file_name,
+                    )
                 except Exception as e:
                     self.helper.log_error(
                         f"Error creating observable type {observable_type} with value {observable_value}: {e}"
@@ -1780,6 +1661,8 @@ class Misp:
             "regions": [],
         }
         added_names = []
+        # Cached elements are only reused for the same author and markings
+        cache_context = (author["id"],) + tuple(marking["id"] for marking in markings)
         for galaxy in galaxies:
             # Get the linked intrusion sets
             if (
@@ -1810,14 +1693,21 @@ class Misp:
                         aliases = [name]
                     if name not in added_names and not is_uuid(name):
                         elements["intrusion_sets"].append(
-                            stix2.IntrusionSet(
-                                id=IntrusionSet.generate_id(name),
-                                name=name,
-                                labels=["intrusion-set"],
-                                description=galaxy_entity["description"],
-                                created_by_ref=author["id"],
-                                object_marking_refs=markings,
-                                custom_properties={"x_opencti_aliases": aliases},
+                            self.get_cached_element(
+                                (
+                                    "galaxy-intrusion-set",
+                                    galaxy_entity.get("uuid", name),
+                                )
+                                + cache_context,
+                                lambda: stix2.IntrusionSet(
+                                    id=IntrusionSet.generate_id(name),
+                                    name=name,
+                                    labels=["intrusion-set"],
+                                    description=galaxy_entity["description"],
+                                    created_by_ref=author["id"],
+                                    object_marking_refs=markings,
+                                    custom_properties={"x_opencti_aliases": aliases},
+                                ),
                             )
                         )
                         added_names.append(name)
@@ -1834,15 +1724,19 @@ class Misp:
                         aliases = [name]
                     if name not in added_names:
                         elements["tools"].append(
-                            stix2.Tool(
-                                id=Tool.generate_id(name),
-                                name=name,
-                                labels=["tool"],
-                                description=galaxy_entity["description"],
-                                created_by_ref=author["id"],
-                                object_marking_refs=markings,
-                                custom_properties={"x_opencti_aliases": aliases},
-                                allow_custom=True,
+                            self.get_cached_element(
+                                ("galaxy-tool", galaxy_entity.get("uuid", name))
+                                + cache_context,
+                                lambda: stix2.Tool(
+                                    id=Tool.generate_id(name),
+                                    name=name,
+                                    labels=["tool"],
+                                    description=galaxy_entity["description"],
+                                    created_by_ref=author["id"],
+                                    object_marking_refs=markings,
+                                    custom_properties={"x_opencti_aliases": aliases},
+                                    allow_custom=True,
+                                ),
                             )
                         )
                         added_names.append(name)
@@ -1865,16 +1759,24 @@ class Misp:
                         aliases = [name]
                     if name not in added_names:
                         elements["malwares"].append(
-                            stix2.Malware(
-                                id=Malware.generate_id(name),
-                                name=name,
-                                is_family=True,
-                                aliases=aliases,
-                                labels=[galaxy["name"]],
-                                description=galaxy_entity["description"],
-                                created_by_ref=author["id"],
-                                object_marking_refs=markings,
-                                allow_custom=True,
+                            self.get_cached_element(
+                                (
+                                    "galaxy-malware",
+                                    galaxy["name"],
+                                    galaxy_entity.get("uuid", name),
+                                )
+                                + cache_context,
+                                lambda: stix2.Malware(
+                                    id=Malware.generate_id(name),
+                                    name=name,
+                                    is_family=True,
+                                    aliases=aliases,
+                                    labels=[galaxy["name"]],
+                                    description=galaxy_entity["description"],
+                                    created_by_ref=author["id"],
+                                    object_marking_refs=markings,
+                                    allow_custom=True,
+                                ),
                             )
                         )
                         added_names.append(name)
@@ -1898,17 +1800,24 @@ class Misp:
                             if len(galaxy_entity["meta"]["external_id"]) > 0:
                                 x_mitre_id = galaxy_entity["meta"]["external_id"][0]
                         elements["attack_patterns"].append(
-                            stix2.AttackPattern(
-                                id=AttackPattern.generate_id(name, x_mitre_id),
-                                name=name,
-                                description=galaxy_entity["description"],
-                                created_by_ref=author["id"],
-                                object_marking_refs=markings,
-                                custom_properties={
-                                    "x_mitre_id": x_mitre_id,
-                                    "x_opencti_aliases": aliases,
-                                },
-                                allow_custom=True,
+                            self.get_cached_element(
+                                (
+                                    "galaxy-attack-pattern",
+                                    galaxy_entity.get("uuid", name),
+                                )
+                                + cache_context,
+                                lambda: stix2.AttackPattern(
+                                    id=AttackPattern.generate_id(name, x_mitre_id),
+                                    name=name,
+                                    description=galaxy_entity["description"],
+                                    created_by_ref=author["id"],
+                                    object_marking_refs=markings,
+                                    custom_properties={
+                                        "x_mitre_id": x_mitre_id,
+                                        "x_opencti_aliases": aliases,
+                                    },
+                                    allow_custom=True,
+                                ),
                             )
                         )
                         added_names.append(name)
@@ -1918,14 +1827,18 @@ class Misp:
                     name = galaxy_entity["value"]
                     if name not in added_names:
                         elements["sectors"].append(
-                            stix2.Identity(
-                                id=Identity.generate_id(name, "class"),
-                                name=name,
-                                identity_class="class",
-                                description=galaxy_entity["description"],
-                                created_by_ref=author["id"],
-                                object_marking_refs=markings,
-                                allow_custom=True,
+                            self.get_cached_element(
+                                ("galaxy-sector", galaxy_entity.get("uuid", name))
+                                + cache_context,
+                                lambda: stix2.Identity(
+                                    id=Identity.generate_id(name, "class"),
+                                    name=name,
+                                    identity_class="class",
+                                    description=galaxy_entity["description"],
+                                    created_by_ref=author["id"],
+                                    object_marking_refs=markings,
+                                    allow_custom=True,
+                                ),
                             )
                         )
                         added_names.append(name)
@@ -1936,14 +1849,18 @@ class Misp:
                     name = galaxy_entity["description"]
                     if name not in added_names:
                         elements["countries"].append(
-                            stix2.Location(
-                                id=Location.generate_id(name, "Country"),
-                                name=name,
-                                country=galaxy_entity["meta"]["ISO"],
-                                description="Imported from MISP tag",
-                                created_by_ref=author["id"],
-                                object_marking_refs=markings,
-                                allow_custom=True,
+                            self.get_cached_element(
+                                ("galaxy-country", galaxy_entity.get("uuid", name))
+                                + cache_context,
+                                lambda: stix2.Location(
+                                    id=Location.generate_id(name, "Country"),
+                                    name=name,
+                                    country=galaxy_entity["meta"]["ISO"],
+                                    description="Imported from MISP tag",
+                                    created_by_ref=author["id"],
+                                    object_marking_refs=markings,
+                                    allow_custom=True,
+                                ),
                             )
                         )
                         added_names.append(name)
@@ -1958,11 +1875,14 @@ class Misp:
                     name = galaxy_entity["value"].split(" - ")[1]
                     if name not in added_names:
                         elements["regions"].append(
-                            stix2.Location(
-                                id=Location.generate_id(name, "Region"),
-                                name=name,
-                                region=name,
-                                allow_custom=True,
+                            self.get_cached_element(
+                                ("galaxy-region", galaxy_entity.get("uuid", name)),
+                                lambda: stix2.Location(
+                                    id=Location.generate_id(name, "Region"),
+                                    name=name,
+                                    region=name,
+                                    allow_custom=True,
+                                ),
                             )
                         )
                         added_names.append(name)
@@ -2083,12 +2003,15 @@ class Misp:
                         name = tag_value
                     if name not in added_names and not is_uuid(name):
                         elements["intrusion_sets"].append(
-                            stix2.IntrusionSet(
-                                id=IntrusionSet.generate_id(name),
-                                name=name,
-                                created_by_ref=author["id"],
-                                object_marking_refs=markings,
-                                allow_custom=True,
+                            self.get_cached_element(
+                                ("tag-intrusion-set", tag["name"]) + cache_context,
+                                lambda: stix2.IntrusionSet(
+                                    id=IntrusionSet.generate_id(name),
+                                    name=name,
+                                    created_by_ref=author["id"],
+                                    object_marking_refs=markings,
+                                    allow_custom=True,
+                                ),
                             )
                         )
                         added_names.append(name)
@@ -2113,12 +2036,15 @@ class Misp:
                         name = tag_value
                     if name not in added_names:
                         elements["tools"].append(
-                            stix2.Tool(
-                                id=Tool.generate_id(name),
-                                name=name,
-                                created_by_ref=author["id"],
-                                object_marking_refs=markings,
-                                allow_custom=True,
+                            self.get_cached_element(
+                                ("tag-tool", tag["name"]) + cache_context,
+                                lambda: stix2.Tool(
+                                    id=Tool.generate_id(name),
+                                    name=name,
+                                    created_by_ref=author["id"],
+                                    object_marking_refs=markings,
+                                    allow_custom=True,
+                                ),
                             )
                         )
                         added_names.append(name)
@@ -2147,13 +2073,16 @@ class Misp:
                         name = tag_value
                     if name not in added_names:
                         elements["malwares"].append(
-                            stix2.Malware(
-                                id=Malware.generate_id(name),
-                                name=name,
-                                is_family=True,
-                                created_by_ref=author["id"],
-                                object_marking_refs=markings,
-                                allow_custom=True,
+                            self.get_cached_element(
+                                ("tag-malware", tag["name"]) + cache_context,
+                                lambda: stix2.Malware(
+                                    id=Malware.generate_id(name),
+                                    name=name,
+                                    is_family=True,
+                                    created_by_ref=author["id"],
+                                    object_marking_refs=markings,
+                                    allow_custom=True,
+                                ),
                             )
                         )
                         added_names.append(name)
@@ -2179,12 +2108,15 @@ class Misp:
                         name = tag_value
                     if name not in added_names:
                         elements["attack_patterns"].append(
-                            stix2.AttackPattern(
-                                id=AttackPattern.generate_id(name),
-                                name=name,
-                                created_by_ref=author["id"],
-                                object_marking_refs=markings,
-                                allow_custom=True,
+                            self.get_cached_element(
+                                ("tag-attack-pattern", tag["name"]) + cache_context,
+                                lambda: stix2.AttackPattern(
+                                    id=AttackPattern.generate_id(name),
+                                    name=name,
+                                    created_by_ref=author["id"],
+                                    object_marking_refs=markings,
+                                    allow_custom=True,
+                                ),
                             )
                         )
                         added_names.append(name)
@@ -2195,222 +2127,129 @@ class Misp:
                     name = tag_value_split[1][:-1].strip()
                     if name not in added_names:
                         elements["sectors"].append(
-                            stix2.Identity(
-                                id=Identity.generate_id(name, "class"),
-                                name=name,
-                                identity_class="class",
-                                created_by_ref=author["id"],
-                                object_marking_refs=markings,
-                                allow_custom=True,
+                            self.get_cached_element(
+                                ("tag-sector", tag["name"]) + cache_context,
+                                lambda: stix2.Identity(
+                                    id=Identity.generate_id(name, "class"),
+                                    name=name,
+                                    identity_class="class",
+                                    created_by_ref=author["id"],
+                                    object_marking_refs=markings,
+                                    allow_custom=True,
+                                ),
                             )
                         )
                         added_names.append(name)
         return elements
 
-    def resolve_type(self, type, value):
-        types = {
-            "yara": [{"resolver": "yara"}],
-            "sigma": [{"resolver": "sigma"}],
-            "snort": [{"resolver": "snort"}],
-            "suricata": [{"resolver": "suricata"}],
-            "md5": [{"resolver": "file-md5", "type": "File"}],
-            "sha1": [{"resolver": "file-sha1", "type": "File"}],
-            "sha256": [{"resolver": "file-sha256", "type": "File"}],
-            "filename": [{"resolver": "file-name", "type": "File"}],
-            "pdb": [{"resolver": "pdb-path", "type": "File"}],
-            "filename|md5": [
-                {"resolver": "file-name", "type": "File"},
-                {"resolver": "file-md5", "type": "File"},
-            ],
-            "filename|sha1": [
-                {"resolver": "file-name", "type": "File"},
-                {"resolver": "file-sha1", "type": "File"},
-            ],
-            "filename|sha256": [
-                {"resolver": "file-name", "type": "File"},
-                {"resolver": "file-sha256", "type": "File"},
-            ],
-            "ip-src": [{"resolver": "ipv4-addr", "type": "IPv4-Addr"}],
-            "ip-dst": [{"resolver": "ipv4-addr", "type": "IPv4-Addr"}],
-            "ip-src|port": [
-                {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
-                {"resolver": "text", "type": "Text"},
-            ],
-            "ip-dst|port": [
-                {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
-                {"resolver": "text", "type": "Text"},
-            ],
-            "hostname": [{"resolver": "hostname", "type": "Hostname"}],
-            "hostname|port": [
-                {"resolver": "hostname", "type": "Hostname"},
-                {"resolver": "text", "type": "Text"},
-            ],
-            "domain": [{"resolver": "domain", "type": "Domain-Name"}],
-            "domain|ip": [
-                {"resolver": "domain", "type": "Domain-Name"},
-                {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
-            ],
-            "email-subject": [{"resolver": "email-subject", "type": "Email-Message"}],
-            "email": [{"resolver": "email-address", "type": "Email-Addr"}],
-            "email-src": [{"resolver": "email-address", "type": "Email-Addr"}],
-            "email-dst": [{"resolver": "email-address", "type": "Email-Addr"}],
-            "url": [{"resolver": "url", "type": "Url"}],
-            "windows-scheduled-task": [
-                {"resolver": "windows-scheduled-task", "type": "Text"}
-            ],
-            "regkey": [{"resolver": "registry-key", "type": "Windows-Registry-Key"}],
-            "user-agent": [{"resolver": "user-agent", "type": "User-Agent"}],
-            "phone-number": [{"resolver": "phone-number", "type": "Phone-Number"}],
-            "whois-registrant-email": [
-                {"resolver": "email-address", "type": "Email-Addr"}
-            ],
-            "text": [{"resolver": "text", "type": "Text"}],
-            "github-username": [
-                {"resolver": "user-account-github", "type": "User-Account"}
-            ],
-            "full-name": [{"resolver": "identity-individual", "type": "Identity"}],
-        }
-        if type in types:
-            resolved_types = types[type]
-            if len(resolved_types) == 2:
-                values = value.split("|")
-                if len(values) == 2:
-                    if resolved_types[0]["resolver"] == "ipv4-addr":
-                        resolver_0 = self.detect_ip_version(values[0])
-                        type_0 = self.detect_ip_version(values[0], True)
-                    else:
-                        resolver_0 = resolved_types[0]["resolver"]
-                        type_0 = resolved_types[0]["type"]
-                    if resolved_types[1]["resolver"] == "ipv4-addr":
-                        resolver_1 = self.detect_ip_version(values[1])
-                        type_1 = self.detect_ip_version(values[1], True)
-                    else:
-                        resolver_1 = resolved_types[1]["resolver"]
-                        type_1 = resolved_types[1]["type"]
-                    return [
-                        {"resolver": resolver_0, "type": type_0, "value": values[0]},
-                        {"resolver": resolver_1, "type": type_1, "value": values[1]},
-                    ]
-                else:
-                    return None
-            else:
-                if (
-                    "resolver" in resolved_types[0]
-                    and resolved_types[0]["resolver"] == "ipv4-addr"
-                    or resolved_types[0] == "ipv4-addr"
-                ):
-                    resolver_0 = self.detect_ip_version(value)
-                    type_0 = self.detect_ip_version(value, True)
-                else:
-                    resolver_0 = resolved_types[0]["resolver"]
-                    type_0 = (
-                        resolved_types[0]["type"]
-                        if "type" in resolved_types[0]
-                        else None
-                    )
-                return [{"resolver": resolver_0, "type": type_0, "value": value}]
-        # If not found, return text observable as a fallback
-        if self.import_unsupported_observables_as_text:
-            return [
-                {
-                    "resolver": "text",
-                    "type": "Text",
-                    "value": value + " (type=" + type + ")",
-                }
-            ]
-        else:
-            return None
+    def get_cached_element(self, key, build):
+        # Galaxy clusters and tags are shared by many events, reuse what was already built
+        if self.misp_cache_size <= 0:
+            return build()
+        if key in self.elements_cache:
+            self.elements_cache.move_to_end(key)
+            self.inc_elements_cache_counter("hit")
+            return self.elements_cache[key]
+        self.inc_elements_cache_counter("miss")
+        element = build()
+        self.elements_cache[key] = element
+        if len(self.elements_cache) > self.misp_cache_size:
+            self.elements_cache.popitem(last=False)
+        return element
+
+    def inc_elements_cache_counter(self, name):
+        if name in self.elements_cache_counters:
+            self.elements_cache_counters[name].inc()
 
-    def detect_ip_version(self, value, type=False):
-        if re.match(
-            r"^((25[0-5]|(2[0-4]|1\d|[1-9]|)\d)\.?\b){4}(\/([1-9]|[1-2]\d|3[0-2]))?$",
-            value,
-        ):
-            if type:
-                return "IPv4-Addr"
-            return "ipv4-addr"
-        else:
-            if type:
-                return "IPv6-Addr"
-            return "ipv6-addr"
+    def resolve_type(self, type, value):
+        return misp_engine.resolve_type(
+            type, value, self.import_unsupported_observables_as_text, MISPTYPES
+        )
 
     def resolve_markings(self, tags, with_default=True):
         markings = []
         for tag in tags:
-            tag_name = tag["name"]
-            tag_name_lower = tag["name"].lower()
-            if self.misp_markings_from_tags:
-                if (
-                    ":" in tag_name
-                    and "=" in tag_name
-                    and tag_name_lower.startswith("marking")
-                ):
-                    marking_definition_split = tag_name.split(":")
-                    # Check if second part also contains ":"
-                    if len(marking_definition_split) > 2:
-                        # Example: marking:PAP=PAP:RED
-                        # "PAP=PAP" + "RED"
-                        marking_definition = (
-                            marking_definition_split[1]
-                            + ":"
-                            + marking_definition_split[2]
-                        )
-                    else:
-                        # Example: marking:CLASSIFICATION=DIFFUSION RESTREINTE
-                        # CLASSIFICATION=DIFFUSION RESTREINTE
-                        marking_definition = marking_definition_split[1]
+            markings.extend(
+                self.get_cached_element(
+                    ("tag-markings", tag["name"]),
+                    lambda: self.resolve_tag_markings(tag["name"]),
+                )
+            )
+        if len(markings) == 0 and with_default:
+            markings.append(marking_tlp_clear)
+        return markings
+
+    def resolve_tag_markings(self, tag_name):
+        markings = []
+        tag_name_lower = tag_name.lower()
+        if self.misp_markings_from_tags:
+            if (
+                ":" in tag_name
+                and "=" in tag_name
+                and tag_name_lower.startswith("marking")
+            ):
+                marking_definition_split = tag_name.split(":")
+                # Check if second part also contains ":"
+                if len(marking_definition_split) > 2:
+                    # Example: marking:PAP=PAP:RED
+                    # "PAP=PAP" + "RED"
+                    marking_definition = (
+                        marking_definition_split[1] + ":" + marking_definition_split[2]
+                    )
+                else:
+                    # Example: marking:CLASSIFICATION=DIFFUSION RESTREINTE
+                    # CLASSIFICATION=DIFFUSION RESTREINTE
+                    marking_definition = marking_definition_split[1]
 
-                    # Split on the equal
-                    marking_definition_split2 = marking_definition.split("=")
+                # Split on the equal
+                marking_definition_split2 = marking_definition.split("=")
 
-                    # PAP
-                    # CLASSIFICATION
-                    marking_type = marking_definition_split2[0]
+                # PAP
+                # CLASSIFICATION
+                marking_type = marking_definition_split2[0]
 
-                    # PAP:RED
-                    # DIFFUSION RESTREINTE
-                    marking_name = marking_definition_split2[1]
+                # PAP:RED
+                # DIFFUSION RESTREINTE
+                marking_name = marking_definition_split2[1]
 
-                    marking = stix2.MarkingDefinition(
-                        id=MarkingDefinition.generate_id(marking_type, marking_name),
-                        definition_type="statement",
-                        definition={"statement": "custom"},
-                        allow_custom=True,
-                        x_opencti_definition_type=marking_type,
-                        x_opencti_definition=marking_name,
-                    )
-                    markings.append(marking)
-            if tag_name_lower == "tlp:clear":
-                markings.append(marking_tlp_clear)
-            if tag_name_lower == "tlp:white":
-                markings.append(marking_tlp_clear)
-            if tag_name_lower == "tlp:green":
-                markings.append(stix2.TLP_GREEN)
-            if tag_name_lower == "tlp:amber":
-                markings.append(stix2.TLP_AMBER)
-            if tag_name_lower == "tlp:amber+strict":
                 marking = stix2.MarkingDefinition(
-                    id=MarkingDefinition.generate_id("TLP", "TLP:AMBER+STRICT"),
+                    id=MarkingDefinition.generate_id(marking_type, marking_name),
                     definition_type="statement",
                     definition={"statement": "custom"},
                     allow_custom=True,
-                    x_opencti_definition_type="TLP",
-                    x_opencti_definition="TLP:AMBER+STRICT",
+                    x_opencti_definition_type=marking_type,
+                    x_opencti_definition=marking_name,
                 )
                 markings.append(marking)
-            if tag_name_lower == "tlp:red":
-                markings.append(stix2.TLP_RED)
-            # handle PAP markings
-            if tag_name_lower == "pap:clear":
-                markings.append(marking_pap_clear)
-            if tag_name_lower == "pap:green":
-                markings.append(marking_pap_green)
-            if tag_name_lower == "pap:amber":
-                markings.append(marking_pap_amber)
-            if tag_name_lower == "pap:red":
-                markings.append(marking_pap_red)
-        if len(markings) == 0 and with_default:
+        if tag_name_lower == "tlp:clear":
+            markings.append(marking_tlp_clear)
+        if tag_name_lower == "tlp:white":
             markings.append(marking_tlp_clear)
+        if tag_name_lower == "tlp:green":
+            markings.append(stix2.TLP_GREEN)
+        if tag_name_lower == "tlp:amber":
+            markings.append(stix2.TLP_AMBER)
+        if tag_name_lower == "tlp:amber+strict":
+            marking = stix2.MarkingDefinition(
+                id=MarkingDefinition.generate_id("TLP", "TLP:AMBER+STRICT"),
+                definition_type="statement",
+                definition={"statement": "custom"},
+                allow_custom=True,
+                x_opencti_definition_type="TLP",
+                x_opencti_definition="TLP:AMBER+STRICT",
+            )
+            markings.append(marking)
+        if tag_name_lower == "tlp:red":
+            markings.append(stix2.TLP_RED)
+        # handle PAP markings
+        if tag_name_lower == "pap:clear":
+            markings.append(marking_pap_clear)
+        if tag_name_lower == "pap:green":
+            markings.append(marking_pap_green)
+        if tag_name_lower == "pap:amber":
+            markings.append(marking_pap_amber)
+        if tag_name_lower == "pap:red":
+            markings.append(marking_pap_red)
         return markings
 
     def resolve_tags(self, tags):
@@ -2421,103 +2260,115 @@ class Misp:
 
         for tag in tags:
             self.helper.log_info(f"found tag: {tag}")
-            tag_name_lower = tag["name"].lower()
-            # we take the tag as-is if it starts by a prefix stored in the keep_original_tags_as_label configuration
-            if any(
-                map(
-                    lambda s: tag["name"].startswith(s),
-                    self.keep_original_tags_as_label,
-                )
-            ):
-                self.helper.log_info(f"keeping raw tag: {tag}")
-                opencti_tags.append(tag["name"])
-
-            elif (
-                tag_name_lower != "tlp:white"
-                and tag_name_lower != "tlp:clear"
-                and tag_name_lower != "tlp:green"
-                and tag_name_lower != "tlp:amber"
-                and tag_name_lower != "tlp:amber+strict"
-                and tag_name_lower != "tlp:red"
-                and tag_name_lower != "pap:clear"
-                and tag_name_lower != "pap:green"
-                and tag_name_lower != "pap:amber"
-                and tag_name_lower != "pap:red"
-                and not tag["name"].startswith("misp-galaxy:threat-actor")
-                and not tag["name"].startswith("misp-galaxy:mitre-threat-actor")
-                and not tag["name"].startswith("misp-galaxy:microsoft-activity-group")
-                and not tag["name"].startswith(
-                    "misp-galaxy:mitre-enterprise-attack-threat-actor"
-                )
-                and not tag["name"].startswith(
-                    "misp-galaxy:mitre-mobile-attack-intrusion-set"
-                )
-                and not tag["name"].startswith("misp-galaxy:mitre-intrusion-set")
-                and not tag["name"].startswith(
-                    "misp-galaxy:mitre-enterprise-attack-intrusion-set"
-                )
-                and not tag["name"].startswith("misp-galaxy:mitre-malware")
-                and not tag["name"].startswith(
-                    "misp-galaxy:mitre-enterprise-attack-malware"
-                )
-                and not tag["name"].startswith("misp-galaxy:mitre-attack-pattern")
-                and not tag["name"].startswith(
-                    "misp-galaxy:mitre-enterprise-attack-attack-pattern"
-                )
-                and not tag["name"].startswith("misp-galaxy:mitre-tool")
-                and not tag["name"].startswith("misp-galaxy:tool")
-                and not tag["name"].startswith("misp-galaxy:ransomware")
-                and not tag["name"].startswith("misp-galaxy:malpedia")
-                and not tag["name"].startswith("misp-galaxy:sector")
-                and not tag["name"].startswith("misp-galaxy:country")
-                and not tag["name"].startswith("misp-galaxy:region")
-                and not tag["name"].startswith("marking")
-                and not tag["name"].startswith("creator")
-                and not tag["name"].startswith("intrusion-set")
-                and not tag["name"].startswith("malware")
-                and not tag["name"].startswith("tool")
-                and not tag["name"].startswith("mitre")
-            ):
-                tag_value = tag["name"]
-                if '="' in tag["name"]:
-                    tag_value_split = tag["name"].split('="')
-                    if len(tag_value_split) > 1 and len(tag_value_split[1]) > 0:
-                        tag_value = tag_value_split[1][:-1].strip()
-                elif ":" in tag["name"]:
-                    tag_value_split = tag["name"].split(":")
-                    if len(tag_value_split) > 1 and len(tag_value_split[1]) > 0:
-                        tag_value = tag_value_split[1].strip()
-                if tag_value.isdigit():
-                    if ":" in tag["name"]:
-                        tag_value_split = tag["name"].split(":")
-                        if len(tag_value_split) > 1 and len(tag_value_split[1]) > 0:
-                            tag_value = tag_value_split[1].strip()
-                    else:
-                        tag_value = tag["name"]
-                if '="' in tag_value:
-                    if len(tag_value) > 0:
-                        tag_value = tag_value.replace('="', "-")[:-1]
-                opencti_tags.append(tag_value)
+            tag_label = self.get_cached_element(
+                ("tag-label", tag["name"]),
+                lambda: self.resolve_tag_label(tag["name"]),
+            )
+            if tag_label is not None:
+                opencti_tags.append(tag_label)
         return opencti_tags
 
-    def find_type_by_uuid(self, uuid, bundle_objects):
-        # filter by uuid
-        i_result = list(filter(lambda o: o.id.endswith("--" + uuid), bundle_objects))
+    def resolve_tag_label(self, tag_name):
+        tag_name_lower = tag_name.lower()
+        # we take the tag as-is if it starts by a prefix stored in the keep_original_tags_as_label configuration
+        if any(
+            map(
+                lambda s: tag_name.startswith(s),
+                self.keep_original_tags_as_label,
+            )
+        ):
+            self.helper.log_info(f"keeping raw tag: {tag_name}")
+            return tag_name
+
+        elif (
+            tag_name_lower != "tlp:white"
+            and tag_name_lower != "tlp:clear"
+            and tag_name_lower != "tlp:green"
+            and tag_name_lower != "tlp:amber"
+            and tag_name_lower != "tlp:amber+strict"
+            and tag_name_lower != "tlp:red"
+            and tag_name_lower != "pap:clear"
+            and tag_name_lower != "pap:green"
+            and tag_name_lower != "pap:amber"
+            and tag_name_lower != "pap:red"
+            and not tag_name.startswith("misp-galaxy:threat-actor")
+            and not tag_name.startswith("misp-galaxy:mitre-threat-actor")
+            and not tag_name.startswith("misp-galaxy:microsoft-activity-group")
+            and not tag_name.startswith(
+                "misp-galaxy:mitre-enterprise-attack-threat-actor"
+            )
+            and not tag_name.startswith("misp-galaxy:mitre-mobile-attack-intrusion-set")
+            and not tag_name.startswith("misp-galaxy:mitre-intrusion-set")
+            and not tag_name.startswith(
+                "misp-galaxy:mitre-enterprise-attack-intrusion-set"
+            )
+            and not tag_name.startswith("misp-galaxy:mitre-malware")
+            and not tag_name.startswith("misp-galaxy:mitre-enterprise-attack-malware")
+            and not tag_name.startswith("misp-galaxy:mitre-attack-pattern")
+            and not tag_name.startswith(
+                "misp-galaxy:mitre-enterprise-attack-attack-pattern"
+            )
+            and not tag_name.startswith("misp-galaxy:mitre-tool")
+            and not tag_name.startswith("misp-galaxy:tool")
+            and not tag_name.startswith("misp-galaxy:ransomware")
+            and not tag_name.startswith("misp-galaxy:malpedia")
+            and not tag_name.startswith("misp-galaxy:sector")
+            and not tag_name.startswith("misp-galaxy:country")
+            and not tag_name.startswith("misp-galaxy:region")
+            and not tag_name.startswith("marking")
+            and not tag_name.startswith("creator")
+            and not tag_name.startswith("intrusion-set")
+            and not tag_name.startswith("malware")
+            and not tag_name.startswith("tool")
+            and not tag_name.startswith("mitre")
+        ):
+            tag_value = tag_name
+            if '="' in tag_name:
+                tag_value_split = tag_name.split('="')
+                if len(tag_value_split) > 1 and len(tag_value_split[1]) > 0:
+                    tag_value = tag_value_split[1][:-1].strip()
+            elif ":" in tag_name:
+                tag_value_split = tag_name.split(":")
+                if len(tag_value_split) > 1 and len(tag_value_split[1]) > 0:
+                    tag_value = tag_value_split[1].strip()
+            if tag_value.isdigit():
+                if ":" in tag_name:
+                    tag_value_split = tag_name.split(":")
+                    if len(tag_value_split) > 1 and len(tag_value_split[1]) > 0:
+                        tag_value = tag_value_split[1].strip()
+                else:
+                    tag_value = tag_name
+            if '="' in tag_value:
+                if len(tag_value) > 0:
+                    tag_value = tag_value.replace('="', "-")[:-1]
+            return tag_value
+        return None
 
-        if len(i_result) > 0:
-            uuid = i_result[0]["id"]
+    def index_by_uuid(self, bundle_objects, uuid_index=None):
+        # index objects by the uuid part of their id, first object wins
+        if uuid_index is None:
+            uuid_index = {}
+        for bundle_object in bundle_objects:
+            object_id = bundle_object["id"]
+            uuid_index.setdefault(object_id[object_id.index("--") + 2 :], bundle_object)
+        return uuid_index
+
+    def find_type_by_uuid(self, uuid, uuid_index):
+        entity = uuid_index.get(uuid)
+        if entity is not None:
+            uuid = entity["id"]
             return {
-                "entity": i_result[0],
+                "entity": entity,
                 "type": uuid[: uuid.index("--")],
             }
         return None
 
     # Markdown object, attribute & tag links should be converted from MISP links to OpenCTI links
-    def process_note(self, content, bundle_objects):
+    def process_note(self, content, uuid_index):
         def reformat(match):
             type = match.group(1)
             uuid = match.group(2)
-            result = self.find_type_by_uuid(uuid, bundle_objects)
+            result = self.find_type_by_uuid(uuid, uuid_index)
             if result is None:
                 return "[{}:{}](/dashboard/search/{})".format(type, uuid, uuid)
             if result["type"] == "indicator":
@@ -0,0 +1,12 @@
+import sys
+from pathlib import Path
+
+src_dir = str(Path(__file__).parent.parent.joinpath("src").absolute())
+# misp_engine.py is shared with other connectors
+engine_dir = str(
+    Path(__file__).parent.parent.parent.parent.joinpath("shared", "misp_engine")
+)
+
+for path in (engine_dir, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
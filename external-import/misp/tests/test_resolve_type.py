@@ -0,0 +1,29 @@
+from misp import Misp
+
+
+def build_connector(unsupported_as_text):
+    connector = Misp.__new__(Misp)
+    connector.import_unsupported_observables_as_text = unsupported_as_text
+    return connector
+
+
+def test_snort_and_suricata_are_imported_as_patterns():
+    connector = build_connector(False)
+
+    assert connector.resolve_type("snort", "alert tcp any any -> any any") == [
+        {"resolver": "snort", "type": None, "value": "alert tcp any any -> any any"}
+    ]
+    assert connector.resolve_type("suricata", "alert http any any -> any any") == [
+        {
+            "resolver": "suricata",
+            "type": None,
+            "value": "alert http any any -> any any",
+        }
+    ]
+
+
+def test_unsupported_types_follow_the_configuration():
+    assert build_connector(False).resolve_type("btc", "x") is None
+    assert build_connector(True).resolve_type("btc", "x") == [
+        {"resolver": "text", "type": "Text", "value": "x (type=btc)"}
+    ]
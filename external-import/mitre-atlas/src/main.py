@@ -1,7 +1,6 @@
 """MITRE ATLAS connector module."""
 
 import os
-import ssl
 import sys
 import time
 import urllib
@@ -9,6 +8,7 @@ from datetime import datetime
 from typing import Optional
 
 import yaml
+from download_cache import DownloadCache
 from pycti import OpenCTIConnectorHelper, get_config_variable
 
 
@@ -36,6 +36,14 @@ class MitreAtlas:
             ["connector", "update_existing_data"],
             config,
         )
+        self.download_cache = DownloadCache(
+            get_config_variable(
+                "MITRE_ATLAS_DOWNLOAD_CACHE_DIR",
+                ["mitre_atlas", "download_cache_dir"],
+                config,
+                default=os.path.dirname(os.path.abspath(__file__)) + "/cache",
+            )
+        )
 
     def get_interval(self):
         return int(self.mitre_atlas_interval) * 60 * 60 * 24
@@ -52,17 +60,15 @@ class MitreAtlas:
         Returns
         -------
         str
-            A string with the content or None in case of failure.
+            A string with the content or None in case of failure or if it did
+            not change since the last run.
         """
         try:
-            return (
-                urllib.request.urlopen(
-                    url,
-                    context=ssl.create_default_context(),
-                )
-                .read()
-                .decode("utf-8")
-            )
+            content = self.download_cache.fetch(url)
+            if content is None:
+                self.helper.log_info(f"{url} not modified, skipping")
+                return None
+            return content.decode("utf-8")
         except (
             urllib.error.URLError,
             urllib.error.HTTPError,
@@ -92,18 +98,26 @@ class MitreAtlas:
             ):
                 self.helper.log_info("Connector will run!")
 
-                now = datetime.utcfromtimestamp(timestamp)
-                friendly_name = "MITRE ATLAS run @ " + now.strftime("%Y-%m-%d %H:%M:%S")
-                work_id = self.helper.api.work.initiate_work(
-                    self.helper.connect_id, friendly_name
-                )
                 # Get MITRE ATLAS STIX 2.1 JSON data
+                atlas_data = None
                 if (
                     self.mitre_atlas_file_url is not None
                     and len(self.mitre_atlas_file_url) > 0
                 ):
                     atlas_data = self.retrieve_data(self.mitre_atlas_file_url)
-                    self.send_bundle(work_id, atlas_data)
+
+                # Only initiate a work if the data changed since the last run
+                work_id = None
+                if atlas_data is not None:
+                    now = datetime.utcfromtimestamp(timestamp)
+                    friendly_name = "MITRE ATLAS run @ " + now.strftime(
+                        "%Y-%m-%d %H:%M:%S"
+                    )
+                    work_id = self.helper.api.work.initiate_work(
+                        self.helper.connect_id, friendly_name
+                    )
+                    if self.send_bundle(work_id, atlas_data):
+                        self.download_cache.save()
 
                 # Store the current timestamp as a last run
                 message = "Connector successfully run, storing last_run as " + str(
@@ -111,7 +125,8 @@ class MitreAtlas:
                 )
                 self.helper.log_info(message)
                 self.helper.set_state({"last_run": timestamp})
-                self.helper.api.work.to_processed(work_id, message)
+                if work_id is not None:
+                    self.helper.api.work.to_processed(work_id, message)
                 self.helper.log_info(
                     "Last_run stored, next run in: "
                     + str(round(self.get_interval() / 60 / 60 / 24, 2))
@@ -141,7 +156,7 @@ class MitreAtlas:
                 self.process_data()
                 time.sleep(60)
 
-    def send_bundle(self, work_id: str, serialized_bundle: str) -> None:
+    def send_bundle(self, work_id: str, serialized_bundle: str) -> bool:
         try:
             self.helper.send_stix2_bundle(
                 serialized_bundle,
@@ -149,8 +164,10 @@ class MitreAtlas:
                 update=self.update_existing_data,
                 work_id=work_id,
             )
+            return True
         except Exception as e:
             self.helper.log_error(f"Error while sending bundle: {e}")
+        return False
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+"""
+Benchmark of the filtering of the revoked objects of the MITRE bundles.
+
+Time, for each of the ATT&CK Enterprise, Mobile, ICS and CAPEC bundles, the
+previous filters, each walking the whole bundle, and the single pass of
+clean_stix_objects, then check that both keep the same objects. The bundles
+are downloaded to the cache directory, or generated with the size of the real
+ones with --synthetic, for instance when offline.
+
+Usage: python benchmark/benchmark_revoked_filter.py [--cache-dir bundles] [--synthetic]
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+import urllib.request
+import uuid
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, "..", "src"))
+# download_cache.py is shared with other connectors
+sys.path.insert(
+    0, os.path.join(BENCHMARK_DIR, "..", "..", "..", "shared", "download_cache")
+)
+
+# pylint:disable=wrong-import-position
+from connector import (  # noqa: E402
+    MITRE_CAPEC_FILE_URL,
+    MITRE_ENTERPRISE_FILE_URL,
+    MITRE_ICS_ATTACK_FILE_URL,
+    MITRE_MOBILE_ATTACK_FILE_URL,
+    STATEMENT_MARKINGS,
+    clean_stix_objects,
+)
+
+# Bundle name: (url, number of objects of the real bundle)
+BUNDLES = {
+    "enterprise": (MITRE_ENTERPRISE_FILE_URL, 23700),
+    "mobile": (MITRE_MOBILE_ATTACK_FILE_URL, 3300),
+    "ics": (MITRE_ICS_ATTACK_FILE_URL, 2100),
+    "capec": (MITRE_CAPEC_FILE_URL, 3500),
+}
+TLP_WHITE = "marking-definition--613f2e26-407d-48c7-9eca-b8e91df99dc9"
+
+
+def download_bundle(url: str, path: str) -> dict:
+    """Download a bundle once to the cache directory"""
+
+    if not os.path.isfile(path):
+        print(f"Downloading {url}")
+        urllib.request.urlretrieve(url, path)
+    with open(path, encoding="utf-8") as fd:
+        return json.load(fd)
+
+
+def generate_bundle(size: int) -> dict:
+    """Build a bundle with the share of revoked objects and relationships of
+    the real ones"""
+
+    rand = random.Random(size)
+    markings = [TLP_WHITE, *sorted(STATEMENT_MARKINGS)]
+    objects = [{"type": "marking-definition", "id": marking} for marking in markings]
+    sdo_ids = []
+    for _ in range(size // 3):
+        sdo = {
+            "type": "attack-pattern",
+            "id": f"attack-pattern--{uuid.UUID(int=rand.getrandbits(128))}",
+            "object_marking_refs": [rand.choice(markings)],
+        }
+        if rand.random() < 0.1:
+            sdo["revoked"] = True
+        elif rand.random() < 0.05:
+            sdo["x_capec_status"] = "Deprecated"
+        objects.append(sdo)
+        sdo_ids.append(sdo["id"])
+    while len(objects) < size:
+        objects.append(
+            {
+                "type": "relationship",
+                "id": f"relationship--{uuid.UUID(int=rand.getrandbits(128))}",
+                "source_ref": rand.choice(sdo_ids),
+                "target_ref": rand.choice(sdo_ids),
+                "object_marking_refs": [TLP_WHITE, rand.choice(markings)],
+            }
+        )
+    return {"type": "bundle", "objects": objects}
+
+
+def previous_clean_stix_objects(stix_objects: list, remove_statement_marking: bool):
+    """Previous filters, each walking the whole bundle"""
+
+    revoked_objects = list(
+        filter(
+            lambda stix: stix.get("revoked", False) is True
+            or stix.get("x_capec_status", "") == "Deprecated",
+            stix_objects,
+        )
+    )
+    revoked_ids = list(map(lambda stix: stix["id"], revoked_objects))
+
+    def filter_stix_revoked(stix):
+        if stix["id"] in revoked_ids:
+            return False
+        if stix["type"] == "relationship" and (
+            stix["source_ref"] in revoked_ids or stix["target_ref"] in revoked_ids
+        ):
+            return False
+        if stix["type"] == "sighting" and (
+            stix["sighting_of_ref"] in revoked_ids
+            or any(ref in revoked_ids for ref in stix["where_sighted_refs"])
+        ):
+            return False
+        return True
+
+    stix_objects = list(filter(filter_stix_revoked, stix_objects))
+    if remove_statement_marking:
+        stix_objects = list(
+            filter(lambda stix: stix["id"] not in STATEMENT_MARKINGS, stix_objects)
+        )
+        for obj in stix_objects:
+            if "object_marking_refs" in obj:
+                new_markings = [
+                    ref
+                    for ref in obj["object_marking_refs"]
+                    if ref not in STATEMENT_MARKINGS
+                ]
+                if len(new_markings) == 0:
+                    del obj["object_marking_refs"]
+                else:
+                    obj["object_marking_refs"] = new_markings
+    return stix_objects
+
+
+def measure(clean, stix_objects: list) -> tuple:
+    """Clean a copy of the objects, return the elapsed seconds and the result"""
+
+    objects_copy = copy.deepcopy(stix_objects)
+    start = time.perf_counter()
+    cleaned_objects = clean(objects_copy, True)
+    return time.perf_counter() - start, cleaned_objects
+
+
+def main() -> None:
+    """Run the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--cache-dir", default="mitre_bundles")
+    parser.add_argument("--synthetic", action="store_true")
+    args = parser.parse_args()
+
+    if not args.synthetic:
+        os.makedirs(args.cache_dir, exist_ok=True)
+
+    for name, (url, size) in BUNDLES.items():
+        if args.synthetic:
+            bundle = generate_bundle(size)
+        else:
+            bundle = download_bundle(url, os.path.join(args.cache_dir, f"{name}.json"))
+        stix_objects = bundle["objects"]
+
+        previous_time, previous_objects = measure(
+            previous_clean_stix_objects, stix_objects
+        )
+        single_time, single_objects = measure(clean_stix_objects, stix_objects)
+        assert previous_objects == single_objects, f"{name}: the results differ"
+        print(
+            f"{name:>10} ({len(stix_objects)} objects, {len(single_objects)} kept): "
+            f"{previous_time:.3f}s -> {single_time:.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
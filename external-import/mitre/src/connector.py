@@ -1,6 +1,5 @@
 import json
 import os
-import ssl
 import sys
 import time
 import urllib
@@ -8,6 +7,7 @@ from datetime import datetime
 from typing import Optional
 
 import yaml
+from download_cache import DownloadCache
 from pycti import OpenCTIConnectorHelper, get_config_variable
 
 MITRE_ENTERPRISE_FILE_URL = "https://raw.githubusercontent.com/mitre-attack/attack-stix-data/master/enterprise-attack/enterprise-attack.json"
@@ -17,10 +17,13 @@ MITRE_CAPEC_FILE_URL = (
     "https://raw.githubusercontent.com/mitre/cti/master/capec/2.1/stix-capec.json"
 )
 
-STATEMENT_MARKINGS = [
+SENT_INDEX_FILE = "sent_index.json"
+DOWNLOAD_CACHE_DIR = "cache"
+
+STATEMENT_MARKINGS = {
     "marking-definition--fa42a846-8d90-4e51-bc29-71d5b4802168",
     "marking-definition--17d82bb2-eeeb-4898-bda5-3ddbcd2b799d",
-]
+}
 
 
 def time_from_unixtime(timestamp):
@@ -37,7 +40,14 @@ def days_to_seconds(days):
     return int(days) * 24 * 60 * 60
 
 
-def filter_stix_revoked(revoked_ids, stix):
+def is_stix_revoked(stix):
+    return (
+        stix.get("revoked", False) is True
+        or stix.get("x_capec_status", "") == "Deprecated"
+    )
+
+
+def filter_stix_revoked(revoked_ids: set, stix):
     # Pure revoke
     if stix["id"] in revoked_ids:
         return False
@@ -49,12 +59,79 @@ def filter_stix_revoked(revoked_ids, stix):
     # Side of sighting revoked
     if stix["type"] == "sighting" and (
         stix["sighting_of_ref"] in revoked_ids
-        or any(ref in revoked_ids for ref in stix["where_sighted_refs"])
+        or not revoked_ids.isdisjoint(stix["where_sighted_refs"])
     ):
         return False
     return True
 
 
+def clean_stix_objects(stix_objects: list, remove_statement_marking: bool) -> list:
+    """
+    Remove the revoked objects and the relationships and sightings to them and,
+    if asked, the statement markings, in a single pass over the objects.
+    """
+    revoked_ids = {stix["id"] for stix in stix_objects if is_stix_revoked(stix)}
+    cleaned_objects = []
+    for stix in stix_objects:
+        if not filter_stix_revoked(revoked_ids, stix):
+            continue
+        if remove_statement_marking:
+            if stix["id"] in STATEMENT_MARKINGS:
+                continue
+            if "object_marking_refs" in stix:
+                new_markings = [
+                    ref
+                    for ref in stix["object_marking_refs"]
+                    if ref not in STATEMENT_MARKINGS
+                ]
+                if len(new_markings) == 0:
+                    del stix["object_marking_refs"]
+                else:
+                    stix["object_marking_refs"] = new_markings
+        cleaned_objects.append(stix)
+    return cleaned_objects
+
+
+def get_stix_refs(stix) -> set:
+    refs = set()
+    for key, value in stix.items():
+        if key.endswith("_ref") and isinstance(value, str):
+            refs.add(value)
+        elif key.endswith("_refs") and isinstance(value, list):
+            refs.update(ref for ref in value if isinstance(ref, str))
+    return refs
+
+
+def select_stix_delta(stix_objects: list, sent_index: dict) -> list:
+    """
+    Select the objects that are new or modified since they were last sent,
+    along with the relationships and sightings to them and every object they
+    reference, so that the delta can be ingested on its own.
+    """
+    objects_by_id = {stix["id"]: stix for stix in stix_objects}
+    changed_ids = {
+        stix["id"]
+        for stix in stix_objects
+        if stix["id"] not in sent_index
+        or sent_index[stix["id"]] != stix.get("modified")
+    }
+    selected_ids = set(changed_ids)
+    # Relationships and sightings to a changed object
+    for stix in stix_objects:
+        if stix["type"] in ("relationship", "sighting") and not changed_ids.isdisjoint(
+            get_stix_refs(stix)
+        ):
+            selected_ids.add(stix["id"])
+    # Objects referenced by the selected ones
+    pending_ids = list(selected_ids)
+    while pending_ids:
+        for ref in get_stix_refs(objects_by_id[pending_ids.pop()]):
+            if ref in objects_by_id and ref not in selected_ids:
+                selected_ids.add(ref)
+                pending_ids.append(ref)
+    return [stix for stix in stix_objects if stix["id"] in selected_ids]
+
+
 class Mitre:
     """Mitre connector."""
 
@@ -106,6 +183,30 @@ class Mitre:
             ),
         ]
         self.mitre_urls = list(filter(lambda url: url is not False, urls))
+        self.mitre_full_resend = get_config_variable(
+            "MITRE_FULL_RESEND",
+            ["mitre", "full_resend"],
+            config,
+            default=False,
+        )
+        self.download_cache = DownloadCache(
+            get_config_variable(
+                "MITRE_DOWNLOAD_CACHE_DIR",
+                ["mitre", "download_cache_dir"],
+                config,
+                default=os.path.join(
+                    os.path.dirname(os.path.abspath(__file__)), DOWNLOAD_CACHE_DIR
+                ),
+            )
+        )
+        self.mitre_sent_index_path = get_config_variable(
+            "MITRE_SENT_INDEX_PATH",
+            ["mitre", "sent_index_path"],
+            config,
+            default=os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), SENT_INDEX_FILE
+            ),
+        )
         self.interval = days_to_seconds(self.mitre_interval)
 
     def retrieve_data(self, url: str) -> Optional[dict]:
@@ -119,47 +220,33 @@ class Mitre:
 
         Returns
         -------
-        str
-            A string with the content or None in case of failure.
+        dict
+            The cleaned bundle or None in case of failure or if it did not
+            change since the last run.
         """
         try:
-            # Fetch json bundle from MITRE
-            serialized_bundle = (
-                urllib.request.urlopen(
-                    url,
-                    context=ssl.create_default_context(),
-                )
-                .read()
-                .decode("utf-8")
-            )
+            # Fetch json bundle from MITRE, if it changed since the last run
+            content = self.download_cache.fetch(url)
+            if content is None:
+                if not self.mitre_full_resend:
+                    self.helper.log_info(f"{url} not modified, skipping")
+                    return None
+                self.helper.log_info(f"{url} not modified, replaying cached file")
+                content = self.download_cache.load(url)
+            serialized_bundle = content.decode("utf-8")
             # Convert the data to python dictionary
+            start_time = time.perf_counter()
             stix_bundle = json.loads(serialized_bundle)
             stix_objects = stix_bundle["objects"]
-            # First find all revoked ids
-            revoked_objects = list(
-                filter(
-                    lambda stix: stix.get("revoked", False) is True
-                    or stix.get("x_capec_status", "") == "Deprecated",
-                    stix_objects,
-                )
+            # Filter every revoked MITRE elements and remove statement marking
+            stix_bundle["objects"] = clean_stix_objects(
+                stix_objects, self.mitre_remove_statement_marking
             )
-            revoked_ids = list(map(lambda stix: stix["id"], revoked_objects))
-            # Filter every revoked MITRE elements
-            not_revoked_objects = list(
-                filter(
-                    lambda stix: filter_stix_revoked(revoked_ids, stix), stix_objects
-                )
+            self.helper.log_info(
+                f"Processed {url}: {len(stix_bundle['objects'])} of "
+                f"{len(stix_objects)} objects kept in "
+                f"{time.perf_counter() - start_time:.2f}s"
             )
-            stix_bundle["objects"] = not_revoked_objects
-            # Remove statement marking
-            if self.mitre_remove_statement_marking:
-                stix_objects = stix_bundle["objects"]
-                stix_bundle["objects"] = list(
-                    filter(
-                        lambda stix: stix["id"] not in STATEMENT_MARKINGS, stix_objects
-                    )
-                )
-                self.remove_statement_marking(stix_bundle)
             return stix_bundle
         except (
             urllib.error.URLError,
@@ -170,17 +257,26 @@ class Mitre:
             self.helper.metric.inc("client_error_count")
         return None
 
-    def remove_statement_marking(self, stix_bundle: dict):
-        for obj in stix_bundle["objects"]:
-            if "object_marking_refs" in obj:
-                new_markings = []
-                for ref in obj["object_marking_refs"]:
-                    if ref not in STATEMENT_MARKINGS:
-                        new_markings.append(ref)
-                if len(new_markings) == 0:
-                    del obj["object_marking_refs"]
-                else:
-                    obj["object_marking_refs"] = new_markings
+    def load_sent_index(self) -> dict:
+        """
+        Load the `id -> modified` index of the objects already sent.
+        """
+        if not os.path.isfile(self.mitre_sent_index_path):
+            return {}
+        try:
+            with open(self.mitre_sent_index_path, encoding="utf8") as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            self.helper.log_warning(
+                f"Unable to load the sent objects index, sending everything: {e}"
+            )
+            return {}
+
+    def save_sent_index(self, sent_index: dict):
+        tmp_path = f"{self.mitre_sent_index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf8") as file:
+            json.dump(sent_index, file)
+        os.replace(tmp_path, self.mitre_sent_index_path)
 
     def process_data(self):
         unixtime_now = get_unixtime_now()
@@ -198,10 +294,9 @@ class Mitre:
         self.helper.metric.inc("run_count")
         self.helper.metric.state("running")
 
-        friendly_name = f"MITRE run @ {time_now}"
-        work_id = self.helper.api.work.initiate_work(
-            self.helper.connect_id, friendly_name
-        )
+        # The work is only initiated once there is something to send
+        work_id = None
+        sent_index = self.load_sent_index()
 
         self.helper.log_info("Fetching MITRE datasets...")
         for url in self.mitre_urls:
@@ -211,17 +306,38 @@ class Mitre:
             if not data:
                 continue
 
-            self.helper.send_stix2_bundle(
-                json.dumps(data),
-                entities_types=self.helper.connect_scope,
-                work_id=work_id,
+            stix_objects = data["objects"]
+            if not self.mitre_full_resend:
+                data["objects"] = select_stix_delta(stix_objects, sent_index)
+                self.helper.log_info(
+                    f"Sending {len(data['objects'])} new or modified objects "
+                    f"of {len(stix_objects)} from {url}"
+                )
+
+            if data["objects"]:
+                if work_id is None:
+                    friendly_name = f"MITRE run @ {time_now}"
+                    work_id = self.helper.api.work.initiate_work(
+                        self.helper.connect_id, friendly_name
+                    )
+                self.helper.send_stix2_bundle(
+                    json.dumps(data),
+                    entities_types=self.helper.connect_scope,
+                    work_id=work_id,
+                )
+                self.helper.metric.inc("record_send", len(data["objects"]))
+
+            sent_index.update(
+                {stix["id"]: stix.get("modified") for stix in stix_objects}
             )
-            self.helper.metric.inc("record_send", len(data["objects"]))
 
+        self.save_sent_index(sent_index)
+        self.download_cache.save()
         message = f"Connector successfully run, storing last_run as {time_now}"
         self.helper.log_info(message)
         self.helper.set_state({"last_run": unixtime_now})
-        self.helper.api.work.to_processed(work_id, message)
+        if work_id is not None:
+            self.helper.api.work.to_processed(work_id, message)
 
     def run(self):
         get_run_and_terminate = getattr(self.helper, "get_run_and_terminate", None)
@@ -1,12 +1,12 @@
 import json
 import os
-import ssl
 import sys
 import time
-import urllib.request
+import urllib.error
 from datetime import datetime
 
 import yaml
+from download_cache import DownloadCache
 from pycti import OpenCTIConnectorHelper, get_config_variable
 
 CONFIG_SECTORS_FILE_URL = "https://raw.githubusercontent.com/OpenCTI-Platform/datasets/master/data/sectors.json"
@@ -60,6 +60,14 @@ class OpenCTI:
             ),
         ]
         self.urls = list(filter(lambda url: url is not False, urls))
+        self.download_cache = DownloadCache(
+            get_config_variable(
+                "CONFIG_DOWNLOAD_CACHE_DIR",
+                ["config", "download_cache_dir"],
+                config,
+                default=os.path.dirname(os.path.abspath(__file__)) + "/cache",
+            )
+        )
         self.interval = days_to_seconds(self.config_interval)
 
     def retrieve_data(self, url: str) -> dict:
@@ -74,17 +82,15 @@ class OpenCTI:
         Returns
         -------
         dict
-            A bundle in dict
+            A bundle in dict, or None in case of failure or if it did not
+            change since the last run
         """
         try:
-            return json.loads(
-                urllib.request.urlopen(
-                    url,
-                    context=ssl.create_default_context(),
-                )
-                .read()
-                .decode("utf-8")
-            )
+            content = self.download_cache.fetch(url)
+            if content is None:
+                self.helper.log_info(f"{url} not modified, skipping")
+                return None
+            return json.loads(content.decode("utf-8"))
         except (
             urllib.error.URLError,
             urllib.error.HTTPError,
@@ -115,27 +121,36 @@ class OpenCTI:
                 self.helper.log_info("Connector has never run")
             # If the last_run is more than interval seconds
             if last_run is None or ((timestamp - last_run) > self.interval):
-                now = datetime.utcfromtimestamp(timestamp)
-                friendly_name = "OpenCTI datasets run @ " + now.strftime(
-                    "%Y-%m-%d %H:%M:%S"
-                )
-                work_id = self.helper.api.work.initiate_work(
-                    self.helper.connect_id, friendly_name
-                )
-
+                # The work is only initiated once a dataset changed
+                work_id = None
                 for url in self.urls:
                     try:
                         data = self.retrieve_data(url)
+                        if data is None:
+                            continue
                         if self.remove_creator:
                             data = self.creator_removal(data)
-                        self.send_bundle(work_id, data)
+                        if work_id is None:
+                            now = datetime.utcfromtimestamp(timestamp)
+                            friendly_name = "OpenCTI datasets run @ " + now.strftime(
+                                "%Y-%m-%d %H:%M:%S"
+                            )
+                            work_id = self.helper.api.work.initiate_work(
+                                self.helper.connect_id, friendly_name
+                            )
+                        if self.send_bundle(work_id, data):
+                            self.download_cache.save()
+                        else:
+                            self.download_cache.discard()
                     except Exception as e:
+                        self.download_cache.discard()
                         self.helper.log_error(str(e))
 
                 message = f"Connector successfully run, storing last_run as {timestamp}"
                 self.helper.log_info(message)
                 self.helper.set_state({"last_run": timestamp})
-                self.helper.api.work.to_processed(work_id, message)
+                if work_id is not None:
+                    self.helper.api.work.to_processed(work_id, message)
                 self.helper.log_info(
                     "Last_run stored, next run in: "
                     + str(round(self.interval / 60 / 60 / 24, 2))
@@ -154,7 +169,7 @@ class OpenCTI:
         except Exception as e:
             self.helper.log_error(str(e))
 
-    def send_bundle(self, work_id: str, data: dict) -> None:
+    def send_bundle(self, work_id: str, data: dict) -> bool:
         try:
             self.helper.send_stix2_bundle(
                 json.dumps(data),
@@ -162,8 +177,10 @@ class OpenCTI:
                 update=self.update_existing_data,
                 work_id=work_id,
             )
+            return True
         except Exception as e:
             self.helper.log_error(f"Error while sending bundle: {e}")
+        return False
 
     def run(self):
         self.helper.log_info("Fetching OpenCTI datasets...")
@@ -0,0 +1,253 @@
+"""
+Benchmark of the transforms applied by the TAXII 2 connector to the objects.
+
+Compare the previous transforms, each walking the whole object list, with the
+single pass of per-object steps of ProcessObjects. Both run on the same
+synthetic objects with the filters, labels and forced name enabled, and their
+outputs are checked to be identical.
+
+Usage: python benchmark/benchmark_process_objects.py [--objects 1000000]
+"""
+
+import argparse
+import copy
+import gc
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+
+from pycti import StixCyberObservableTypes
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+# pylint:disable=wrong-import-position
+from connector.process_objects import ProcessObjects  # noqa: E402
+
+CONFIG = SimpleNamespace(
+    taxii2v21=False,
+    ignore_pattern_types=True,
+    pattern_types_to_ignore=["yara", "sigma"],
+    ignore_object_types=True,
+    object_types_to_ignore=["x-custom"],
+    ignore_specific_patterns=True,
+    patterns_to_ignore=["127.0.0.1"],
+    ignore_specific_notes=True,
+    notes_to_ignore=["ignored"],
+    create_observables=True,
+    create_indicators=False,
+    add_custom_label=True,
+    custom_label="feed",
+    stix_custom_property_to_label=True,
+    stix_custom_property="x_category",
+    force_pattern_as_name=True,
+    force_multiple_pattern_name="Multiple observables",
+    determine_x_opencti_score_by_label=False,
+    set_indicator_as_detection=False,
+    create_author=False,
+    exclude_specific_labels=False,
+    replace_characters_in_label=False,
+    save_original_indicator_id_to_note=False,
+    change_report_status=False,
+)
+PATTERNS = [
+    "[ipv4-addr:value = '198.51.100.{i}']",
+    "[domain-name:value = 'host{i}.example.com']",
+    "[url:value = 'http://host{i}.example.com/']",
+    "[file:hashes.MD5 = '{i:032x}']",
+    "[ipv4-addr:value = '127.0.0.1']",
+    "[domain-name:value = 'a{i}.example.com'] OR [domain-name:value = 'b.com']",
+]
+
+
+def generate_objects(count: int) -> list:
+    """Build TAXII 2.0 objects, 90% of them indicators"""
+
+    rand = random.Random(0)
+    stix_objects = []
+    for i in range(count):
+        labels = ["malicious-activity"]
+        if i % 10 == 0:
+            stix_objects.append(
+                {
+                    "type": rand.choice(["ipv4-addr", "note", "x-custom"]),
+                    "id": f"note--{uuid.UUID(int=i)}",
+                    "value": f"198.51.100.{i % 256}",
+                    "content": rand.choice(["kept", "ignored"]),
+                    "labels": labels,
+                }
+            )
+            continue
+        indicator = {
+            "type": "indicator",
+            "id": f"indicator--{uuid.UUID(int=i)}",
+            "name": f"Indicator {i}",
+            "pattern": rand.choice(PATTERNS).format(i=i),
+            "labels": labels,
+        }
+        if i % 7 == 0:
+            indicator["pattern_type"] = rand.choice(["stix", "yara"])
+        if i % 3 == 0:
+            indicator["x_category"] = "phishing"
+        stix_objects.append(indicator)
+    return stix_objects
+
+
+class MultiPassProcessObjects(ProcessObjects):
+    """Previous transforms, each walking the whole object list"""
+
+    def build_pipeline(self) -> list:
+        # The per-object steps are replaced by the passes of objects()
+        return []
+
+    def objects(self, stix_objects: list) -> list:
+        stix_objects = self.add_main_observable_type_pass(stix_objects)
+        if not self.config.taxii2v21:
+            stix_objects = self.taxii20_add_pattern_type_pass(stix_objects)
+        if self.config.ignore_pattern_types:
+            stix_objects = [
+                obj
+                for obj in stix_objects
+                if obj["type"] != "indicator"
+                or (
+                    "pattern_type" in obj
+                    and obj["pattern_type"] not in self.config.pattern_types_to_ignore
+                )
+            ]
+        if self.config.ignore_object_types:
+            stix_objects = [
+                obj
+                for obj in stix_objects
+                if "type" in obj
+                and obj["type"] not in self.config.object_types_to_ignore
+            ]
+        if self.config.ignore_specific_patterns:
+            stix_objects = [
+                obj
+                for obj in stix_objects
+                if obj["type"] != "indicator"
+                or (
+                    "pattern" in obj
+                    and all(
+                        pattern not in obj["pattern"]
+                        for pattern in self.config.patterns_to_ignore
+                    )
+                )
+            ]
+        if self.config.ignore_specific_notes:
+            stix_objects = [
+                obj
+                for obj in stix_objects
+                if obj["type"] != "note"
+                or (
+                    "content" in obj
+                    and all(
+                        content not in obj["content"]
+                        for content in self.config.notes_to_ignore
+                    )
+                )
+            ]
+        if self.config.create_observables or self.config.create_indicators:
+            for obj in stix_objects:
+                if obj["type"] == "indicator":
+                    obj["x_opencti_create_observables"] = self.config.create_observables
+                elif StixCyberObservableTypes.has_value(obj["type"]):
+                    obj["x_opencti_create_indicators"] = self.config.create_indicators
+        if self.config.add_custom_label:
+            for obj in stix_objects:
+                if "labels" in obj:
+                    obj["labels"].append(self.config.custom_label)
+        if self.config.stix_custom_property_to_label:
+            for obj in stix_objects:
+                if self.config.stix_custom_property in obj and "labels" in obj:
+                    obj["labels"].append(obj[self.config.stix_custom_property])
+        if self.config.force_pattern_as_name:
+            stix_objects = self.force_pattern_as_name_pass(stix_objects)
+        # The following transforms are unchanged
+        return super().objects(stix_objects)
+
+    @staticmethod
+    def add_main_observable_type_pass(stix_objects: list) -> list:
+        observable_type_mapping = {
+            "ipv4-addr": "IPv4-Addr",
+            "ipv6-addr": "IPv6-Addr",
+            "file": "StixFile",
+            "domain-name": "Domain-Name",
+            "url": "Url",
+            "email-addr": "Email-Addr",
+        }
+        for obj in stix_objects:
+            if obj["type"] == "indicator":
+                match = re.search(r"\[(.*?):.*'(.*?)\'\]", obj["pattern"])
+                if match is not None and match[1] in observable_type_mapping:
+                    obj["x_opencti_main_observable_type"] = observable_type_mapping[
+                        match[1]
+                    ]
+        return stix_objects
+
+    @staticmethod
+    def taxii20_add_pattern_type_pass(stix_objects: list) -> list:
+        for obj in stix_objects:
+            if "pattern_type" not in obj and obj["type"] == "indicator":
+                obj["pattern_type"] = "stix"
+        return stix_objects
+
+    def force_pattern_as_name_pass(self, stix_objects: list) -> list:
+        for obj in stix_objects:
+            if obj["type"] == "indicator":
+                match = re.search(r"\[(.*?):.*'(.*?)\'\]", obj["pattern"])
+                if match is not None and (
+                    " AND " in obj["pattern"] or " OR " in obj["pattern"]
+                ):
+                    obj["name"] = self.config.force_multiple_pattern_name
+                elif match is not None:
+                    obj["name"] = match[2]
+        return stix_objects
+
+
+def measure(name: str, process_objects, stix_objects: list, repeat: int) -> tuple:
+    """Process copies of the objects, return the best time and the output"""
+
+    best = None
+    output = None
+    for _ in range(repeat):
+        objects_copy = copy.deepcopy(stix_objects)
+        gc.disable()
+        start = time.perf_counter()
+        output = process_objects.objects(objects_copy)
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:>10}: {best:.2f}s, {len(output)} objects kept")
+    return best, output
+
+
+def main() -> None:
+    """Run the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--objects", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    stix_objects = generate_objects(args.objects)
+    single_pass = ProcessObjects(None, CONFIG, None)
+    multi_pass = MultiPassProcessObjects(None, CONFIG, None)
+
+    multi_time, multi_output = measure(
+        "multi-pass", multi_pass, stix_objects, args.repeat
+    )
+    single_time, single_output = measure(
+        "single", single_pass, stix_objects, args.repeat
+    )
+    assert multi_output == single_output, "The outputs differ"
+    print(f"speedup: {multi_time / single_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
 import taxii2client.v20 as tx20
 import taxii2client.v21 as tx21
 from requests.auth import AuthBase, HTTPBasicAuth
+from requests.exceptions import HTTPError
 from taxii2client.common import TokenAuth
 from taxii2client.exceptions import TAXIIServiceException
 
@@ -50,6 +56,11 @@ class Taxii2:
             )
 
         self.filters = {}
+        # Pagination cursors checkpointed per collection URL
+        self.cursors = {}
+        # Semaphores limiting the concurrent requests per server
+        self.server_slots = {}
+        self.server_slots_lock = threading.Lock()
         if self.config.enable_url_query_limit and self.config.taxii2v21:
             self.filters["limit"] = self.config.url_query_limit
 
@@ -73,68 +84,133 @@ class Taxii2:
         msg = f"Collection {coll_title} does not exist in API root {root.title}"
         raise TAXIIServiceException(msg)
 
-    def poll_all_roots(self, coll_title):
+    def list_all_roots(self, coll_title):
         """
-        Polls all API roots for the specified collections
+        Returns the specified collections of all API roots
         """
-        self.helper.log_info("Polling all API Roots")
-        stix_objects = []
+        collections = []
         for root in self.config.server.api_roots:
             if coll_title == "*":
-                obj = self.poll_entire_root(root)
-                if len(obj) > 0:
-                    stix_objects.extend(iter(obj))
+                collections.extend(self.list_entire_root(root))
             else:
                 try:
-                    coll = self._get_collection(root, coll_title)
+                    collections.append(self._get_collection(root, coll_title))
                 except TAXIIServiceException:
                     self.helper.log_error(
                         f"Error searching for  collection {coll_title} in API Root {root.title}"
                     )
-                    return
-                try:
-                    obj2 = self.poll(coll)
-                    if len(obj2) > 0:
-                        stix_objects.extend(iter(obj2))
-                except TAXIIServiceException as err:
-                    msg = (
-                        f"Error trying to poll Collection {coll_title} "
-                        f"in API Root {root.title}. Skipping"
-                    )
-                    self.helper.log_error(msg)
-                    self.helper.log_error(err)
-        return stix_objects
+                    break
+        return collections
+
+    def list_entire_root(self, root):
+        """
+        Returns all Collections in a given API Root
+        """
+        try:
+            return list(root.collections)
+        except TAXIIServiceException as err:
+            self.helper.log_error(f"Error listing Collections of API root {root.title}")
+            self.helper.log_error(err)
+            return []
+
+    def poll_all_roots(self, coll_title):
+        """
+        Polls all API roots for the specified collections
+        Yields (collection, objects, cursor) for each page retrieved
+        """
+        self.helper.log_info("Polling all API Roots")
+        yield from self.poll_collections(self.list_all_roots(coll_title))
 
     def poll_entire_root(self, root):
         """
         Polls all Collections in a given API Root
+        Yields (collection, objects, cursor) for each page retrieved
         """
         self.helper.log_info(f"Polling entire API root {root.title}")
-        stix_objects = []
-        for coll in root.collections:
+        yield from self.poll_collections(self.list_entire_root(root))
+
+    def poll_collections(self, collections):
+        """
+        Polls the given Collections, up to num_workers of them concurrently
+        Yields (collection, objects, cursor) for each page retrieved, pages of
+        a same collection being yielded in order
+        """
+        if self.config.num_workers <= 1 or len(collections) <= 1:
+            for coll in collections:
+                yield from self._poll_safe(coll)
+            return
+
+        pages = queue.Queue(maxsize=2 * self.config.num_workers)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            # Give up when the consumer stopped, instead of blocking forever
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def worker(coll):
             try:
-                obj = self.poll(coll)
-                if len(obj) > 0:
-                    stix_objects.extend(iter(obj))
-            except TAXIIServiceException as err:
-                msg = (
-                    f"Error trying to poll Collection {coll.title} "
-                    f"in API Root {root.title}. Skipping"
+                for page in self._poll_safe(coll):
+                    if not put(page):
+                        return
+            except Exception as err:
+                # Hand unexpected errors over to the consumer, as when polling
+                # the collections one after the other
+                put(err)
+            finally:
+                put(done)
+
+        executor = ThreadPoolExecutor(max_workers=self.config.num_workers)
+        try:
+            for coll in collections:
+                executor.submit(worker, coll)
+            remaining = len(collections)
+            while remaining > 0:
+                page = pages.get()
+                if page is done:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield page
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _poll_safe(self, collection):
+        """
+        Polls a Collection, logging and skipping it on error
+        """
+        try:
+            yield from self.poll(collection)
+        except (TAXIIServiceException, HTTPError) as err:
+            msg = f"Error trying to poll Collection {collection.title}. Skipping"
+            self.helper.log_error(msg)
+            self.helper.log_error(err)
+
+    def _server_slot(self, collection):
+        """
+        Returns the semaphore limiting concurrent requests to the server
+        hosting the given Collection
+        """
+        server = urlparse(collection.url).netloc
+        with self.server_slots_lock:
+            if server not in self.server_slots:
+                self.server_slots[server] = threading.BoundedSemaphore(
+                    self.config.max_connections_per_server
                 )
-                self.helper.log_error(msg)
-                self.helper.log_error(err)
-        return stix_objects
-
-    def process_response(self, objects, response):
-        # This function is required to concat the paginated responses
-        if "objects" in response:
-            for object in response["objects"]:
-                objects.append(object)
-        return objects
-
-    def get_objects(self, collection):
+            return self.server_slots[server]
+
+    def get_objects(self, collection, filters):
         try:
-            return collection.get_objects(**self.filters)
+            with self._server_slot(collection):
+                return collection.get_objects(**filters)
         except TAXIIServiceException as err:
             msg = f"Error trying to get objects from Collection {collection.title}"
             self.helper.log_error(msg)
@@ -142,59 +218,91 @@ class Taxii2:
 
     def get_manifest(self, collection, last_obj):
         try:
-            return collection.get_manifest(id=last_obj["id"])
+            with self._server_slot(collection):
+                return collection.get_manifest(id=last_obj["id"])
         except TAXIIServiceException as err:
             msg = f"Error trying to get manifest from Collection {collection.title}"
             self.helper.log_error(msg)
             self.helper.log_error(err)
 
+    def _resume_filters(self, collection):
+        """
+        Returns the filters to poll a collection with, resuming from the
+        cursor checkpointed for this collection if any
+        """
+        filters = dict(self.filters)
+        cursor = self.cursors.get(collection.url)
+        if cursor:
+            self.helper.log_info(
+                f"Resuming Collection {collection.title} from cursor {cursor}"
+            )
+            if "next" in cursor:
+                filters.pop("added_after", None)
+                filters["next"] = cursor["next"]
+            elif "added_after" in cursor:
+                filters["added_after"] = cursor["added_after"]
+        return filters
+
+    def _next_cursor(self, collection, response, version):
+        """
+        Returns the pagination cursor pointing after the given response,
+        or None if the collection has no more pages
+        """
+        # Taxii 2.0 doesn't support using next, using manifest lookup instead
+        if version == "2.0":
+            # Get the manifest for the last object
+            last_obj = response["objects"][-1]
+            manifest = self.get_manifest(collection, last_obj)
+            # Check manifest size
+            if (
+                manifest is not None
+                and "objects" in manifest
+                and len(manifest["objects"]) > 0
+            ):
+                return {"added_after": manifest["objects"][0]["date_added"]}
+            self.helper.log_info("No manifest found. Stopping pagination.")
+            return None
+        # Assuming newer versions will support next
+        if response.get("more") is True and "next" in response:
+            return {"next": response["next"]}
+        return None
+
     def poll(self, collection):
         """
         Polls a specified collection in a specified API root
+        Yields (collection, objects, cursor) for each page retrieved, where cursor
+        is the pagination state to resume from once the page has been ingested
+        (None after the last page). Nothing is yielded if the poll failed
         """
-        objects = []
         self.helper.log_info(f"Polling Collection {collection.title}")
-        response = self.get_objects(collection)
-        if (
-            response is not None
-            and "objects" in response
-            and len(response["objects"]) > 0
-        ):
-            first_object = response["objects"][0]
-            if "spec_version" in response:
-                self.version = response["spec_version"]
-            elif "spec_version" in first_object:
-                self.version = first_object["spec_version"]
-            else:
-                self.helper.log_info("No spec_version found, assuming TAXII 2.0")
-                self.version = "2.0"  # Default to TAXII 2.0 if nothing found
-            # Taxii 2.0 doesn't support using next, using manifest lookup instead
-            if self.version == "2.0":
-                while True:
-                    objects = self.process_response(objects, response)
-                    # Get the manifest for the last object
-                    last_obj = response["objects"][-1]
-                    manifest = self.get_manifest(collection, last_obj)
-                    # Check manifest size
-                    if "objects" in manifest and len(manifest["objects"]) > 0:
-                        date_added = manifest["objects"][0]["date_added"]
-                        self.filters["added_after"] = date_added
-                        # Get the next set of objects
-                        response = self.get_objects(collection)
-                        if len(response["objects"]) == 0:
-                            break
-                    else:
-                        self.helper.log_info("No manifest found. Stopping pagination.")
-                        break
-            else:
-                # Assuming newer versions will support next
-                while True:
-                    objects = self.process_response(objects, response)
-                    if "more" not in response or response["more"] != True:
-                        # "more" doesn't exist or is not True, exit the loop
-                        break
-                    if "next" in response:
-                        self.filters.pop("added_after", None)
-                        self.filters["next"] = response["next"]
-                        response = self.get_objects(collection)
-        return objects
+        filters = self._resume_filters(collection)
+        response = self.get_objects(collection, filters)
+        if response is None:
+            return
+        if "objects" not in response or len(response["objects"]) == 0:
+            # Nothing new, the collection is up to date
+            yield collection, [], None
+            return
+        first_object = response["objects"][0]
+        if "spec_version" in response:
+            version = response["spec_version"]
+        elif "spec_version" in first_object:
+            version = first_object["spec_version"]
+        else:
+            self.helper.log_info("No spec_version found, assuming TAXII 2.0")
+            version = "2.0"  # Default to TAXII 2.0 if nothing found
+        while True:
+            cursor = self._next_cursor(collection, response, version)
+            yield collection, response["objects"], cursor
+            if cursor is None:
+                break
+            # Get the next set of objects
+            if "next" in cursor:
+                filters.pop("added_after", None)
+            filters.update(cursor)
+            response = self.get_objects(collection, filters)
+            if response is None:
+                break
+            if "objects" not in response or len(response["objects"]) == 0:
+                yield collection, [], None
+                break
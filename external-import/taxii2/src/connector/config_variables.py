@@ -205,6 +205,22 @@ class ConfigConnector:
             default=100,
         )
 
+        self.num_workers = get_config_variable(
+            "TAXII2_NUM_WORKERS",
+            ["taxii2", "num_workers"],
+            self.load,
+            isNumber=True,
+            default=1,
+        )
+
+        self.max_connections_per_server = get_config_variable(
+            "TAXII2_MAX_CONNECTIONS_PER_SERVER",
+            ["taxii2", "max_connections_per_server"],
+            self.load,
+            isNumber=True,
+            default=4,
+        )
+
         self.determine_x_opencti_score_by_label = get_config_variable(
             "TAXII2_DETERMINE_X_OPENCTI_SCORE_BY_LABEL",
             ["taxii2", "determine_x_opencti_score_by_label"],
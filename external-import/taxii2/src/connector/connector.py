@@ -24,37 +24,74 @@ class Connector:
         self.taxii2 = Taxii2(self.helper, self.config)
         self.process = ProcessObjects(self.helper, self.config, self.converter_to_stix)
 
-    def _collect_intelligence(self) -> list:
+    def _list_collections(self) -> list:
         """
-        Collect intelligence from the source and convert into STIX object
-        :return: List of STIX objects
+        Resolve the configured collections paths into TAXII Collections
+        :return: List of Collections
         """
-        stix_objects = []
-
+        collections = []
         for collection in self.config.collections:
             try:
                 root_path, coll_title = collection.split(".")
                 if root_path == "*":
-                    stix_objects = self.taxii2.poll_all_roots(coll_title)
+                    collections.extend(self.taxii2.list_all_roots(coll_title))
                 elif coll_title == "*":
                     root = self.taxii2._get_root(root_path)
-                    stix_objects = self.taxii2.poll_entire_root(root)
+                    collections.extend(self.taxii2.list_entire_root(root))
                 else:
                     root = self.taxii2._get_root(root_path)
-                    coll = self.taxii2._get_collection(root, coll_title)
-                    obj = self.taxii2.poll(coll)
-                    if len(obj) > 0:
-                        stix_objects.extend(iter(obj))
+                    collections.append(self.taxii2._get_collection(root, coll_title))
             except (TAXIIServiceException, HTTPError) as err:
                 self.helper.log_error("Error connecting to TAXII server")
                 self.helper.log_error(err)
                 continue
+        # Poll each collection once, even if matched by several paths
+        return list({coll.url: coll for coll in collections}.values())
 
-        # If further processing of objects is needed
-        if stix_objects is not None and len(stix_objects) > 0:
-            stix_objects = self.process.objects(stix_objects)
+    def _checkpoint_cursor(self, collection, cursor) -> None:
+        """
+        Store the cursor of a collection, so that its next poll resumes after
+        the last ingested page, or from the start of this run once completed
+        :return: None
+        """
+        if cursor is None:
+            cursor = {"added_after": self.run_added_after}
+        current_state = self.helper.get_state() or {}
+        current_state.setdefault("collections", {})[collection.url] = cursor
+        self.helper.set_state(current_state)
 
-        return stix_objects
+    def _collect_intelligence(self, work_id) -> int:
+        """
+        Collect intelligence from the source, convert and send it page by page
+        :return: Number of bundles sent
+        """
+        bundles_count = 0
+        collections = self._list_collections()
+        for collection, stix_objects, cursor in self.taxii2.poll_collections(
+            collections
+        ):
+            # If further processing of objects is needed
+            if stix_objects is not None and len(stix_objects) > 0:
+                stix_objects = self.process.objects(stix_objects)
+
+            if stix_objects is not None and len(stix_objects) != 0:
+                stix_objects_bundle = self.helper.stix2_create_bundle(stix_objects)
+                bundles_sent = self.helper.send_stix2_bundle(
+                    stix_objects_bundle, work_id=work_id
+                )
+                bundles_count += len(bundles_sent)
+
+                self.helper.connector_logger.info(
+                    "Sending STIX objects to OpenCTI...",
+                    {
+                        "collection": collection.title,
+                        "bundles_sent": str(len(bundles_sent)),
+                    },
+                )
+
+            self._checkpoint_cursor(collection, cursor)
+
+        return bundles_count
 
     def process_message(self) -> None:
         """
@@ -115,18 +152,14 @@ class Connector:
                 )
                 self.taxii2.filters["added_after"] = added_after
 
-            stix_objects = self._collect_intelligence()
-
-            if stix_objects is not None and len(stix_objects) != 0:
-                stix_objects_bundle = self.helper.stix2_create_bundle(stix_objects)
-                bundles_sent = self.helper.send_stix2_bundle(
-                    stix_objects_bundle, work_id=work_id
-                )
+            # Resume each collection from its own cursor
+            self.run_added_after = now.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            self.taxii2.cursors = dict((current_state or {}).get("collections", {}))
 
-                self.helper.connector_logger.info(
-                    "Sending STIX objects to OpenCTI...",
-                    {"bundles_sent": {str(len(bundles_sent))}},
-                )
+            bundles_count = self._collect_intelligence(work_id)
+            self.helper.connector_logger.info(
+                "STIX objects sent to OpenCTI", {"bundles_sent": str(bundles_count)}
+            )
 
             # Store the current timestamp as a last run of the connector
             self.helper.connector_logger.debug(
@@ -2,6 +2,23 @@ import re
 
 from pycti import StixCyberObservableTypes
 
+# Extracts the observable type and value of the first comparison of a pattern
+PATTERN_REGEX = re.compile(r"\[(.*?):.*'(.*?)\'\]")
+
+# Mapping of observable types to x_opencti_main_observable_type
+OBSERVABLE_TYPE_MAPPING = {
+    "ipv4-addr": "IPv4-Addr",
+    "ipv6-addr": "IPv6-Addr",
+    "file": "StixFile",
+    "domain-name": "Domain-Name",
+    "url": "Url",
+    "email-addr": "Email-Addr",
+}
+
+OBSERVABLE_TYPES = frozenset(
+    observable_type.value.lower() for observable_type in StixCyberObservableTypes
+)
+
 
 class ProcessObjects:
     """
@@ -12,102 +29,157 @@ class ProcessObjects:
         self.helper = helper
         self.config = config
         self.converter_to_stix = converter_to_stix
+        self.pattern_types_to_ignore = frozenset(self.config.pattern_types_to_ignore)
+        self.object_types_to_ignore = frozenset(self.config.object_types_to_ignore)
+        self.pipeline = self.build_pipeline()
 
-    def indicator_observable_generation(self, stix_objects: list) -> list:
+    def build_pipeline(self) -> list:
         """
-        Used to generate indicators or observables.
-        :return: List of STIX objects
+        Builds the list of enabled per-object steps, in the order they are applied.
+        Each step modifies the object in place and returns False to drop it.
+        :return: List of steps
         """
-        for obj in stix_objects:
-            object_type = obj["type"]
-            if object_type == "indicator":
-                obj["x_opencti_create_observables"] = self.config.create_observables
-            elif StixCyberObservableTypes.has_value(object_type):
-                obj["x_opencti_create_indicators"] = self.config.create_indicators
-        return stix_objects
+        steps = [self.apply_pattern]
+
+        if not self.config.taxii2v21:
+            steps.append(self.taxii20_add_pattern_type)
+
+        if self.config.ignore_pattern_types:
+            steps.append(self.keep_pattern_type)
+
+        if self.config.ignore_object_types:
+            steps.append(self.keep_object_type)
+
+        if self.config.ignore_specific_patterns:
+            steps.append(self.keep_pattern)
 
-    def add_custom_label(self, stix_objects: list) -> list:
+        if self.config.ignore_specific_notes:
+            steps.append(self.keep_note)
+
+        if self.config.create_observables or self.config.create_indicators:
+            steps.append(self.indicator_observable_generation)
+
+        if self.config.add_custom_label:
+            steps.append(self.add_custom_label)
+
+        if self.config.stix_custom_property_to_label:
+            steps.append(self.add_custom_property_label)
+
+        return steps
+
+    def apply_pattern(self, obj: dict) -> bool:
         """
-        Used to add label to object e.g. intel feed source
-        :return: List of STIX objects
+        Used to add the main observable type to an indicator and, if enabled,
+        force its name to be extracted from the pattern.
+        If indicator contains multiple observables (AND/OR in pattern),
+        the name specified in the config is used.
+        :return: True
+        """
+        if obj["type"] != "indicator":
+            return True
+        # Perform regex search to extract the observable type and value
+        match = PATTERN_REGEX.search(obj["pattern"])
+        if match is None:
+            return True
+        # Get the observable type from the regex match and set the corresponding value
+        observable_type = match[1]
+        if observable_type in OBSERVABLE_TYPE_MAPPING:
+            obj["x_opencti_main_observable_type"] = OBSERVABLE_TYPE_MAPPING[
+                observable_type
+            ]
+        if self.config.force_pattern_as_name:
+            # If multiple observables (AND/OR), use the config name
+            if " AND " in obj["pattern"] or " OR " in obj["pattern"]:
+                obj["name"] = self.config.force_multiple_pattern_name
+            # Otherwise, use the extracted part from the pattern
+            else:
+                obj["name"] = match[2]
+        return True
+
+    def taxii20_add_pattern_type(self, obj: dict) -> bool:
         """
-        for obj in stix_objects:
-            if "labels" in obj:
-                new_labels = obj["labels"]
-                new_labels.append(self.config.custom_label)
-                obj["labels"] = new_labels
-        return stix_objects
+        Used to add pattern_type to a taxii 2.0 object if missing
+        :return: True
+        """
+        if "pattern_type" not in obj and obj["type"] == "indicator":
+            obj["pattern_type"] = "stix"
+        return True
 
-    def add_custom_property_label(self, stix_objects: list) -> list:
+    def keep_pattern_type(self, obj: dict) -> bool:
         """
-        Used to copy data from a custom property and make it a label
-        e.g. x_category: "phishing" has the label phishing added to object
-        :return: List of STIX objects
+        Lets you ignore certain pattern types
+        :return: False if the indicator pattern type is ignored
         """
-        for obj in stix_objects:
-            if self.config.stix_custom_property in obj and "labels" in obj:
-                new_labels = obj["labels"]
-                new_labels.append(obj[self.config.stix_custom_property])
-                obj["labels"] = new_labels
-        return stix_objects
+        if obj["type"] == "indicator":
+            return (
+                "pattern_type" in obj
+                and obj["pattern_type"] not in self.pattern_types_to_ignore
+            )
+        # Still keep other types
+        return True
 
-    def add_main_observable_type(self, stix_objects: list) -> list:
+    def keep_object_type(self, obj: dict) -> bool:
         """
-        Used to add the main observable type to an indicator
-        :return: List of STIX objects
+        Lets you ignore certain object types
+        :return: False if the object type is ignored
         """
-        # Define a mapping of observable types to x_opencti_main_observable_type
-        observable_type_mapping = {
-            "ipv4-addr": "IPv4-Addr",
-            "ipv6-addr": "IPv6-Addr",
-            "file": "StixFile",
-            "domain-name": "Domain-Name",
-            "url": "Url",
-            "email-addr": "Email-Addr",
-        }
-        for obj in stix_objects:
-            if obj["type"] == "indicator":
-                # Perform regex search to extract the observable type
-                match = re.search(r"\[(.*?):.*'(.*?)\'\]", obj["pattern"])
-                if match is not None:
-                    # Get the observable type from the regex match and set the corresponding value
-                    observable_type = match[1]
-                    if observable_type in observable_type_mapping:
-                        obj["x_opencti_main_observable_type"] = observable_type_mapping[
-                            observable_type
-                        ]
-        return stix_objects
+        return "type" in obj and obj["type"] not in self.object_types_to_ignore
 
-    def taxii20_add_pattern_type(self, stix_objects: list) -> list:
+    def keep_pattern(self, obj: dict) -> bool:
         """
-        Used to add pattern_type to a taxii 2.0 object if missing
-        :return: List of STIX objects
+        Lets you ignore certain patterns
+        :return: False if the indicator pattern contains an ignored string
         """
-        for obj in stix_objects:
-            if "pattern_type" not in obj and obj["type"] == "indicator":
-                obj["pattern_type"] = "stix"
-        return stix_objects
+        if obj["type"] == "indicator":
+            return "pattern" in obj and all(
+                pattern not in obj["pattern"]
+                for pattern in self.config.patterns_to_ignore
+            )
+        # Still keep other types
+        return True
 
-    def force_pattern_as_name(self, stix_objects: list) -> list:
+    def keep_note(self, obj: dict) -> bool:
         """
-        Forces name of indicator to be extracted from pattern
-        If indicator contains multiple observables (AND/OR in pattern),
-        the name specified in the config is used.
-        :return: List of STIX objects
+        Lets you ignore certain notes
+        :return: False if the note content contains an ignored string
         """
-        for obj in stix_objects:
-            if obj["type"] == "indicator":
-                # Perform regex search to extract the pattern
-                match = re.search(r"\[(.*?):.*'(.*?)\'\]", obj["pattern"])
-                # If multiple observables (AND/OR), use the config name
-                if match is not None and (
-                    " AND " in obj["pattern"] or " OR " in obj["pattern"]
-                ):
-                    obj["name"] = self.config.force_multiple_pattern_name
-                # Otherwise, use the extracted part from the pattern
-                elif match != None:
-                    obj["name"] = match[2]
-        return stix_objects
+        if obj["type"] == "note":
+            return "content" in obj and all(
+                content not in obj["content"] for content in self.config.notes_to_ignore
+            )
+        # Still keep other types
+        return True
+
+    def indicator_observable_generation(self, obj: dict) -> bool:
+        """
+        Used to generate indicators or observables.
+        :return: True
+        """
+        object_type = obj["type"]
+        if object_type == "indicator":
+            obj["x_opencti_create_observables"] = self.config.create_observables
+        elif object_type.lower() in OBSERVABLE_TYPES:
+            obj["x_opencti_create_indicators"] = self.config.create_indicators
+        return True
+
+    def add_custom_label(self, obj: dict) -> bool:
+        """
+        Used to add label to object e.g. intel feed source
+        :return: True
+        """
+        if "labels" in obj:
+            obj["labels"].append(self.config.custom_label)
+        return True
+
+    def add_custom_property_label(self, obj: dict) -> bool:
+        """
+        Used to copy data from a custom property and make it a label
+        e.g. x_category: "phishing" has the label phishing added to object
+        :return: True
+        """
+        if self.config.stix_custom_property in obj and "labels" in obj:
+            obj["labels"].append(obj[self.config.stix_custom_property])
+        return True
 
     def determine_x_opencti_score_by_label(self, stix_objects: list) -> list:
         """
@@ -208,74 +280,6 @@ class ProcessObjects:
                 obj["labels"] = new_labels
         return stix_objects
 
-    def ignore_pattern_types(self, stix_objects: list) -> list:
-        """
-        Lets you ignore certain pattern types
-        :return: List of STIX objects
-        """
-        # Copy obj to new_stix_objects if not in ignored pattern types
-        new_stix_objects = []
-        for obj in stix_objects:
-            if obj["type"] == "indicator":
-                if (
-                    "pattern_type" in obj
-                    and obj["pattern_type"] not in self.config.pattern_types_to_ignore
-                ):
-                    new_stix_objects.append(obj)
-            else:
-                # Still add other types
-                new_stix_objects.append(obj)
-        return new_stix_objects
-
-    def ignore_object_types(self, stix_objects: list) -> list:
-        """
-        Lets you ignore certain object types
-        :return: List of STIX objects
-        """
-        return [
-            obj
-            for obj in stix_objects
-            if "type" in obj and obj["type"] not in self.config.object_types_to_ignore
-        ]
-
-    def ignore_specific_patterns(self, stix_objects: list) -> list:
-        """
-        Lets you ignore certain patterns
-        :return: List of STIX objects
-        """
-        # Copy obj to new_stix_objects if not in ignored patterns
-        new_stix_objects = []
-        for obj in stix_objects:
-            if obj["type"] == "indicator":
-                if "pattern" in obj and all(
-                    pattern not in obj["pattern"]
-                    for pattern in self.config.patterns_to_ignore
-                ):
-                    new_stix_objects.append(obj)
-            else:
-                # Still add other types
-                new_stix_objects.append(obj)
-        return new_stix_objects
-
-    def ignore_specific_notes(self, stix_objects: list) -> list:
-        """
-        Lets you ignore certain notes
-        :return: List of STIX objects
-        """
-        # Copy obj to new_stix_objects if not in ignored patterns
-        new_stix_objects = []
-        for obj in stix_objects:
-            if obj["type"] == "note":
-                if "content" in obj and all(
-                    content not in obj["content"]
-                    for content in self.config.notes_to_ignore
-                ):
-                    new_stix_objects.append(obj)
-            else:
-                # Still add other types
-                new_stix_objects.append(obj)
-        return new_stix_objects
-
     def save_original_indicator_id_to_note(self, stix_objects: list) -> list:
         """
         Lets you save the original indicator id as a note
@@ -308,34 +312,15 @@ class ProcessObjects:
         Used to process stix_objects and make modifications
         :return: List of STIX objects
         """
-        stix_objects = self.add_main_observable_type(stix_objects)
-
-        if not self.config.taxii2v21:
-            stix_objects = self.taxii20_add_pattern_type(stix_objects)
-
-        if self.config.ignore_pattern_types:
-            stix_objects = self.ignore_pattern_types(stix_objects)
-
-        if self.config.ignore_object_types:
-            stix_objects = self.ignore_object_types(stix_objects)
-
-        if self.config.ignore_specific_patterns:
-            stix_objects = self.ignore_specific_patterns(stix_objects)
-
-        if self.config.ignore_specific_notes:
-            stix_objects = self.ignore_specific_notes(stix_objects)
-
-        if self.config.create_observables or self.config.create_indicators:
-            stix_objects = self.indicator_observable_generation(stix_objects)
-
-        if self.config.add_custom_label:
-            stix_objects = self.add_custom_label(stix_objects)
-
-        if self.config.stix_custom_property_to_label:
-            stix_objects = self.add_custom_property_label(stix_objects)
-
-        if self.config.force_pattern_as_name:
-            stix_objects = self.force_pattern_as_name(stix_objects)
+        # Apply the enabled per-object steps in a single pass
+        kept_objects = []
+        for obj in stix_objects:
+            for step in self.pipeline:
+                if not step(obj):
+                    break
+            else:
+                kept_objects.append(obj)
+        stix_objects = kept_objects
 
         if self.config.determine_x_opencti_score_by_label:
             stix_objects = self.determine_x_opencti_score_by_label(stix_objects)
@@ -0,0 +1,274 @@
+"""
+Throughput benchmark of the ThreatFox row processing.
+
+Compare the rows per second of the dict based objects built by the connector
+with the previous construction through the stix2 library objects, including
+their serialization. The objects of the first rows of both constructions must
+have the same ids and properties. The sample CSV is generated if it does not
+exist.
+
+Usage: python benchmark/benchmark_rows.py [--rows 500000] [--csv sample.csv] [--check-rows 10000]
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+
+import stix2
+from pycti import Indicator, Malware, StixCoreRelationship
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, "..", "src"))
+# abusech_stix.py is shared with other connectors
+sys.path.insert(
+    0, os.path.join(BENCHMARK_DIR, "..", "..", "..", "shared", "abusech_stix")
+)
+
+# pylint:disable=wrong-import-position
+from main import ALL_TYPES, FeedRow, ThreatFox  # noqa: E402
+
+IDENTITY_ID = "identity--8f5e2a9c-21b7-5a43-9e1f-3a0d4f6b7c21"
+MALWARES = [
+    ("win.cobalt_strike", "Cobalt Strike", "Agentemis,BEACON,CobaltStrike"),
+    ("elf.mirai", "Mirai", "None"),
+    ("win.agent_tesla", "Agent Tesla", "AgenTesla,AgentTesla"),
+    ("unknown", "Unknown malware", "None"),
+]
+IOC_TYPES = ["ip:port", "domain", "url", "md5_hash", "sha1_hash", "sha256_hash"]
+# Times of the run, which the stix2 library set when building the objects
+RUN_TIMESTAMPS = ("created", "modified", "valid_from")
+
+
+def generate_csv(path: str, rows: int) -> None:
+    """Write a sample CSV with the columns of the ThreatFox export"""
+
+    rand = random.Random(0)
+    first_seen = datetime(2024, 1, 1, tzinfo=UTC)
+    with open(path, "w", encoding="utf-8", newline="") as fd:
+        writer = csv.writer(fd, quoting=csv.QUOTE_ALL)
+        for i in range(rows):
+            ioc_type = IOC_TYPES[i % len(IOC_TYPES)]
+            digest = hashlib.sha256(str(i).encode()).hexdigest()
+            if ioc_type == "ip:port":
+                port = rand.randint(1, 65535)
+                value = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:{port}"
+            elif ioc_type == "domain":
+                value = f"{digest[:12]}.example.com"
+            elif ioc_type == "url":
+                value = f"http://{digest[:12]}.example.com/{digest[12:20]}.exe"
+            elif ioc_type == "md5_hash":
+                value = digest[:32]
+            elif ioc_type == "sha1_hash":
+                value = digest[:40]
+            else:
+                value = digest
+            fk_malware, printable, aliases = MALWARES[i % len(MALWARES)]
+            seen = first_seen + timedelta(seconds=i)
+            writer.writerow(
+                [
+                    seen.strftime("%Y-%m-%d %H:%M:%S"),
+                    str(i),
+                    value,
+                    ioc_type,
+                    rand.choice(["botnet_cc", "payload_delivery", "payload"]),
+                    fk_malware,
+                    aliases,
+                    printable,
+                    "",
+                    str(rand.choice([50, 75, 100])),
+                    f"https://bazaar.abuse.ch/sample/{digest}/" if i % 2 else "None",
+                    "exe,RAT",
+                    "0",
+                    "abuse_ch",
+                ]
+            )
+
+
+def create_connector() -> ThreatFox:
+    """Create a connector with its settings, without an OpenCTI platform"""
+
+    connector = ThreatFox.__new__(ThreatFox)
+    connector.identity = {"standard_id": IDENTITY_ID}
+    connector.create_indicators = True
+    connector.default_x_opencti_score = 50
+    connector.x_opencti_score_ip = None
+    connector.x_opencti_score_domain = None
+    connector.x_opencti_score_url = None
+    connector.x_opencti_score_hash = None
+    connector.ioc_to_import = [ALL_TYPES]
+    return connector
+
+
+def stix2_process_row(connector: ThreatFox, ioc: FeedRow) -> list:
+    """Previous construction of the row objects with the stix2 library"""
+
+    description = None
+    custom_properties = {"created_by_ref": IDENTITY_ID, "x_opencti_labels": ioc.tags}
+    if ioc.type == "ip:port":
+        ioc.value, port = ioc.value.split(":", maxsplit=1)
+        description = f"Traffic seen on port {port}"
+        pattern_value = f"[ipv4-addr:value = '{ioc.value}']"
+        indicator_type, observable_type = "ipv4", "IPv4-Addr"
+        observable_class, observable_properties = stix2.IPv4Address, {}
+    elif ioc.type == "domain":
+        pattern_value = f"[domain-name:value = '{ioc.value}']"
+        indicator_type, observable_type = "domain", "Domain-Name"
+        observable_class, observable_properties = stix2.DomainName, {}
+    elif ioc.type == "url":
+        pattern_value = f"[url:value = '{ioc.value}']"
+        indicator_type, observable_type = "url", "Url"
+        observable_class, observable_properties = stix2.URL, {}
+    else:
+        hash_algorithm, pattern_hash, indicator_type = {
+            "md5_hash": ("MD5", "MD5", "md5"),
+            "sha1_hash": ("SHA-1", "SHA1", "sha1"),
+            "sha256_hash": ("SHA-256", "'SHA-256'", "sha256"),
+        }[ioc.type]
+        pattern_value = f"[file:hashes.{pattern_hash} = '{ioc.value}']"
+        observable_type = "StixFile"
+        observable_class = stix2.File
+        observable_properties = {"hashes": {hash_algorithm: ioc.value}}
+
+    if observable_class is stix2.File:
+        observable_properties["name"] = ioc.value
+    else:
+        observable_properties["value"] = ioc.value
+    custom_properties["x_opencti_description"] = description
+    custom_properties["x_opencti_score"] = connector.get_x_opencti_score(
+        observable_type
+    )
+    stix_observable = observable_class(
+        object_marking_refs=[stix2.TLP_WHITE],
+        custom_properties=custom_properties,
+        **observable_properties,
+    )
+    ext_refs = []
+    if ioc.reference:
+        ext_refs.append(
+            stix2.ExternalReference(
+                source_name="ThreatFox source reference", url=ioc.reference
+            )
+        )
+    stix_indicator = stix2.Indicator(
+        name=ioc.value,
+        description=description,
+        id=Indicator.generate_id(pattern_value),
+        indicator_types=[indicator_type],
+        pattern_type="stix",
+        pattern=pattern_value,
+        labels=ioc.tags,
+        object_marking_refs=[stix2.TLP_WHITE],
+        created_by_ref=IDENTITY_ID,
+        confidence=ioc.confidence_level,
+        external_references=ext_refs,
+        custom_properties={
+            "x_opencti_main_observable_type": observable_type,
+            "x_opencti_score": connector.get_x_opencti_score(observable_type),
+        },
+    )
+    objects = [stix_observable, stix_indicator]
+    targets = [("based-on", stix_observable)]
+    if ioc.malware_printable:
+        stix_malware = stix2.Malware(
+            id=Malware.generate_id(ioc.fk_malware),
+            name=ioc.fk_malware,
+            aliases=ioc.malware_aliases,
+            created_by_ref=IDENTITY_ID,
+            object_marking_refs=[stix2.TLP_WHITE],
+            confidence=ioc.confidence_level,
+            description=f"Threat: {ioc.fk_malware}\nReporter: {ioc.reporter}",
+            is_family=False,
+            labels=ioc.tags,
+            malware_types={"botnet_cc": ["Bot"], "payload_delivery": ["dropper"]}.get(
+                ioc.threat_type
+            ),
+        )
+        objects.append(stix_malware)
+        targets.append(("indicates", stix_malware))
+    for rel_type, target in targets:
+        objects.append(
+            stix2.Relationship(
+                id=StixCoreRelationship.generate_id(
+                    rel_type, stix_indicator.id, target.id
+                ),
+                source_ref=stix_indicator.id,
+                target_ref=target.id,
+                relationship_type=rel_type,
+                created_by_ref=IDENTITY_ID,
+                object_marking_refs=[stix2.TLP_WHITE],
+            )
+        )
+    return [stix_object.serialize() for stix_object in objects]
+
+
+def dict_process_row(connector: ThreatFox, ioc: FeedRow) -> list:
+    """Construction of the row objects by the connector"""
+
+    return [json.dumps(stix_object) for stix_object in connector.process_row(ioc)]
+
+
+def check_parity(connector: ThreatFox, csv_path: str, rows: int) -> None:
+    """Check that both constructions give the same objects for the first rows"""
+
+    with open(csv_path, "r", encoding="utf-8") as fd:
+        reader = csv.reader(fd, skipinitialspace=True)
+        for _, row in zip(range(rows), reader):
+            stix2_objects, dict_objects = (
+                {
+                    stix_object["id"]: {
+                        key: value
+                        for key, value in stix_object.items()
+                        if key not in RUN_TIMESTAMPS
+                    }
+                    for stix_object in map(json.loads, process(connector, FeedRow(row)))
+                }
+                for process in (stix2_process_row, dict_process_row)
+            )
+            assert stix2_objects == dict_objects, f"The objects of row {row} differ"
+    print(f"parity: the objects of the first {rows} rows match")
+
+
+def measure(name: str, process, connector: ThreatFox, csv_path: str) -> float:
+    """Process every row of the CSV and return the rows per second"""
+
+    with open(csv_path, "r", encoding="utf-8") as fd:
+        rows = list(csv.reader(fd, skipinitialspace=True))
+
+    start = time.perf_counter()
+    for row in rows:
+        process(connector, FeedRow(row))
+    elapsed = time.perf_counter() - start
+
+    rate = len(rows) / elapsed
+    print(f"{name:>6}: {len(rows)} rows in {elapsed:.1f}s, {rate:,.0f} rows/s")
+    return rate
+
+
+def main() -> None:
+    """Run the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--csv", default="threatfox_sample.csv")
+    parser.add_argument("--check-rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.csv):
+        print(f"Generating {args.rows} rows in {args.csv}")
+        generate_csv(args.csv, args.rows)
+
+    connector = create_connector()
+    check_parity(connector, args.csv, args.check_rows)
+    stix2_rate = measure("stix2", stix2_process_row, connector, args.csv)
+    dict_rate = measure("dict", dict_process_row, connector, args.csv)
+    print(f"speedup: {dict_rate / stix2_rate:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
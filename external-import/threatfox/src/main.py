@@ -15,21 +15,28 @@ from dataclasses import dataclass
 from datetime import UTC, datetime
 from typing import Dict, Iterable, List, Optional, Tuple, Union
 
-import stix2
 import validators
 import yaml
-from pycti import (
-    Indicator,
-    Malware,
-    OpenCTIConnectorHelper,
-    StixCoreRelationship,
-    get_config_variable,
+from abusech_stix import (
+    build_indicator,
+    build_malware,
+    build_observable,
+    build_relationship,
+    escape_pattern_value,
+    format_timestamp,
 )
-from stix2.base import _Observable as Observable
+from pycti import OpenCTIConnectorHelper, get_config_variable
 
 ALL_TYPES = "all_types"
+DEFAULT_BUNDLE_SIZE = 10000
 BASE_PATH = os.path.dirname(os.path.abspath(__file__))
 CSV_PATH = f"{BASE_PATH}/data.csv"
+# ioc_type: (hash algorithm, pattern hash name, indicator type)
+FILE_HASH_TYPES = {
+    "md5_hash": ("MD5", "MD5", "md5"),
+    "sha1_hash": ("SHA-1", "SHA1", "sha1"),
+    "sha256_hash": ("SHA-256", "'SHA-256'", "sha256"),
+}
 
 
 # pylint:disable=too-many-instance-attributes
@@ -114,6 +121,13 @@ class ThreatFox:
             default=None,
             required=False,
         )
+        self.threatfox_bundle_size: int = get_config_variable(
+            "THREATFOX_BUNDLE_SIZE",
+            ["threatfox", "bundle_size"],
+            config,
+            isNumber=True,
+            default=DEFAULT_BUNDLE_SIZE,
+        )
         self.ioc_to_import: list[str] = get_config_variable(
             "THREATFOX_IOC_TO_IMPORT",
             ["threatfox", "ioc_to_import"],
@@ -219,22 +233,27 @@ class ThreatFox:
             skipinitialspace=True,
         )
 
-        last_processed_entry_running_max = 0
+        last_processed_entry = state.get("last_processed_entry")  # epoch
+        if last_processed_entry is None:
+            self.helper.log_info(
+                "'last_processed_entry' state not found, setting it to epoch start."
+            )
+            last_processed_entry = 0
+
+        # Entries up to this one have been sent
+        last_processed_entry_sent = last_processed_entry
 
         try:
             lines = self.download_csv()
             csv_reader = csv.reader(lines, dialect="custom")
 
             bundle_objects = []
-
-            last_processed_entry = state.get("last_processed_entry")  # epoch
-            if last_processed_entry is None:
-                self.helper.log_info(
-                    "'last_processed_entry' state not found, setting it to epoch start."
-                )
-                last_processed_entry = 0
+            bundle_malware_ids = set()
 
             last_processed_entry_running_max = last_processed_entry
+            # The running max can only be checkpointed before the end of the
+            # file if the entries are sorted from the oldest to the newest
+            sorted_by_first_seen = True
 
             for i, row in enumerate(csv_reader):
                 ioc = FeedRow(row)
@@ -256,6 +275,8 @@ class ThreatFox:
                     continue
 
                 # update the running max
+                if ioc.first_seen.timestamp() < last_processed_entry_running_max:
+                    sorted_by_first_seen = False
                 last_processed_entry_running_max = max(
                     ioc.first_seen.timestamp(),
                     last_processed_entry_running_max,
@@ -266,20 +287,27 @@ class ThreatFox:
                         self.helper.log_info(f"Skipping offline IOC: {ioc.value}")
                         continue
 
-                bundle_objects.extend(self.process_row(ioc))
-
-            bundle = stix2.Bundle(
-                objects=bundle_objects,
-                allow_custom=True,
-            ).serialize()
-
-            self.helper.log_debug(bundle)
-            if "objects" in bundle:
-                self.helper.send_stix2_bundle(
-                    bundle,
-                    update=self.update_existing_data,
-                    work_id=work_id,
-                )
+                for stix_object in self.process_row(ioc):
+                    # Malware objects are shared by many entries
+                    if stix_object["type"] == "malware":
+                        if stix_object["id"] in bundle_malware_ids:
+                            continue
+                        bundle_malware_ids.add(stix_object["id"])
+                    bundle_objects.append(stix_object)
+
+                if len(bundle_objects) >= self.threatfox_bundle_size:
+                    self.send_bundle(bundle_objects, work_id)
+                    bundle_objects = []
+                    bundle_malware_ids = set()
+                    if sorted_by_first_seen:
+                        last_processed_entry_sent = last_processed_entry_running_max
+                        self.helper.set_state(
+                            dict(state, last_processed_entry=last_processed_entry_sent)
+                        )
+
+            if bundle_objects:
+                self.send_bundle(bundle_objects, work_id)
+            last_processed_entry_sent = last_processed_entry_running_max
 
             if os.path.exists(CSV_PATH):
                 os.remove(CSV_PATH)
@@ -293,11 +321,23 @@ class ThreatFox:
         self.helper.set_state(
             {
                 "last_run": now_ts,
-                "last_processed_entry": last_processed_entry_running_max,
+                "last_processed_entry": last_processed_entry_sent,
             }
         )
         self.helper.api.work.to_processed(work_id, message)
 
+    def send_bundle(self, bundle_objects: List, work_id: str) -> None:
+        """Send a bundle of STIX objects"""
+
+        bundle = self.helper.stix2_create_bundle(bundle_objects)
+
+        self.helper.log_debug(bundle)
+        self.helper.send_stix2_bundle(
+            bundle,
+            update=self.update_existing_data,
+            work_id=work_id,
+        )
+
     def download_csv(self) -> Iterable[str]:
         """
         Download the csv_url, and if zipped, extract `full.csv` otherwise
@@ -328,9 +368,10 @@ class ThreatFox:
             yield from (line for line in fd if not line.startswith("#"))
 
     def process_row(self, ioc: FeedRow) -> Iterable[Dict]:
-        """Process the IOC record and generate SCO/SDO/SRO objects."""
+        """Process the IOC record and generate SCO/SDO/SRO objects"""
 
-        stix_observable, stix_indicator = self.process_row_observable(ioc)
+        timestamp = format_timestamp(datetime.now(UTC))
+        stix_observable, stix_indicator = self.process_row_observable(ioc, timestamp)
         if stix_observable:
             yield stix_observable
         if stix_indicator:
@@ -340,211 +381,137 @@ class ThreatFox:
         if stix_observable is None:
             return
 
-        stix_malware = self.process_row_malware(ioc)
+        stix_malware = self.process_row_malware(ioc, timestamp)
         if stix_malware:
             yield stix_malware
 
         if stix_indicator and stix_observable:
-            yield self.create_relationship(stix_indicator, "based-on", stix_observable)
+            yield self.create_relationship(
+                stix_indicator, "based-on", stix_observable, timestamp
+            )
 
         if stix_indicator and stix_malware:
-            yield self.create_relationship(stix_indicator, "indicates", stix_malware)
+            yield self.create_relationship(
+                stix_indicator, "indicates", stix_malware, timestamp
+            )
 
     def process_row_observable(
-        self, ioc: FeedRow
-    ) -> Tuple[Optional[Observable], Optional[stix2.Indicator]]:
+        self, ioc: FeedRow, timestamp: str
+    ) -> Tuple[Optional[Dict], Optional[Dict]]:
         """Process the IOC record and return an observable and indicator"""
 
         description = None
         if ioc.type == "ip:port":
             ioc.value, port = ioc.value.split(":", maxsplit=1)
             description = f"Traffic seen on port {port}"
-            pattern_value = f"[ipv4-addr:value = '{ioc.value}']"
+            pattern_value = f"[ipv4-addr:value = '{escape_pattern_value(ioc.value)}']"
             indicator_type = "ipv4"
             observable_type = "IPv4-Addr"
-            stix_observable = stix2.IPv4Address(
-                value=ioc.value,
-                object_marking_refs=[stix2.TLP_WHITE],
-                custom_properties={
-                    "created_by_ref": self.identity["standard_id"],
-                    "x_opencti_description": description,
-                    "x_opencti_labels": ioc.tags,
-                    "x_opencti_score": (
-                        self.x_opencti_score_ip or self.default_x_opencti_score
-                    ),
-                },
-            )
+            object_type, contributing_properties = "ipv4-addr", {"value": ioc.value}
         elif ioc.type == "domain":
-            pattern_value = f"[domain-name:value = '{ioc.value}']"
+            pattern_value = f"[domain-name:value = '{escape_pattern_value(ioc.value)}']"
             indicator_type = "domain"
             observable_type = "Domain-Name"
-            stix_observable = stix2.DomainName(
-                value=ioc.value,
-                object_marking_refs=[stix2.TLP_WHITE],
-                custom_properties={
-                    "created_by_ref": self.identity["standard_id"],
-                    "x_opencti_description": description,
-                    "x_opencti_labels": ioc.tags,
-                    "x_opencti_score": (
-                        self.x_opencti_score_domain or self.default_x_opencti_score
-                    ),
-                },
-            )
+            object_type, contributing_properties = "domain-name", {"value": ioc.value}
         elif ioc.type == "url":
-            pattern_value = f"[url:value = '{ioc.value}']"
+            pattern_value = f"[url:value = '{escape_pattern_value(ioc.value)}']"
             indicator_type = "url"
             observable_type = "Url"
-            stix_observable = stix2.URL(
-                value=ioc.value,
-                object_marking_refs=[stix2.TLP_WHITE],
-                custom_properties={
-                    "created_by_ref": self.identity["standard_id"],
-                    "x_opencti_description": description,
-                    "x_opencti_labels": ioc.tags,
-                    "x_opencti_score": (
-                        self.x_opencti_score_url or self.default_x_opencti_score
-                    ),
-                },
-            )
-        elif ioc.type == "md5_hash":
-            pattern_value = f"[file:hashes.MD5 = '{ioc.value}']"
-            indicator_type = "md5"
-            observable_type = "StixFile"
-            stix_observable = stix2.File(
-                name=ioc.value,
-                hashes={"MD5": ioc.value},
-                object_marking_refs=[stix2.TLP_WHITE],
-                custom_properties={
-                    "created_by_ref": self.identity["standard_id"],
-                    "x_opencti_description": description,
-                    "x_opencti_labels": ioc.tags,
-                    "x_opencti_score": (
-                        self.x_opencti_score_hash or self.default_x_opencti_score
-                    ),
-                },
-            )
-        elif ioc.type == "sha1_hash":
-            pattern_value = f"[file:hashes.SHA1 = '{ioc.value}']"
-            indicator_type = "sha1"
-            observable_type = "StixFile"
-            stix_observable = stix2.File(
-                name=ioc.value,
-                hashes={"SHA-1": ioc.value},
-                object_marking_refs=[stix2.TLP_WHITE],
-                custom_properties={
-                    "created_by_ref": self.identity["standard_id"],
-                    "x_opencti_description": description,
-                    "x_opencti_labels": ioc.tags,
-                    "x_opencti_score": (
-                        self.x_opencti_score_hash or self.default_x_opencti_score
-                    ),
-                },
-            )
-        elif ioc.type == "sha256_hash":
-            pattern_value = f"[file:hashes.'SHA-256' = '{ioc.value}']"
-            indicator_type = "sha256"
+            object_type, contributing_properties = "url", {"value": ioc.value}
+        elif ioc.type in FILE_HASH_TYPES:
+            hash_algorithm, pattern_hash, indicator_type = FILE_HASH_TYPES[ioc.type]
+            pattern_literal = escape_pattern_value(ioc.value)
+            pattern_value = f"[file:hashes.{pattern_hash} = '{pattern_literal}']"
             observable_type = "StixFile"
-            stix_observable = stix2.File(
-                name=ioc.value,
-                hashes={"SHA-256": ioc.value},
-                object_marking_refs=[stix2.TLP_WHITE],
-                custom_properties={
-                    "created_by_ref": self.identity["standard_id"],
-                    "x_opencti_description": description,
-                    "x_opencti_labels": ioc.tags,
-                    "x_opencti_score": (
-                        self.x_opencti_score_hash or self.default_x_opencti_score
-                    ),
-                },
-            )
+            object_type = "file"
+            contributing_properties = {
+                "hashes": {hash_algorithm: ioc.value},
+                "name": ioc.value,
+            }
         else:
             self.helper.log_warning(f"Unrecognized ioc_type: {ioc.type}")
-            return None
+            return None, None
 
+        stix_observable = build_observable(
+            object_type,
+            contributing_properties,
+            created_by_ref=self.identity["standard_id"],
+            x_opencti_score=self.get_x_opencti_score(observable_type),
+        )
+        if description:
+            stix_observable["x_opencti_description"] = description
+        if ioc.tags:
+            stix_observable["x_opencti_labels"] = ioc.tags
+
+        if not self.create_indicators:
+            return stix_observable, None
+
+        stix_indicator = build_indicator(
+            pattern_value,
+            timestamp,
+            name=ioc.value,
+            indicator_types=[indicator_type],
+            created_by_ref=self.identity["standard_id"],
+            confidence=ioc.confidence_level,
+            x_opencti_main_observable_type=observable_type,
+            x_opencti_score=self.get_x_opencti_score(observable_type),
+        )
+        if description:
+            stix_indicator["description"] = description
+        if ioc.tags:
+            stix_indicator["labels"] = ioc.tags
         # Check if we have an external reference
         if validators.url(ioc.reference):
-            ext_refs = [
-                stix2.ExternalReference(
-                    source_name="ThreatFox source reference",
-                    url=ioc.reference,
-                )
+            stix_indicator["external_references"] = [
+                {
+                    "source_name": "ThreatFox source reference",
+                    "url": ioc.reference,
+                }
             ]
-        else:
-            ext_refs = []
-
-        if self.create_indicators:
-            stix_indicator = stix2.Indicator(
-                name=ioc.value,
-                description=description,
-                id=Indicator.generate_id(pattern_value),
-                indicator_types=[indicator_type],
-                pattern_type="stix",
-                pattern=pattern_value,
-                labels=ioc.tags,
-                object_marking_refs=[stix2.TLP_WHITE],
-                created_by_ref=self.identity["standard_id"],
-                confidence=ioc.confidence_level,
-                external_references=ext_refs,
-                custom_properties={
-                    "x_opencti_main_observable_type": observable_type,
-                    "x_opencti_score": self.get_x_opencti_score(observable_type),
-                },
-            )
-            self.helper.log_debug(f"Indicator created: {stix_indicator}")
-        else:
-            stix_indicator = None
 
         return stix_observable, stix_indicator
 
-    def process_row_malware(self, ioc: FeedRow) -> stix2.Malware:
+    def process_row_malware(self, ioc: FeedRow, timestamp: str) -> Optional[Dict]:
         """Process the IOC record and generate a malware SDO"""
 
         if not ioc.malware_printable:
             return None
 
-        if ioc.threat_type == "botnet_cc":
-            malware_types = ["Bot"]
-        elif ioc.threat_type == "payload_delivery":
-            malware_types = ["dropper"]
-        else:
-            malware_types = None
-
-        # Create the malware object
-        stix_malware = stix2.Malware(
-            id=Malware.generate_id(ioc.fk_malware),
-            name=ioc.fk_malware,
-            aliases=ioc.malware_aliases,
-            created_by_ref=self.identity["standard_id"],
-            object_marking_refs=[stix2.TLP_WHITE],
-            confidence=ioc.confidence_level,
+        stix_malware = build_malware(
+            ioc.fk_malware,
+            timestamp,
             description=f"Threat: {ioc.fk_malware}\nReporter: {ioc.reporter}",
             is_family=False,
-            labels=ioc.tags,
-            malware_types=malware_types,
+            created_by_ref=self.identity["standard_id"],
+            confidence=ioc.confidence_level,
         )
-        self.helper.log_debug(f"Malware object created: {stix_malware}")
+        if ioc.threat_type == "botnet_cc":
+            stix_malware["malware_types"] = ["Bot"]
+        elif ioc.threat_type == "payload_delivery":
+            stix_malware["malware_types"] = ["dropper"]
+        if ioc.malware_aliases:
+            stix_malware["aliases"] = ioc.malware_aliases
+        if ioc.tags:
+            stix_malware["labels"] = ioc.tags
 
         return stix_malware
 
     def create_relationship(
         self,
-        source: Observable,
+        source: Dict,
         rel_type: str,
-        target: Observable,
-    ) -> stix2.Relationship:
+        target: Dict,
+        timestamp: str,
+    ) -> Dict:
         """Create a relationship between two objects"""
 
-        stix_rel = stix2.Relationship(
-            id=StixCoreRelationship.generate_id(rel_type, source.id, target.id),
-            source_ref=source.id,
-            target_ref=target.id,
-            relationship_type=rel_type,
+        return build_relationship(
+            rel_type,
+            source["id"],
+            target["id"],
+            timestamp,
             created_by_ref=self.identity["standard_id"],
-            object_marking_refs=[stix2.TLP_WHITE],
         )
-        self.helper.log_debug(f"Relationship created: {source.id} -> {target.id}")
-
-        return stix_rel
 
 
 # pylint:disable=too-many-instance-attributes
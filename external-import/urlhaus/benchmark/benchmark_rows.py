@@ -0,0 +1,265 @@
+"""
+Throughput benchmark of the URLhaus row processing.
+
+Compare the rows per second of the dict based objects built by the connector
+with the previous construction through the stix2 library objects, including
+their serialization. The objects of the first rows of both constructions must
+have the same ids and properties. The sample CSV is generated if it does not
+exist.
+
+Usage: python benchmark/benchmark_rows.py [--rows 500000] [--csv sample.csv] [--check-rows 10000]
+"""
+
+import argparse
+import csv
+import datetime
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+import stix2
+from dateutil.parser import parse
+from pycti import Indicator, StixCoreRelationship
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, "..", "src"))
+# abusech_stix.py is shared with other connectors
+sys.path.insert(
+    0, os.path.join(BENCHMARK_DIR, "..", "..", "..", "shared", "abusech_stix")
+)
+
+# pylint:disable=wrong-import-position
+from abusech_stix import format_timestamp  # noqa: E402
+from urlhaus import URLhaus  # noqa: E402
+
+IDENTITY_ID = "identity--8f5e2a9c-21b7-5a43-9e1f-3a0d4f6b7c21"
+# Threat found on the platform for the tags of the rows
+THREAT_ID = "malware--0c7bb3e4-8e4c-5d5b-9f3e-4d6a2b1c0e9f"
+THREATS = ["malware_download", "Mozi", "elf", "exe", ""]
+RUN_TIMESTAMPS = ("created", "modified", "valid_from", "start_time", "stop_time")
+
+
+def generate_csv(path: str, rows: int) -> None:
+    """Write a sample CSV with the columns of the URLhaus export"""
+
+    rand = random.Random(0)
+    date_added = datetime.datetime(2024, 1, 1)
+    with open(path, "w", encoding="utf-8", newline="") as fd:
+        writer = csv.writer(fd, quoting=csv.QUOTE_ALL)
+        for i in range(rows):
+            digest = hashlib.sha256(str(i).encode()).hexdigest()
+            writer.writerow(
+                [
+                    str(i),
+                    (date_added + datetime.timedelta(seconds=i)).strftime(
+                        "%Y-%m-%d %H:%M:%S"
+                    ),
+                    f"http://{digest[:12]}.example.com/{digest[12:20]}.sh",
+                    rand.choice(["online", "offline"]),
+                    "",
+                    "malware_download",
+                    ",".join(rand.sample(THREATS, 2)).strip(","),
+                    f"https://urlhaus.abuse.ch/url/{i}/",
+                    "abuse_ch",
+                ]
+            )
+
+
+def create_connector() -> URLhaus:
+    """Create a connector with its settings, without an OpenCTI platform"""
+
+    connector = URLhaus.__new__(URLhaus)
+    connector.identity = {"standard_id": IDENTITY_ID}
+    connector.default_x_opencti_score = 80
+    return connector
+
+
+def stix2_process_row(connector: URLhaus, row: list, now: datetime.datetime) -> list:
+    """
+    Previous construction of the row objects with the stix2 library, with the
+    time of the run the library used made explicit.
+    """
+
+    entry_date = parse(row[1])
+    external_reference = stix2.ExternalReference(
+        source_name="Abuse.ch URLhaus",
+        url=row[7],
+        description="URLhaus repository URL",
+    )
+    pattern = "[url:value = '" + row[2] + "']"
+    stix_indicator = stix2.Indicator(
+        id=Indicator.generate_id(pattern),
+        name=row[2],
+        description="Threat: "
+        + row[5]
+        + " - Reporter: "
+        + row[8]
+        + " - Status: "
+        + row[3],
+        created_by_ref=IDENTITY_ID,
+        pattern_type="stix",
+        valid_from=entry_date,
+        created=entry_date,
+        modified=now,
+        pattern=pattern,
+        external_references=[external_reference],
+        object_marking_refs=[stix2.TLP_WHITE],
+        custom_properties={
+            "x_opencti_score": connector.default_x_opencti_score,
+            "x_opencti_main_observable_type": "Url",
+        },
+    )
+    stix_observable = stix2.URL(
+        value=row[2],
+        object_marking_refs=[stix2.TLP_WHITE],
+        custom_properties={
+            "description": "Threat: "
+            + row[5]
+            + " - Reporter: "
+            + row[8]
+            + " - Status: "
+            + row[3],
+            "x_opencti_score": connector.default_x_opencti_score,
+            "labels": [x for x in row[6].split(",") if x],
+            "created_by_ref": IDENTITY_ID,
+            "external_references": [external_reference],
+        },
+    )
+    stix_relationship = stix2.Relationship(
+        id=StixCoreRelationship.generate_id(
+            "based-on",
+            stix_indicator.id,
+            stix_observable.id,
+        ),
+        relationship_type="based-on",
+        source_ref=stix_indicator.id,
+        target_ref=stix_observable.id,
+        object_marking_refs=[stix2.TLP_WHITE],
+        created=now,
+        modified=now,
+    )
+    objects = [stix_indicator, stix_observable, stix_relationship]
+    if any(row[6].split(",")):
+        for source, relationship_type in (
+            (stix_indicator, "indicates"),
+            (stix_observable, "related-to"),
+        ):
+            objects.append(
+                stix2.Relationship(
+                    id=StixCoreRelationship.generate_id(
+                        relationship_type,
+                        source.id,
+                        THREAT_ID,
+                        entry_date,
+                        entry_date,
+                    ),
+                    source_ref=source.id,
+                    target_ref=THREAT_ID,
+                    relationship_type=relationship_type,
+                    start_time=entry_date,
+                    stop_time=entry_date + datetime.timedelta(0, 3),
+                    created_by_ref=IDENTITY_ID,
+                    object_marking_refs=[stix2.TLP_WHITE],
+                    created=entry_date,
+                    modified=entry_date,
+                    allow_custom=True,
+                )
+            )
+    return [stix_object.serialize() for stix_object in objects]
+
+
+def dict_process_row(connector: URLhaus, row: list, now: datetime.datetime) -> list:
+    """Construction of the row objects by the connector"""
+
+    entry_date = parse(row[1])
+    objects = list(connector.process_row(row, entry_date, format_timestamp(now)))
+    if any(row[6].split(",")):
+        for source, relationship_type in (
+            (objects[0], "indicates"),
+            (objects[1], "related-to"),
+        ):
+            objects.append(
+                connector.create_threat_relationship(
+                    source["id"], relationship_type, THREAT_ID, entry_date
+                )
+            )
+    return [json.dumps(stix_object) for stix_object in objects]
+
+
+def comparable(serialized_object: str) -> dict:
+    """Properties of a serialized object, with its timestamps as datetimes"""
+
+    return {
+        key: (
+            datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if key in RUN_TIMESTAMPS
+            else value
+        )
+        for key, value in json.loads(serialized_object).items()
+    }
+
+
+def read_rows(csv_path: str) -> list:
+    """Read the rows of the CSV"""
+
+    with open(csv_path, "r", encoding="utf-8") as fd:
+        return list(csv.reader(filter(lambda row: row[0] != "#", fd)))
+
+
+def check_parity(connector: URLhaus, rows: list, now: datetime.datetime) -> None:
+    """Check that both constructions give the same objects for the rows"""
+
+    for row in rows:
+        stix2_objects, dict_objects = (
+            {
+                stix_object["id"]: stix_object
+                for stix_object in map(comparable, process(connector, row, now))
+            }
+            for process in (stix2_process_row, dict_process_row)
+        )
+        assert stix2_objects == dict_objects, f"The objects of row {row} differ"
+    print(f"parity: the objects of the first {len(rows)} rows match")
+
+
+def measure(name: str, process, connector: URLhaus, rows: list) -> float:
+    """Process every row and return the rows per second"""
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    start = time.perf_counter()
+    for row in rows:
+        process(connector, row, now)
+    elapsed = time.perf_counter() - start
+
+    rate = len(rows) / elapsed
+    print(f"{name:>6}: {len(rows)} rows in {elapsed:.1f}s, {rate:,.0f} rows/s")
+    return rate
+
+
+def main() -> None:
+    """Run the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--csv", default="urlhaus_sample.csv")
+    parser.add_argument("--check-rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.csv):
+        print(f"Generating {args.rows} rows in {args.csv}")
+        generate_csv(args.csv, args.rows)
+
+    connector = create_connector()
+    rows = read_rows(args.csv)
+    # Timestamps of the run are only kept to the millisecond
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    check_parity(connector, rows[: args.check_rows], now)
+    stix2_rate = measure("stix2", stix2_process_row, connector, rows)
+    dict_rate = measure("dict", dict_process_row, connector, rows)
+    print(f"speedup: {dict_rate / stix2_rate:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
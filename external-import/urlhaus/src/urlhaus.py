@@ -7,15 +7,16 @@ import time
 import traceback
 import urllib.request
 
-import stix2
 import yaml
-from dateutil.parser import parse
-from pycti import (
-    Indicator,
-    OpenCTIConnectorHelper,
-    StixCoreRelationship,
-    get_config_variable,
+from abusech_stix import (
+    build_indicator,
+    build_observable,
+    build_relationship,
+    escape_pattern_value,
+    format_timestamp,
 )
+from dateutil.parser import parse
+from pycti import OpenCTIConnectorHelper, StixCoreRelationship, get_config_variable
 
 
 class URLhaus:
@@ -64,6 +65,63 @@ class URLhaus:
             description="abuse.ch is operated by a random swiss guy fighting malware for non-profit, running a couple of projects helping internet service providers and network operators protecting their infrastructure from malware.",
         )
 
+    def process_row(self, row, entry_date, now_timestamp):
+        entry_timestamp = format_timestamp(entry_date)
+        description = (
+            "Threat: " + row[5] + " - Reporter: " + row[8] + " - Status: " + row[3]
+        )
+        external_reference = {
+            "source_name": "Abuse.ch URLhaus",
+            "url": row[7],
+            "description": "URLhaus repository URL",
+        }
+        stix_indicator = build_indicator(
+            "[url:value = '" + escape_pattern_value(row[2]) + "']",
+            entry_timestamp,
+            now_timestamp,
+            name=row[2],
+            description=description,
+            created_by_ref=self.identity["standard_id"],
+            external_references=[external_reference],
+            x_opencti_score=self.default_x_opencti_score,
+            x_opencti_main_observable_type="Url",
+        )
+        stix_observable = build_observable(
+            "url",
+            {"value": row[2]},
+            description=description,
+            x_opencti_score=self.default_x_opencti_score,
+            created_by_ref=self.identity["standard_id"],
+            external_references=[external_reference],
+        )
+        labels = [x for x in row[6].split(",") if x]
+        if labels:
+            stix_observable["labels"] = labels
+        stix_relationship = build_relationship(
+            "based-on", stix_indicator["id"], stix_observable["id"], now_timestamp
+        )
+        return stix_indicator, stix_observable, stix_relationship
+
+    def create_threat_relationship(
+        self, source_ref, relationship_type, target_ref, entry_date
+    ):
+        return build_relationship(
+            relationship_type,
+            source_ref,
+            target_ref,
+            format_timestamp(entry_date),
+            relationship_id=StixCoreRelationship.generate_id(
+                relationship_type,
+                source_ref,
+                target_ref,
+                entry_date,
+                entry_date,
+            ),
+            start_time=format_timestamp(entry_date),
+            stop_time=format_timestamp(entry_date + datetime.timedelta(0, 3)),
+            created_by_ref=self.identity["standard_id"],
+        )
+
     def get_interval(self, offset=0):
         return (float(self.urlhaus_interval) * 60 * 60 * 24) + offset
 
@@ -93,6 +151,7 @@ class URLhaus:
             ):
                 self.helper.log_info("Connector will run!")
                 now = datetime.datetime.utcfromtimestamp(timestamp)
+                now_timestamp = format_timestamp(now)
                 friendly_name = "URLhaus run @ " + now.strftime("%Y-%m-%d %H:%M:%S")
                 work_id = self.helper.api.work.initiate_work(
                     self.helper.connect_id, friendly_name
@@ -159,60 +218,11 @@ class URLhaus:
                     )
 
                     if row[3] == "online" or self.urlhaus_import_offline:
-                        external_reference = stix2.ExternalReference(
-                            source_name="Abuse.ch URLhaus",
-                            url=row[7],
-                            description="URLhaus repository URL",
-                        )
-                        pattern = "[url:value = '" + row[2] + "']"
-                        stix_indicator = stix2.Indicator(
-                            id=Indicator.generate_id(pattern),
-                            name=row[2],
-                            description="Threat: "
-                            + row[5]
-                            + " - Reporter: "
-                            + row[8]
-                            + " - Status: "
-                            + row[3],
-                            created_by_ref=self.identity["standard_id"],
-                            pattern_type="stix",
-                            valid_from=entry_date,
-                            created=entry_date,
-                            pattern=pattern,
-                            external_references=[external_reference],
-                            object_marking_refs=[stix2.TLP_WHITE],
-                            custom_properties={
-                                "x_opencti_score": self.default_x_opencti_score,
-                                "x_opencti_main_observable_type": "Url",
-                            },
-                        )
-                        stix_observable = stix2.URL(
-                            value=row[2],
-                            object_marking_refs=[stix2.TLP_WHITE],
-                            custom_properties={
-                                "description": "Threat: "
-                                + row[5]
-                                + " - Reporter: "
-                                + row[8]
-                                + " - Status: "
-                                + row[3],
-                                "x_opencti_score": self.default_x_opencti_score,
-                                "labels": [x for x in row[6].split(",") if x],
-                                "created_by_ref": self.identity["standard_id"],
-                                "external_references": [external_reference],
-                            },
-                        )
-                        stix_relationship = stix2.Relationship(
-                            id=StixCoreRelationship.generate_id(
-                                "based-on",
-                                stix_indicator.id,
-                                stix_observable.id,
-                            ),
-                            relationship_type="based-on",
-                            source_ref=stix_indicator.id,
-                            target_ref=stix_observable.id,
-                            object_marking_refs=[stix2.TLP_WHITE],
-                        )
+                        (
+                            stix_indicator,
+                            stix_observable,
+                            stix_relationship,
+                        ) = self.process_row(row, entry_date, now_timestamp)
                         bundle_objects.append(stix_indicator)
                         bundle_objects.append(stix_observable)
                         bundle_objects.append(stix_relationship)
@@ -256,64 +266,24 @@ class URLhaus:
                                             threat = entities[0]
                                             treat_cache[label] = threat
                                     if threat is not None:
-                                        stix_threat_relation_indicator = (
-                                            stix2.Relationship(
-                                                id=StixCoreRelationship.generate_id(
-                                                    "indicates",
-                                                    stix_indicator.id,
-                                                    threat["standard_id"],
-                                                    entry_date,
-                                                    entry_date,
-                                                ),
-                                                source_ref=stix_indicator.id,
-                                                target_ref=threat["standard_id"],
-                                                relationship_type="indicates",
-                                                start_time=entry_date,
-                                                stop_time=entry_date
-                                                + datetime.timedelta(0, 3),
-                                                created_by_ref=self.identity[
-                                                    "standard_id"
-                                                ],
-                                                object_marking_refs=[stix2.TLP_WHITE],
-                                                created=entry_date,
-                                                modified=entry_date,
-                                                allow_custom=True,
-                                            )
-                                        )
-                                        stix_threat_relation_observable = (
-                                            stix2.Relationship(
-                                                id=StixCoreRelationship.generate_id(
-                                                    "related-to",
-                                                    stix_observable.id,
-                                                    threat["standard_id"],
-                                                    entry_date,
-                                                    entry_date,
-                                                ),
-                                                source_ref=stix_observable.id,
-                                                target_ref=threat["standard_id"],
-                                                relationship_type="related-to",
-                                                start_time=entry_date,
-                                                stop_time=entry_date
-                                                + datetime.timedelta(0, 3),
-                                                created_by_ref=self.identity[
-                                                    "standard_id"
-                                                ],
-                                                object_marking_refs=[stix2.TLP_WHITE],
-                                                created=entry_date,
-                                                modified=entry_date,
-                                                allow_custom=True,
-                                            )
-                                        )
                                         bundle_objects.append(
-                                            stix_threat_relation_indicator
+                                            self.create_threat_relationship(
+                                                stix_indicator["id"],
+                                                "indicates",
+                                                threat["standard_id"],
+                                                entry_date,
+                                            )
                                         )
                                         bundle_objects.append(
-                                            stix_threat_relation_observable
+                                            self.create_threat_relationship(
+                                                stix_observable["id"],
+                                                "related-to",
+                                                threat["standard_id"],
+                                                entry_date,
+                                            )
                                         )
                 fp.close()
-                bundle = stix2.Bundle(
-                    objects=bundle_objects, allow_custom=True
-                ).serialize()
+                bundle = self.helper.stix2_create_bundle(bundle_objects)
                 self.helper.send_stix2_bundle(
                     bundle,
                     update=self.update_existing_data,
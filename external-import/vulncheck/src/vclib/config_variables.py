@@ -67,3 +67,35 @@ class ConfigConnector:
             self.load,
             default=DataSource.get_all_data_source_strings(),
         )
+
+        self.num_workers = get_config_variable(
+            "CONNECTOR_VULNCHECK_NUM_WORKERS",
+            ["connector_vulncheck", "num_workers"],
+            self.load,
+            isNumber=True,
+            default=4,
+        )
+
+        self.memory_sample_items = get_config_variable(
+            "CONNECTOR_VULNCHECK_MEMORY_SAMPLE_ITEMS",
+            ["connector_vulncheck", "memory_sample_items"],
+            self.load,
+            isNumber=True,
+            default=1000,
+        )
+
+        self.memory_sample_interval = get_config_variable(
+            "CONNECTOR_VULNCHECK_MEMORY_SAMPLE_INTERVAL",
+            ["connector_vulncheck", "memory_sample_interval"],
+            self.load,
+            isNumber=True,
+            default=30,
+        )
+
+        self.memory_warning_threshold = get_config_variable(
+            "CONNECTOR_VULNCHECK_MEMORY_WARNING_THRESHOLD",
+            ["connector_vulncheck", "memory_warning_threshold"],
+            self.load,
+            isNumber=True,
+            default=0,
+        )
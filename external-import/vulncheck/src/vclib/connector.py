@@ -1,4 +1,5 @@
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 import stix2
@@ -9,13 +10,17 @@ from vclib.util.config import (
     get_intersection_of_string_lists,
     get_time_until_next_run,
 )
-from vclib.util.memory_usage import reset_max_mem
+from vclib.util.memory_usage import configure_memory_usage
 
 from .config_variables import ConfigConnector
 from .connector_client import ConnectorClient
 from .converter_to_stix import ConverterToStix
 from .models.data_source import DataSource
 
+# Each NVD backup source holds up to 200k STIX objects in memory, they are
+# collected one after the other so that only one of them is loaded at a time
+NVD_BACKUP_SOURCES = (DataSource.NistNVD2, DataSource.VulnCheckNVD2)
+
 
 class ConnectorVulnCheck:
     """
@@ -41,26 +46,80 @@ class ConnectorVulnCheck:
         self.helper = OpenCTIConnectorHelper(self.config.load)
         self.client = ConnectorClient(self.helper, self.config)
         self.converter_to_stix = ConverterToStix(self.helper)
+        configure_memory_usage(
+            helper=self.helper,
+            sample_items=self.config.memory_sample_items,
+            sample_interval=self.config.memory_sample_interval,
+            warning_threshold=self.config.memory_warning_threshold,
+        )
+
+    def _collect_data_source(self, source: DataSource, connector_state) -> None:
+        """
+        Collect intelligence from a source and convert into STIX object
+        """
+        self.helper.log_info(
+            f"[CONNECTOR] Collecting data for {source.name}",
+        )
+        # Get entities from source
+        source.collect_data_source(
+            self.config,
+            self.helper,
+            self.client,
+            self.converter_to_stix,
+            self.helper.connector_logger,
+            connector_state,
+        )
+
+    def _collect_data_sources(
+        self, data_sources: list[DataSource], connector_state
+    ) -> list[DataSource]:
+        """
+        Collect intelligence from the sources one after the other
+        :return: List of the sources successfully collected
+        """
+        collected_data_sources = []
+        for source in data_sources:
+            try:
+                self._collect_data_source(source, connector_state)
+                collected_data_sources.append(source)
+            except Exception as e:
+                self.helper.connector_logger.error(
+                    f"[CONNECTOR] Unable to collect data for {source.name}",
+                    {"error": str(e)},
+                )
+        return collected_data_sources
 
     def _collect_intelligence(
         self, target_data_sources: list[DataSource], connector_state
-    ):
+    ) -> list[DataSource]:
         """
-        Collect intelligence from the source and convert into STIX object
+        Collect intelligence from the sources concurrently, each source sending
+        its own works. The NVD backup sources are collected one after the other.
+        :return: List of the sources successfully collected
         """
-        for source in target_data_sources:
-            self.helper.log_info(
-                f"[CONNECTOR] Collecting data for {source.name}",
-            )
-            # Get entities from source
-            source.collect_data_source(
-                self.config,
-                self.helper,
-                self.client,
-                self.converter_to_stix,
-                self.helper.connector_logger,
-                connector_state,
-            )
+        nvd_backup_sources = [
+            source for source in target_data_sources if source in NVD_BACKUP_SOURCES
+        ]
+        source_groups = [
+            [source]
+            for source in target_data_sources
+            if source not in NVD_BACKUP_SOURCES
+        ]
+        if nvd_backup_sources:
+            source_groups.append(nvd_backup_sources)
+
+        collected_data_sources = []
+        with ThreadPoolExecutor(
+            max_workers=max(1, self.config.num_workers)
+        ) as executor:
+            futures = [
+                executor.submit(self._collect_data_sources, sources, connector_state)
+                for sources in source_groups
+            ]
+            for future in as_completed(futures):
+                collected_data_sources.extend(future.result())
+        self.converter_to_stix.clear_cache()
+        return collected_data_sources
 
     def _get_target_data_sources(self) -> list[DataSource]:
         entitled_data_sources = self.client.get_entitled_sources()
@@ -113,9 +172,6 @@ class ConnectorVulnCheck:
             {"connector_name": self.helper.connect_name},
         )
 
-        # INFO: Reset state for tracking memory usage during large volume data-processing
-        reset_max_mem()
-
         try:
             # Get the current state
             now = datetime.now()
@@ -149,16 +205,14 @@ class ConnectorVulnCheck:
                 )
                 self._initial_run()
 
-            try:
-                self.helper.connector_logger.info(
-                    "[CONNECTOR] Running connector...",
-                    {"connector_name": self.helper.connect_name},
-                )
-
-                self._collect_intelligence(target_data_sources, connector_state)
+            self.helper.connector_logger.info(
+                "[CONNECTOR] Running connector...",
+                {"connector_name": self.helper.connect_name},
+            )
 
-            except Exception as e:
-                self.helper.log_error(str(e))
+            collected_data_sources = self._collect_intelligence(
+                target_data_sources, connector_state
+            )
 
             # Store the current timestamp as a last run of the connector
             self.helper.connector_logger.debug(
@@ -168,7 +222,7 @@ class ConnectorVulnCheck:
             current_state_datetime = now.strftime("%Y-%m-%d %H:%M:%S")
 
             new_state = self._get_updated_state(
-                target_data_sources, current_state_datetime
+                connector_state, collected_data_sources, current_state_datetime
             )
 
             self.helper.set_state(new_state)
@@ -183,12 +237,19 @@ class ConnectorVulnCheck:
             self.helper.connector_logger.error(str(err))
 
     def _get_updated_state(
-        self, target_data_sources: list[DataSource], current_state_datetime
+        self,
+        connector_state,
+        collected_data_sources: list[DataSource],
+        current_state_datetime,
     ) -> dict:
-        new_state = {
-            data_source.name: current_state_datetime
-            for data_source in target_data_sources
-        }
+        # Sources that failed keep the state of their last successful run
+        new_state = dict(connector_state or {})
+        new_state.update(
+            {
+                data_source.name: current_state_datetime
+                for data_source in collected_data_sources
+            }
+        )
         new_state["last_run"] = current_state_datetime
         return new_state
 
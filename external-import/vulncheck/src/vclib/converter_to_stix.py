@@ -1,5 +1,6 @@
 import ipaddress
 from datetime import datetime
+from functools import lru_cache
 
 import stix2
 import validators
@@ -14,6 +15,10 @@ from pycti import (
     Vulnerability,
 )
 
+# Maximum number of Vulnerability and Software objects kept in cache, each
+# cache holds at most about 15 MB (3.5 kB per Vulnerability, 1.5 kB per Software)
+OBJECT_CACHE_SIZE = 4096
+
 
 class ConverterToStix:
     """Provides methods for converting various types of input data into STIX 2.1 objects.
@@ -31,6 +36,21 @@ class ConverterToStix:
         self.external_reference = self.create_external_reference_vc()
         self.author = self.create_author_vc(self.external_reference)
 
+        # PERF: Vulnerability and Software objects are shared by several sources
+        # collected concurrently, cache the most recent ones so that they are
+        # not built again. The cache is cleared after each NVD chunk is sent
+        self._cached_vulnerability = lru_cache(maxsize=OBJECT_CACHE_SIZE)(
+            self._create_vulnerability
+        )
+        self._cached_software = lru_cache(maxsize=OBJECT_CACHE_SIZE)(
+            self._create_software
+        )
+
+    def clear_cache(self) -> None:
+        """Clear the cached Vulnerability and Software objects"""
+        self._cached_vulnerability.cache_clear()
+        self._cached_software.cache_clear()
+
     @staticmethod
     def create_external_reference_vc() -> list[stix2.ExternalReference]:
         """Create external reference
@@ -256,6 +276,14 @@ class ConverterToStix:
         Examples:
             >>> create_vulnerability("CVE-2021-1234")
         """
+        return self._cached_vulnerability(
+            cve, description, tuple(sorted(custom_properties.items()))
+        )
+
+    def _create_vulnerability(
+        self, cve: str, description: str, custom_properties: tuple
+    ) -> stix2.Vulnerability:
+        custom_properties = dict(custom_properties)
         external_ref = self.create_external_reference(
             source_name=f"VulnCheck {cve}",
             url=f"https://vulncheck.com/cve/{cve}",
@@ -339,6 +367,11 @@ class ConverterToStix:
         Examples:
             >>> create_software("Windows", "Microsoft", "1.0" "cpe:/o:microsoft:windows")
         """
+        return self._cached_software(product, vendor, version, cpe)
+
+    def _create_software(
+        self, product: str, vendor: str, version: str, cpe: str
+    ) -> stix2.Software:
         software = stix2.Software(
             name=f"{vendor} {product}",
             vendor=vendor,
@@ -1,8 +1,9 @@
 import gzip
-import json
 import os
 import zipfile
+from typing import Iterator
 
+import ijson
 import stix2
 import vclib.util.works as works
 from pycti import OpenCTIConnectorHelper
@@ -14,7 +15,7 @@ from vclib.util.config import (
     compare_config_to_target_scope,
 )
 from vclib.util.cpe import parse_cpe_uri
-from vclib.util.memory_usage import log_memory_usage
+from vclib.util.memory_usage import MemoryMonitor
 from vclib.util.nvd import check_size_of_stix_objects, check_vuln_description
 from vulncheck_sdk.models.api_nvd20_cve import ApiNVD20CVE
 
@@ -126,10 +127,12 @@ def _process_nist_nvd2_json(
     converter_to_stix,
     logger,
     target_scope: list[str],
-    data,
-) -> list:
-    result = []
-    for item in data["vulnerabilities"]:
+    json_file,
+    monitor: MemoryMonitor,
+) -> Iterator[list]:
+    # PERF: Items are parsed one at a time from the stream instead of loading
+    # the whole vulnerabilities array in memory
+    for item in ijson.items(json_file, "vulnerabilities.item", use_float=True):
         try:
             entity = ApiNVD20CVE.model_validate(item["cve"])
         except ValidationError as e:
@@ -138,16 +141,13 @@ def _process_nist_nvd2_json(
                 {"item": item},
             )
             continue
-        log_memory_usage(logger)
-        result.extend(
-            _extract_stix_from_nistnvd2(
-                entity=entity,
-                target_scope=target_scope,
-                converter_to_stix=converter_to_stix,
-                logger=logger,
-            )
+        monitor.tick()
+        yield _extract_stix_from_nistnvd2(
+            entity=entity,
+            target_scope=target_scope,
+            converter_to_stix=converter_to_stix,
+            logger=logger,
         )
-    return result
 
 
 def _collect_nist_nvd2_from_backup(
@@ -169,6 +169,7 @@ def _collect_nist_nvd2_from_backup(
         work_num=work_num,
     )
     stix_objects = []
+    monitor = MemoryMonitor(source_name=source_name, logger=logger)
 
     logger.info("[NIST NVD-2] Parsing data into STIX objects")
 
@@ -177,24 +178,27 @@ def _collect_nist_nvd2_from_backup(
             if file_name.endswith(".gz"):
                 with zip_ref.open(file_name) as gz_file:
                     with gzip.open(gz_file) as json_file:
-                        stix_objects.extend(
-                            _process_nist_nvd2_json(
-                                converter_to_stix=converter_to_stix,
-                                logger=logger,
-                                target_scope=target_scope,
-                                data=json.load(json_file),
-                            )
-                        )
-
-                        stix_objects, work_id, work_num = check_size_of_stix_objects(
-                            helper=helper,
+                        for item_stix_objects in _process_nist_nvd2_json(
+                            converter_to_stix=converter_to_stix,
                             logger=logger,
-                            source_name=source_name,
-                            stix_objects=stix_objects,
                             target_scope=target_scope,
-                            work_id=work_id,
-                            work_num=work_num,
-                        )
+                            json_file=json_file,
+                            monitor=monitor,
+                        ):
+                            stix_objects.extend(item_stix_objects)
+
+                            stix_objects, work_id, work_num = (
+                                check_size_of_stix_objects(
+                                    helper=helper,
+                                    converter_to_stix=converter_to_stix,
+                                    logger=logger,
+                                    source_name=source_name,
+                                    stix_objects=stix_objects,
+                                    target_scope=target_scope,
+                                    work_id=work_id,
+                                    work_num=work_num,
+                                )
+                            )
 
     if len(stix_objects) > 0:
         works.finish_work(
@@ -205,6 +209,7 @@ def _collect_nist_nvd2_from_backup(
             work_name=source_name,
             work_num=work_num,
         )
+    monitor.finish()
     logger.info(
         "Finished parsing STIX from NIST-NVD2 backup!",
     )
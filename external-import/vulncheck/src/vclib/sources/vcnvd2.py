@@ -13,7 +13,7 @@ from vclib.util.config import (
     compare_config_to_target_scope,
 )
 from vclib.util.cpe import parse_cpe_uri
-from vclib.util.memory_usage import log_memory_usage
+from vclib.util.memory_usage import MemoryMonitor
 from vclib.util.nvd import check_size_of_stix_objects, check_vuln_description
 from vulncheck_sdk.models.api_nvd20_cve_extended import ApiNVD20CVEExtended
 
@@ -129,6 +129,7 @@ def _process_vc_nvd2_json(
     logger,
     target_scope: list[str],
     data,
+    monitor: MemoryMonitor,
 ) -> list:
     result = []
     for item in data["results"]:
@@ -140,7 +141,7 @@ def _process_vc_nvd2_json(
                 {"item": item},
             )
             continue
-        log_memory_usage(logger)
+        monitor.tick()
         result.extend(
             _extract_stix_from_vcnvd2(
                 entity=entity,
@@ -171,6 +172,7 @@ def _collect_vc_nvd2_from_backup(
         work_num=work_num,
     )
     stix_objects = []
+    monitor = MemoryMonitor(source_name=source_name, logger=logger)
 
     logger.info("[VULNCHECK NVD-2] Parsing data into STIX objects")
 
@@ -184,11 +186,13 @@ def _collect_vc_nvd2_from_backup(
                             logger=logger,
                             target_scope=target_scope,
                             data=json.load(json_file),
+                            monitor=monitor,
                         )
                     )
 
                     stix_objects, work_id, work_num = check_size_of_stix_objects(
                         helper=helper,
+                        converter_to_stix=converter_to_stix,
                         logger=logger,
                         source_name=source_name,
                         stix_objects=stix_objects,
@@ -206,6 +210,7 @@ def _collect_vc_nvd2_from_backup(
             work_name=source_name,
             work_num=work_num,
         )
+    monitor.finish()
     logger.info(
         "Finished parsing STIX from VulnCheck-NVD2 backup!",
     )
@@ -1,23 +1,105 @@
 import os
+import threading
+import time
 
 import psutil
+from prometheus_client import Gauge
 
-max_mem = 0
+_process = psutil.Process(os.getpid())
 
+_settings = {
+    "sample_items": 1000,
+    "sample_interval": 30,
+    "warning_threshold": 0,
+}
+_gauges = {}
+# The RSS is the one of the whole process, shared by the sources collected
+# concurrently, so its peak is tracked once for the process
+_peak_rss = {"bytes": 0}
+_peak_rss_lock = threading.Lock()
 
-def log_memory_usage(logger=None):
-    global max_mem
 
-    process = psutil.Process(os.getpid())
-    initial_memory = process.memory_info().rss
-    memory_mb = initial_memory / (1024 * 1024)
-    if memory_mb > max_mem:
-        max_mem = memory_mb
-    log_string = f"Current: {memory_mb:.2f} MB -- Max: {max_mem:.2f} MB"
+def configure_memory_usage(
+    helper, sample_items: int, sample_interval: int, warning_threshold: int
+) -> None:
+    """
+    Configure the sampling of the memory usage
+    :param helper: OpenCTIConnectorHelper, gauges are exposed if its metrics are
+    :param sample_items: Sample every N items
+    :param sample_interval: Sample at least every N seconds
+    :param warning_threshold: Log a warning above this RSS in MB, 0 to disable
+    """
+    _settings["sample_items"] = max(1, sample_items)
+    _settings["sample_interval"] = sample_interval
+    _settings["warning_threshold"] = warning_threshold
 
-    print(log_string) if logger is None else logger.info(log_string)
+    if helper.metric.activated and not _gauges:
+        _gauges["peak_rss"] = Gauge(
+            "vulncheck_peak_rss_bytes",
+            "Peak resident memory of the connector process",
+        )
+        _gauges["items_per_second"] = Gauge(
+            "vulncheck_items_per_second",
+            "Items processed per second while collecting a source",
+            ["source"],
+        )
 
 
-def reset_max_mem():
-    global max_mem
-    max_mem = 0
+class MemoryMonitor:
+    """
+    Sampled memory usage and throughput of the collection of a source
+
+    The RSS is only read every `sample_items` items or `sample_interval`
+    seconds, so that tick() is cheap enough to be called for every item.
+    Sources are collected concurrently, so the RSS and its peak are the ones
+    of the whole process, only the throughput is the one of the source.
+    """
+
+    def __init__(self, source_name: str, logger):
+        self.source_name = source_name
+        self.logger = logger
+        self.items = 0
+        self.started_at = time.monotonic()
+        self.sampled_at = self.started_at
+        self.next_sample = _settings["sample_items"]
+
+    def tick(self, n: int = 1) -> None:
+        self.items += n
+        if (
+            self.items >= self.next_sample
+            or time.monotonic() - self.sampled_at >= _settings["sample_interval"]
+        ):
+            self.sample()
+
+    def sample(self) -> None:
+        now = time.monotonic()
+        rss = _process.memory_info().rss
+        with _peak_rss_lock:
+            _peak_rss["bytes"] = max(_peak_rss["bytes"], rss)
+            peak_rss = _peak_rss["bytes"]
+        self.sampled_at = now
+        self.next_sample = self.items + _settings["sample_items"]
+
+        elapsed = now - self.started_at
+        items_per_second = self.items / elapsed if elapsed > 0 else 0.0
+        if _gauges:
+            _gauges["peak_rss"].set(peak_rss)
+            _gauges["items_per_second"].labels(source=self.source_name).set(
+                items_per_second
+            )
+
+        memory = {
+            "source": self.source_name,
+            "items": self.items,
+            "process_rss_mb": round(rss / (1024 * 1024), 2),
+            "process_peak_rss_mb": round(peak_rss / (1024 * 1024), 2),
+            "items_per_second": round(items_per_second, 2),
+        }
+        threshold = _settings["warning_threshold"]
+        if threshold and rss > threshold * 1024 * 1024:
+            self.logger.warning("[MEMORY] Memory usage above threshold", memory)
+        else:
+            self.logger.debug("[MEMORY] Memory usage", memory)
+
+    def finish(self) -> None:
+        self.sample()
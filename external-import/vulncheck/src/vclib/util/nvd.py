@@ -11,6 +11,7 @@ def check_vuln_description(descriptions: list) -> str:
 
 def check_size_of_stix_objects(
     helper,
+    converter_to_stix,
     logger,
     source_name: str,
     stix_objects: list,
@@ -32,6 +33,9 @@ def check_size_of_stix_objects(
             work_num=work_num,
         )
         stix_objects = []
+        # The objects of the flushed chunk are not needed anymore, do not
+        # keep them alive in the cache of the converter
+        converter_to_stix.clear_cache()
         work_num += 1
         work_id = works.start_work(
             helper=helper,
@@ -2,11 +2,15 @@ import json
 import os
 import re
 import sys
+import tempfile
 import time
 from datetime import datetime
 
+import ijson
+import misp_engine
 import stix2
 import yaml
+from misp_engine import FILETYPES, OPENCTISTIX2, PATTERNTYPES
 from pycti import (
     AttackPattern,
     CustomObservableHostname,
@@ -27,50 +31,6 @@ from pycti import (
     get_config_variable,
 )
 
-PATTERNTYPES = ["yara", "sigma", "pcre", "snort", "suricata"]
-OPENCTISTIX2 = {
-    "autonomous-system": {
-        "type": "autonomous-system",
-        "path": ["number"],
-        "transform": {"operation": "remove_string", "value": "AS"},
-    },
-    "mac-addr": {"type": "mac-addr", "path": ["value"]},
-    "hostname": {"type": "hostname", "path": ["value"]},
-    "domain": {"type": "domain-name", "path": ["value"]},
-    "ipv4-addr": {"type": "ipv4-addr", "path": ["value"]},
-    "ipv6-addr": {"type": "ipv6-addr", "path": ["value"]},
-    "url": {"type": "url", "path": ["value"]},
-    "link": {"type": "url", "path": ["value"]},
-    "email-address": {"type": "email-addr", "path": ["value"]},
-    "email-subject": {"type": "email-message", "path": ["subject"]},
-    "mutex": {"type": "mutex", "path": ["name"]},
-    "file-name": {"type": "file", "path": ["name"]},
-    "file-path": {"type": "file", "path": ["name"]},
-    "file-md5": {"type": "file", "path": ["hashes", "MD5"]},
-    "file-sha1": {"type": "file", "path": ["hashes", "SHA-1"]},
-    "file-sha256": {"type": "file", "path": ["hashes", "SHA-256"]},
-    "directory": {"type": "directory", "path": ["path"]},
-    "registry-key": {"type": "windows-registry-key", "path": ["key"]},
-    "registry-key-value": {"type": "windows-registry-value-type", "path": ["data"]},
-    "pdb-path": {"type": "file", "path": ["name"]},
-    "x509-certificate-issuer": {"type": "x509-certificate", "path": ["issuer"]},
-    "x509-certificate-serial-number": {
-        "type": "x509-certificate",
-        "path": ["serial_number"],
-    },
-    "text": {"type": "text", "path": ["value"]},
-    "user-agent": {"type": "user-agent", "path": ["value"]},
-    "phone-number": {"type": "phone-number", "path": ["value"]},
-    "user-account": {"type": "user-account", "path": ["account_login"]},
-    "user-account-github": {
-        "type": "user-account",
-        "path": ["account_login"],
-        "account_type": "github",
-    },
-    "identity-individual": {"type": "identity", "identity_class": "individual"},
-}
-FILETYPES = ["file-name", "file-md5", "file-sha1", "file-sha256"]
-
 
 class MispImportFile:
     def __init__(self):
@@ -179,6 +139,13 @@ class MispImportFile:
                 default=True,
             )
         )
+        self.misp_import_file_chunk_size = get_config_variable(
+            "MISP_IMPORT_FILE_CHUNK_SIZE",
+            ["misp_import_file", "chunk_size"],
+            config,
+            isNumber=True,
+            default=0,
+        )
 
     def _resolve_markings(self, tags, with_default=True):
         markings = []
@@ -742,129 +709,9 @@ class MispImportFile:
         return opencti_tags
 
     def _resolve_type(self, type, value):
-        types = {
-            "yara": [{"resolver": "yara"}],
-            "sigma": [{"resolver": "sigma"}],
-            "md5": [{"resolver": "file-md5", "type": "File"}],
-            "sha1": [{"resolver": "file-sha1", "type": "File"}],
-            "sha256": [{"resolver": "file-sha256", "type": "File"}],
-            "filename": [{"resolver": "file-name", "type": "File"}],
-            "pdb": [{"resolver": "pdb-path", "type": "File"}],
-            "filename|md5": [
-                {"resolver": "file-name", "type": "File"},
-                {"resolver": "file-md5", "type": "File"},
-            ],
-            "filename|sha1": [
-                {"resolver": "file-name", "type": "File"},
-                {"resolver": "file-sha1", "type": "File"},
-            ],
-            "filename|sha256": [
-                {"resolver": "file-name", "type": "File"},
-                {"resolver": "file-sha256", "type": "File"},
-            ],
-            "ip-src": [{"resolver": "ipv4-addr", "type": "IPv4-Addr"}],
-            "ip-dst": [{"resolver": "ipv4-addr", "type": "IPv4-Addr"}],
-            "ip-src|port": [
-                {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
-                {"resolver": "text", "type": "Text"},
-            ],
-            "ip-dst|port": [
-                {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
-                {"resolver": "text", "type": "Text"},
-            ],
-            "hostname": [{"resolver": "hostname", "type": "Hostname"}],
-            "hostname|port": [
-                {"resolver": "hostname", "type": "Hostname"},
-                {"resolver": "text", "type": "Text"},
-            ],
-            "domain": [{"resolver": "domain", "type": "Domain-Name"}],
-            "domain|ip": [
-                {"resolver": "domain", "type": "Domain-Name"},
-                {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
-            ],
-            "email-subject": [{"resolver": "email-subject", "type": "Email-Message"}],
-            "email": [{"resolver": "email-address", "type": "Email-Addr"}],
-            "email-src": [{"resolver": "email-address", "type": "Email-Addr"}],
-            "email-dst": [{"resolver": "email-address", "type": "Email-Addr"}],
-            "url": [{"resolver": "url", "type": "Url"}],
-            "windows-scheduled-task": [
-                {"resolver": "windows-scheduled-task", "type": "Text"}
-            ],
-            "regkey": [{"resolver": "registry-key", "type": "Windows-Registry-Key"}],
-            "user-agent": [{"resolver": "user-agent", "type": "User-Agent"}],
-            "phone-number": [{"resolver": "phone-number", "type": "Phone-Number"}],
-            "whois-registrant-email": [
-                {"resolver": "email-address", "type": "Email-Addr"}
-            ],
-            "text": [{"resolver": "text", "type": "Text"}],
-            "github-username": [
-                {"resolver": "user-account-github", "type": "User-Account"}
-            ],
-            "full-name": [{"resolver": "identity-individual", "type": "Identity"}],
-        }
-        if type in types:
-            resolved_types = types[type]
-            if len(resolved_types) == 2:
-                values = value.split("|")
-                if len(values) == 2:
-                    if resolved_types[0]["resolver"] == "ipv4-addr":
-                        resolver_0 = self._detect_ip_version(values[0])
-                        type_0 = self._detect_ip_version(values[0], True)
-                    else:
-                        resolver_0 = resolved_types[0]["resolver"]
-                        type_0 = resolved_types[0]["type"]
-                    if resolved_types[1]["resolver"] == "ipv4-addr":
-                        resolver_1 = self._detect_ip_version(values[1])
-                        type_1 = self._detect_ip_version(values[1], True)
-                    else:
-                        resolver_1 = resolved_types[1]["resolver"]
-                        type_1 = resolved_types[1]["type"]
-                    return [
-                        {"resolver": resolver_0, "type": type_0, "value": values[0]},
-                        {"resolver": resolver_1, "type": type_1, "value": values[1]},
-                    ]
-                else:
-                    return None
-            else:
-                if (
-                    "resolver" in resolved_types[0]
-                    and resolved_types[0]["resolver"] == "ipv4-addr"
-                    or resolved_types[0] == "ipv4-addr"
-                ):
-                    resolver_0 = self._detect_ip_version(value)
-                    type_0 = self._detect_ip_version(value, True)
-                else:
-                    resolver_0 = resolved_types[0]["resolver"]
-                    type_0 = (
-                        resolved_types[0]["type"]
-                        if "type" in resolved_types[0]
-                        else None
-                    )
-                return [{"resolver": resolver_0, "type": type_0, "value": value}]
-        # If not found, return text observable as a fallback
-        if self.misp_import_file_import_unsupported_observables_as_text:
-            return [
-                {
-                    "resolver": "text",
-                    "type": "Text",
-                    "value": value + " (type=" + type + ")",
-                }
-            ]
-        else:
-            return None
-
-    def _detect_ip_version(self, value, type=False):
-        if re.match(
-            r"^((25[0-5]|(2[0-4]|1\d|[1-9]|)\d)\.?\b){4}(\/([1-9]|[1-2]\d|3[0-2]))?$",
-            value,
-        ):
-            if type:
-                return "IPv4-Addr"
-            return "ipv4-addr"
-        else:
-            if type:
-                return "IPv6-Addr"
-            return "ipv6-addr"
+        return misp_engine.resolve_type(
+            type, value, self.misp_import_file_import_unsupported_observables_as_text
+        )
 
     def _get_pdf_file(self, attribute):
         if not self.misp_import_file_import_with_attachments:
@@ -1054,163 +901,14 @@ class MispImportFile:
                         "created_by_ref": author["id"],
                         "external_references": attribute_external_references,
                     }
-                    observable = None
-                    if observable_type == "Autonomous-System":
-                        observable = stix2.AutonomousSystem(
-                            number=observable_value.replace("AS", ""),
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Mac-Addr":
-                        observable = stix2.MACAddress(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Hostname":
-                        observable = CustomObservableHostname(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Domain-Name":
-                        observable = stix2.DomainName(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "IPv4-Addr":
-                        observable = stix2.IPv4Address(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "IPv6-Addr":
-                        observable = stix2.IPv6Address(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Url":
-                        observable = stix2.URL(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Email-Addr":
-                        observable = stix2.EmailAddress(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Email-Message":
-                        observable = stix2.EmailMessage(
-                            subject=observable_value,
-                            is_multipart=True,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Mutex":
-                        observable = stix2.Mutex(
-                            name=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "User-Account":
-                        if "account_type" in OPENCTISTIX2[observable_resolver]:
-                            observable = stix2.UserAccount(
-                                account_login=observable_value,
-                                account_type=OPENCTISTIX2[observable_resolver][
-                                    "account_type"
-                                ],
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        else:
-                            observable = stix2.UserAccount(
-                                account_login=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                    elif observable_type == "File":
-                        if OPENCTISTIX2[observable_resolver]["path"][0] == "name":
-                            observable = stix2.File(
-                                name=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        elif OPENCTISTIX2[observable_resolver]["path"][0] == "hashes":
-                            hashes = {}
-                            hashes[OPENCTISTIX2[observable_resolver]["path"][1]] = (
-                                observable_value
-                            )
-                            observable = stix2.File(
-                                name=file_name,
-                                hashes=hashes,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                    elif observable_type == "Directory":
-                        observable = stix2.Directory(
-                            path=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Windows-Registry-Key":
-                        observable = stix2.WindowsRegistryKey(
-                            key=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Windows-Registry-Value-Type":
-                        observable = stix2.WindowsRegistryValueType(
-                            data=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "X509-Certificate":
-                        if OPENCTISTIX2[observable_resolver]["path"][0] == "issuer":
-                            observable = stix2.File(
-                                issuer=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                        elif (
-                            OPENCTISTIX2[observable_resolver]["path"][1]
-                            == "serial_number"
-                        ):
-                            observable = stix2.File(
-                                serial_number=observable_value,
-                                object_marking_refs=attribute_markings,
-                                custom_properties=custom_properties,
-                            )
-                    elif observable_type == "Phone-Number":
-                        observable = CustomObservablePhoneNumber(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Text":
-                        observable = CustomObservableText(
-                            value=observable_value,
-                            object_marking_refs=attribute_markings,
-                            custom_properties=custom_properties,
-                        )
-                    elif observable_type == "Identity":
-                        observable = stix2.Identity(
-                            id=Identity.generate_id(
-                                observable_value,
-                                OPENCTISTIX2[observable_resolver]["identity_class"],
-                            ),
-                            name=observable_value,
-                            identity_class=OPENCTISTIX2[observable_resolver][
-                                "identity_class"
-                            ],
-                            description=attribute["comment"],
-                            labels=attribute_tags,
-                            created_by_ref=author["id"],
-                            external_references=attribute_external_references,
-                        )
+                    observable = misp_engine.build_observable(
+                        observable_type,
+                        observable_resolver,
+                        observable_value,
+                        attribute_markings,
+                        custom_properties,
+                        file_name,
+                    )
                 except Exception as e:
                     self.helper.log_error(
                         f"Error creating observable type {observable_type} with value {observable_value}: {e}"
@@ -2035,38 +1733,156 @@ class MispImportFile:
     def _process_message(self, data):
         file_fetch = data["file_fetch"]
         bypass_validation = data["bypass_validation"]
-        file_markings = data.get("file_markings", [])
         file_uri = self.helper.opencti_url + file_fetch
         self.helper.log_info(f"Importing the file {file_uri}")
-        file_content = self.helper.api.fetch_opencti_file(file_uri)
-        events = json.loads(file_content)
-        if not isinstance(events, list):
-            if "response" in events:
-                events = events["response"]
-            else:
-                events = [events]
         bundles_sent = 0
-        for event in events:
-            bundle_json = self._process_event(event)
-            entity_id = data.get("entity_id", None)
-            if entity_id:
-                self.helper.log_info("Contextual import.")
-                bundle = json.loads(bundle_json)["objects"]
-                bundle = self._update_container(bundle, entity_id)
-                bundle_json = self.helper.stix2_create_bundle(bundle)
-            bundles_sent_event = self.helper.send_stix2_bundle(
-                bundle_json,
-                bypass_validation=bypass_validation,
-                file_name=data["file_id"],
-                entity_id=entity_id,
-                file_markings=file_markings,
-            )
-            bundles_sent = bundles_sent + len(bundles_sent_event)
+        if self.misp_import_file_chunk_size > 0:
+            with tempfile.TemporaryFile() as file:
+                self._download_file(file_uri, file)
+                for event in self._stream_events(file):
+                    bundles_sent = bundles_sent + self._send_event(data, event)
+        else:
+            file_content = self.helper.api.fetch_opencti_file(file_uri)
+            events = json.loads(file_content)
+            if not isinstance(events, list):
+                if "response" in events:
+                    events = events["response"]
+                else:
+                    events = [events]
+            for event in events:
+                bundles_sent = bundles_sent + self._send_event(data, event)
         if self.helper.get_validate_before_import() and not bypass_validation:
             return "Generated bundle sent for validation"
         else:
             return str(bundles_sent) + " generated bundle(s) for worker import"
 
+    def _send_event(self, data, event) -> int:
+        bundle_json = self._process_event(event)
+        entity_id = data.get("entity_id", None)
+        if entity_id:
+            self.helper.log_info("Contextual import.")
+            bundle = json.loads(bundle_json)["objects"]
+            bundle = self._update_container(bundle, entity_id)
+            bundle_json = self.helper.stix2_create_bundle(bundle)
+        bundles_sent_event = self.helper.send_stix2_bundle(
+            bundle_json,
+            bypass_validation=data["bypass_validation"],
+            file_name=data["file_id"],
+            entity_id=entity_id,
+            file_markings=data.get("file_markings", []),
+        )
+        return len(bundles_sent_event)
+
+    def _download_file(self, file_uri, file):
+        api = self.helper.api
+        with api.session.get(
+            file_uri,
+            headers=api.request_headers,
+            verify=api.ssl_verify,
+            cert=api.cert,
+            proxies=api.proxies,
+            timeout=300,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            for data in response.iter_content(chunk_size=1024 * 1024):
+                file.write(data)
+        file.seek(0)
+
+    @staticmethod
+    def _events_prefix(file) -> str:
+        # Exports are either a list of events, a {"response": [...]} or a single event
+        prefix = ""
+        for _, event, value in ijson.parse(file):
+            if event == "start_array":
+                prefix = "item"
+            elif event == "map_key" and value == "response":
+                prefix = "response.item"
+            if event != "start_map":
+                break
+        file.seek(0)
+        return prefix
+
+    def _stream_events(self, file):
+        """
+        Walk the exported events and yield them in chunks of at most
+        `chunk_size` attributes, counting the attributes of the objects. An
+        object is never split, so one larger than `chunk_size` makes a chunk
+        on its own.
+
+        A first pass collects every event without its attributes and objects,
+        a second pass streams `Event.Attribute` and `Event.Object` items. Each
+        chunk is a complete event carrying the event author, tags, galaxies
+        and metadata, so the resulting bundle holds its own author, markings
+        and report referencing the chunk objects. Event reports are only added
+        to the last chunk of each event.
+        """
+        events_prefix = self._events_prefix(file)
+        event_prefix = events_prefix + "." if events_prefix else ""
+        items_prefixes = {
+            event_prefix + "Event.Attribute.item": "Attribute",
+            event_prefix + "Event.Object.item": "Object",
+        }
+
+        # First pass, events without attributes and objects
+        skeletons = []
+        builder = None
+        for prefix, event, value in ijson.parse(file, use_float=True):
+            if prefix == events_prefix and event == "start_map":
+                builder = ijson.ObjectBuilder()
+            if builder is None or any(
+                prefix == items_prefix or prefix.startswith(items_prefix + ".")
+                for items_prefix in items_prefixes
+            ):
+                continue
+            builder.event(event, value)
+            if prefix == events_prefix and event == "end_map":
+                skeletons.append(builder.value)
+                builder = None
+        file.seek(0)
+
+        def chunk(skeleton, attributes, objects, last):
+            event = dict(skeleton["Event"], Attribute=attributes, Object=objects)
+            if not last:
+                event["EventReport"] = []
+            return {**skeleton, "Event": event}
+
+        # Second pass, attributes and objects by chunks
+        event_index = -1
+        attributes, objects, chunk_length = [], [], 0
+        builder = None
+        for prefix, event, value in ijson.parse(file, use_float=True):
+            if prefix == events_prefix and event == "start_map":
+                event_index += 1
+            elif prefix == events_prefix and event == "end_map":
+                yield chunk(skeletons[event_index], attributes, objects, True)
+                attributes, objects, chunk_length = [], [], 0
+            elif prefix in items_prefixes and event == "start_map":
+                builder = ijson.ObjectBuilder()
+            if builder is None:
+                continue
+            builder.event(event, value)
+            if prefix in items_prefixes and event == "end_map":
+                item = builder.value
+                builder = None
+                if items_prefixes[prefix] == "Attribute":
+                    item_length = 1
+                else:
+                    item_length = max(len(item.get("Attribute", [])), 1)
+                # An object is never split, one larger than the chunk size
+                # is sent alone in its own chunk
+                if (
+                    chunk_length > 0
+                    and chunk_length + item_length > self.misp_import_file_chunk_size
+                ):
+                    yield chunk(skeletons[event_index], attributes, objects, False)
+                    attributes, objects, chunk_length = [], [], 0
+                if items_prefixes[prefix] == "Attribute":
+                    attributes.append(item)
+                else:
+                    objects.append(item)
+                chunk_length += item_length
+
     def start(self):
         self.helper.listen(self._process_message)
 
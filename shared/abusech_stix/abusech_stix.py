@@ -0,0 +1,118 @@
+"""
+STIX objects of the abuse.ch feed rows, built as plain serializable dicts.
+
+The rows of the ThreatFox and URLhaus exports have a fixed schema, so their
+objects are built with the deterministic ids the stix2 and pycti libraries
+would give them, without the property validation of the stix2 library for
+every row.
+"""
+
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import stix2
+from pycti import Indicator, Malware, StixCoreRelationship
+from stix2.base import SCO_DET_ID_NAMESPACE
+from stix2.canonicalization.Canonicalize import canonicalize
+
+TLP_WHITE_ID = stix2.TLP_WHITE["id"]
+
+
+def generate_observable_id(object_type: str, contributing_properties: Dict) -> str:
+    """Generate the deterministic id of an observable, as the stix2 library does"""
+
+    data = canonicalize(contributing_properties, utf8=False)
+    return f"{object_type}--{uuid.uuid5(SCO_DET_ID_NAMESPACE, data)}"
+
+
+def escape_pattern_value(value: str) -> str:
+    """Escape a value to be used as a string literal in a STIX pattern"""
+
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+def format_timestamp(dttm: datetime) -> str:
+    """Format a datetime as a STIX timestamp, naive datetimes being in UTC"""
+
+    if dttm.tzinfo is None:
+        dttm = dttm.replace(tzinfo=timezone.utc)
+    return dttm.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def build_observable(
+    object_type: str, contributing_properties: Dict, **properties
+) -> Dict:
+    """Build an observable identified by its contributing properties"""
+
+    return {
+        "type": object_type,
+        "spec_version": "2.1",
+        "id": generate_observable_id(object_type, contributing_properties),
+        **contributing_properties,
+        "object_marking_refs": [TLP_WHITE_ID],
+        **properties,
+    }
+
+
+def build_indicator(
+    pattern: str, created: str, modified: Optional[str] = None, **properties
+) -> Dict:
+    """Build a STIX pattern indicator, valid from its creation"""
+
+    return {
+        "type": "indicator",
+        "spec_version": "2.1",
+        "id": Indicator.generate_id(pattern),
+        "created": created,
+        "modified": modified or created,
+        "pattern": pattern,
+        "pattern_type": "stix",
+        "pattern_version": "2.1",
+        "valid_from": created,
+        "object_marking_refs": [TLP_WHITE_ID],
+        **properties,
+    }
+
+
+def build_malware(name: str, created: str, **properties) -> Dict:
+    """Build a malware, identified by its name"""
+
+    return {
+        "type": "malware",
+        "spec_version": "2.1",
+        "id": Malware.generate_id(name),
+        "created": created,
+        "modified": created,
+        "name": name,
+        "object_marking_refs": [TLP_WHITE_ID],
+        **properties,
+    }
+
+
+def build_relationship(
+    relationship_type: str,
+    source_ref: str,
+    target_ref: str,
+    created: str,
+    relationship_id: Optional[str] = None,
+    **properties,
+) -> Dict:
+    """
+    Build a relationship, identified by default by its type, source and
+    target.
+    """
+
+    return {
+        "type": "relationship",
+        "spec_version": "2.1",
+        "id": relationship_id
+        or StixCoreRelationship.generate_id(relationship_type, source_ref, target_ref),
+        "created": created,
+        "modified": created,
+        "relationship_type": relationship_type,
+        "source_ref": source_ref,
+        "target_ref": target_ref,
+        "object_marking_refs": [TLP_WHITE_ID],
+        **properties,
+    }
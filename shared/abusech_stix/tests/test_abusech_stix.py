@@ -0,0 +1,165 @@
+"""Parity tests of the dict builders with the objects of the stix2 library"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import stix2
+from abusech_stix import (
+    build_indicator,
+    build_malware,
+    build_observable,
+    build_relationship,
+    escape_pattern_value,
+    format_timestamp,
+)
+from pycti import Indicator, Malware, StixCoreRelationship
+
+IDENTITY_ID = "identity--8f5e2a9c-21b7-5a43-9e1f-3a0d4f6b7c21"
+DATE = datetime(2024, 5, 2, 9, 6, 40, 123000, tzinfo=timezone.utc)
+TIMESTAMPS = ("created", "modified", "valid_from", "start_time", "stop_time")
+
+
+def properties(stix_object):
+    """Serialized properties of an object, with its timestamps as datetimes"""
+
+    if not isinstance(stix_object, dict):
+        stix_object = json.loads(stix_object.serialize())
+    return {
+        key: (
+            datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if key in TIMESTAMPS
+            else value
+        )
+        for key, value in json.loads(json.dumps(stix_object)).items()
+    }
+
+
+def test_naive_and_aware_datetimes_give_the_same_timestamp():
+    naive = DATE.replace(tzinfo=None)
+    aware = DATE.astimezone(timezone(timedelta(hours=2)))
+
+    assert format_timestamp(naive) == "2024-05-02T09:06:40.123Z"
+    assert format_timestamp(aware) == "2024-05-02T09:06:40.123Z"
+
+
+@pytest.mark.parametrize(
+    "stix2_class,object_type,contributing_properties",
+    [
+        (stix2.IPv4Address, "ipv4-addr", {"value": "198.51.100.7"}),
+        (stix2.DomainName, "domain-name", {"value": "example.com"}),
+        (stix2.URL, "url", {"value": "http://example.com/it's.exe"}),
+        (
+            stix2.File,
+            "file",
+            {
+                "hashes": {
+                    "SHA-256": "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+                },
+                "name": "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855",
+            },
+        ),
+    ],
+)
+def test_observable_matches_stix2(stix2_class, object_type, contributing_properties):
+    custom_properties = {
+        "created_by_ref": IDENTITY_ID,
+        "x_opencti_score": 80,
+        "x_opencti_labels": ["exe", "RAT"],
+    }
+    stix_observable = build_observable(
+        object_type, contributing_properties, **custom_properties
+    )
+
+    assert properties(stix_observable) == properties(
+        stix2_class(
+            object_marking_refs=[stix2.TLP_WHITE],
+            custom_properties=custom_properties,
+            **contributing_properties,
+        )
+    )
+
+
+def test_indicator_matches_stix2():
+    value = "http://example.com/it's"
+    pattern = f"[url:value = '{escape_pattern_value(value)}']"
+    stix_indicator = build_indicator(
+        pattern,
+        format_timestamp(DATE),
+        name=value,
+        created_by_ref=IDENTITY_ID,
+        x_opencti_score=80,
+    )
+
+    assert properties(stix_indicator) == properties(
+        stix2.Indicator(
+            id=Indicator.generate_id(pattern),
+            name=value,
+            pattern=pattern,
+            pattern_type="stix",
+            pattern_version="2.1",
+            created=DATE,
+            modified=DATE,
+            valid_from=DATE,
+            created_by_ref=IDENTITY_ID,
+            object_marking_refs=[stix2.TLP_WHITE],
+            custom_properties={"x_opencti_score": 80},
+        )
+    )
+
+
+def test_malware_matches_stix2():
+    stix_malware = build_malware(
+        "win.cobalt_strike",
+        format_timestamp(DATE),
+        is_family=False,
+        aliases=["BEACON"],
+        created_by_ref=IDENTITY_ID,
+    )
+
+    assert properties(stix_malware) == properties(
+        stix2.Malware(
+            id=Malware.generate_id("win.cobalt_strike"),
+            name="win.cobalt_strike",
+            is_family=False,
+            aliases=["BEACON"],
+            created=DATE,
+            modified=DATE,
+            created_by_ref=IDENTITY_ID,
+            object_marking_refs=[stix2.TLP_WHITE],
+        )
+    )
+
+
+def test_relationship_matches_stix2():
+    source_ref = Indicator.generate_id("[url:value = 'http://example.com']")
+    target_ref = Malware.generate_id("win.cobalt_strike")
+    stix_relationship = build_relationship(
+        "indicates",
+        source_ref,
+        target_ref,
+        format_timestamp(DATE),
+        start_time=format_timestamp(DATE),
+        stop_time=format_timestamp(DATE + timedelta(seconds=3)),
+    )
+
+    assert properties(stix_relationship) == properties(
+        stix2.Relationship(
+            id=StixCoreRelationship.generate_id("indicates", source_ref, target_ref),
+            relationship_type="indicates",
+            source_ref=source_ref,
+            target_ref=target_ref,
+            created=DATE,
+            modified=DATE,
+            start_time=DATE,
+            stop_time=DATE + timedelta(seconds=3),
+            object_marking_refs=[stix2.TLP_WHITE],
+        )
+    )
+
+
+def test_escaped_pattern_is_valid():
+    value = "http://example.com/\\path/it's"
+    pattern = f"[url:value = '{escape_pattern_value(value)}']"
+
+    stix2.Indicator(pattern=pattern, pattern_type="stix")
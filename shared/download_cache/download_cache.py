@@ -0,0 +1,123 @@
+"""On-disk cache of downloaded files, refreshed with conditional requests."""
+
+import gzip
+import hashlib
+import json
+import os
+import ssl
+import urllib.error
+import urllib.request
+from typing import Optional
+
+
+class DownloadCache:
+    """
+    Store the downloaded files compressed along with their ETag and
+    Last-Modified headers, so that a file is only downloaded again when it
+    changed and can be replayed offline.
+
+    The headers of a new download are only persisted by `save()`, to be called
+    once the content has been successfully processed, so that a failed run
+    downloads the file again on the next run.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.pending = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, url: str, extension: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.{extension}")
+
+    def _load_headers(self, url: str) -> dict:
+        headers_path = self._path(url, "headers.json")
+        if not os.path.isfile(headers_path) or not os.path.isfile(
+            self._path(url, "gz")
+        ):
+            return {}
+        try:
+            with open(headers_path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def fetch(self, url: str) -> Optional[bytes]:
+        """
+        Download the file at the given url if it changed since it was cached.
+
+        Parameters
+        ----------
+        url : str
+            Url to retrieve.
+
+        Returns
+        -------
+        bytes
+            The content of the file, or None if it did not change.
+        """
+        request = urllib.request.Request(url)
+        headers = self._load_headers(url)
+        if headers.get("etag"):
+            request.add_header("If-None-Match", headers["etag"])
+        if headers.get("last_modified"):
+            request.add_header("If-Modified-Since", headers["last_modified"])
+
+        try:
+            with urllib.request.urlopen(
+                request, context=ssl.create_default_context()
+            ) as response:
+                content = response.read()
+                new_headers = {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+        except urllib.error.HTTPError as http_error:
+            if http_error.code == 304:
+                return None
+            raise
+
+        content_path = self._path(url, "gz")
+        with gzip.open(f"{content_path}.tmp", "wb") as file:
+            file.write(content)
+        os.replace(f"{content_path}.tmp", content_path)
+        self.pending[url] = new_headers
+        return content
+
+    def load(self, url: str) -> Optional[bytes]:
+        """
+        Load the cached content of the given url.
+
+        Parameters
+        ----------
+        url : str
+            Url of the file.
+
+        Returns
+        -------
+        bytes
+            The content of the file, or None if it is not cached.
+        """
+        content_path = self._path(url, "gz")
+        if not os.path.isfile(content_path):
+            return None
+        with gzip.open(content_path, "rb") as file:
+            return file.read()
+
+    def discard(self) -> None:
+        """
+        Forget the headers of the files downloaded since the last save.
+        """
+        self.pending = {}
+
+    def save(self) -> None:
+        """
+        Persist the headers of the files downloaded since the last save.
+        """
+        for url, headers in self.pending.items():
+            headers_path = self._path(url, "headers.json")
+            with open(f"{headers_path}.tmp", "w", encoding="utf-8") as file:
+                json.dump(headers, file)
+            os.replace(f"{headers_path}.tmp", headers_path)
+        self.pending = {}
@@ -0,0 +1,146 @@
+"""Offer unit tests for ../download_cache.py, against a local HTTP server"""
+
+import gzip
+import http.server
+import os
+import threading
+import urllib.error
+
+import pytest
+from download_cache import DownloadCache
+
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 May 2024 00:00:00 GMT"
+
+
+class DatasetHandler(http.server.BaseHTTPRequestHandler):
+    """Serve the dataset of the server, 304 when the client has it already"""
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        if self.path == "/missing":
+            self.send_error(404)
+            return
+        if self.headers.get("If-None-Match") == self.server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", self.server.etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(self.server.content)))
+        self.end_headers()
+        self.wfile.write(self.server.content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.HTTPServer(("127.0.0.1", 0), DatasetHandler)
+    httpd.etag = ETAG
+    httpd.content = b'{"objects": []}'
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/dataset.json"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def plain_http(monkeypatch):
+    # The local server is plain HTTP, the SSL context is unused
+    monkeypatch.setattr("download_cache.ssl.create_default_context", lambda: None)
+
+
+def test_fetch_downloads_and_caches_the_content(server, tmp_path):
+    cache = DownloadCache(str(tmp_path))
+
+    content = cache.fetch(server.url)
+
+    assert content == server.content
+    assert cache.load(server.url) == server.content
+    with gzip.open(cache._path(server.url, "gz"), "rb") as file:
+        assert file.read() == server.content
+    assert "If-None-Match" not in server.requests[0]
+
+
+def test_fetch_returns_none_on_304_once_saved(server, tmp_path):
+    cache = DownloadCache(str(tmp_path))
+    cache.fetch(server.url)
+    cache.save()
+
+    content = DownloadCache(str(tmp_path)).fetch(server.url)
+
+    assert content is None
+    assert server.requests[1]["If-None-Match"] == ETAG
+    assert server.requests[1]["If-Modified-Since"] == LAST_MODIFIED
+    # The cached content is kept to be replayed
+    assert cache.load(server.url) == server.content
+
+
+def test_fetch_downloads_again_when_the_file_changed(server, tmp_path):
+    cache = DownloadCache(str(tmp_path))
+    cache.fetch(server.url)
+    cache.save()
+    server.etag = '"v2"'
+    server.content = b'{"objects": [{}]}'
+
+    content = cache.fetch(server.url)
+
+    assert content == server.content
+    assert cache.load(server.url) == server.content
+
+
+def test_headers_are_not_persisted_before_save(server, tmp_path):
+    DownloadCache(str(tmp_path)).fetch(server.url)
+
+    content = DownloadCache(str(tmp_path)).fetch(server.url)
+
+    assert content == server.content
+    assert "If-None-Match" not in server.requests[1]
+
+
+def test_discard_forgets_the_pending_headers(server, tmp_path):
+    cache = DownloadCache(str(tmp_path))
+    cache.fetch(server.url)
+
+    cache.discard()
+    cache.save()
+
+    assert cache.pending == {}
+    assert cache.fetch(server.url) == server.content
+    assert "If-None-Match" not in server.requests[1]
+
+
+def test_save_clears_the_pending_headers(server, tmp_path):
+    cache = DownloadCache(str(tmp_path))
+    cache.fetch(server.url)
+
+    cache.save()
+
+    assert cache.pending == {}
+    assert cache.fetch(server.url) is None
+
+
+def test_headers_are_ignored_without_cached_content(server, tmp_path):
+    cache = DownloadCache(str(tmp_path))
+    cache.fetch(server.url)
+    cache.save()
+    os.remove(cache._path(server.url, "gz"))
+
+    assert cache.load(server.url) is None
+    assert cache.fetch(server.url) == server.content
+
+
+def test_fetch_raises_http_errors(server, tmp_path):
+    cache = DownloadCache(str(tmp_path))
+    url = server.url.replace("/dataset.json", "/missing")
+
+    with pytest.raises(urllib.error.HTTPError):
+        cache.fetch(url)
+    assert cache.pending == {}
+    assert cache.load(url) is None
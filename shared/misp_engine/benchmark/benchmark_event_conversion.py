@@ -0,0 +1,641 @@
+"""
+Benchmark of the per-event conversion throughput of the MISP connectors.
+
+Convert a generated MISP event to a STIX bundle with the misp, misp-feed,
+import-file-misp and flashpoint converters, first with the previous type
+resolution (a table rebuilt and a regex parsed on every attribute) and
+observable construction (an if/elif chain over the observable types), then
+with the shared misp_engine tables and builder dispatch. The bundles of both
+runs must hold the same objects.
+
+Usage: python benchmark/benchmark_event_conversion.py [--attributes 2000] [--events 5]
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import stix2
+from pycti import (
+    CustomObservableHostname,
+    CustomObservablePhoneNumber,
+    CustomObservableText,
+    Identity,
+)
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_DIR = os.path.join(BENCHMARK_DIR, "..", "..", "..")
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, ".."))
+sys.path.insert(0, os.path.join(REPOSITORY_DIR, "external-import", "misp", "src"))
+
+# pylint:disable=wrong-import-position
+import misp_engine  # noqa: E402
+from misp import Misp  # noqa: E402
+from misp_engine import OPENCTISTIX2  # noqa: E402
+
+AUTHOR = stix2.Identity(name="CIRCL", identity_class="organization")
+# Values of the MISP attribute types, unique per attribute index
+VALUES = {
+    "md5": lambda i: hashlib.md5(str(i).encode()).hexdigest(),
+    "sha1": lambda i: hashlib.sha1(str(i).encode()).hexdigest(),
+    "sha256": lambda i: hashlib.sha256(str(i).encode()).hexdigest(),
+    "filename": lambda i: f"invoice{i}.exe",
+    "filename|sha256": lambda i: (
+        f"invoice{i}.exe|{hashlib.sha256(str(i).encode()).hexdigest()}"
+    ),
+    "ip-src": lambda i: f"198.51.{i // 256 % 256}.{i % 256}",
+    "ip-dst": lambda i: f"2001:db8::{i:x}",
+    "ip-dst|port": lambda i: f"203.0.{i // 256 % 256}.{i % 256}|443",
+    "hostname": lambda i: f"mail{i}.example.com",
+    "domain": lambda i: f"host{i}.example.com",
+    "domain|ip": lambda i: f"host{i}.example.org|192.0.{i // 256 % 256}.{i % 256}",
+    "email-subject": lambda i: f"Your invoice {i}",
+    "email-src": lambda i: f"sender{i}@example.com",
+    "url": lambda i: f"http://host{i}.example.com/payload.exe",
+    "regkey": lambda i: f"HKLM\\Software\\Run\\Agent{i}",
+    "user-agent": lambda i: f"Mozilla/5.0 (agent {i})",
+    "phone-number": lambda i: f"+3312345{i:04d}",
+    "text": lambda i: f"free text {i}",
+    "github-username": lambda i: f"octocat{i}",
+    "full-name": lambda i: f"John Doe {i}",
+}
+
+
+def previous_detect_ip_version(value, type=False):
+    """Previous IP version detection, parsing its regex on every call"""
+
+    if re.match(
+        r"^((25[0-5]|(2[0-4]|1\d|[1-9]|)\d)\.?\b){4}(\/([1-9]|[1-2]\d|3[0-2]))?$",
+        value,
+    ):
+        if type:
+            return "IPv4-Addr"
+        return "ipv4-addr"
+    else:
+        if type:
+            return "IPv6-Addr"
+        return "ipv6-addr"
+
+
+def previous_resolve_type(type, value, unsupported_as_text, misp_types=None):
+    """Previous type resolution, building its table on every call"""
+
+    types = {
+        "yara": [{"resolver": "yara"}],
+        "sigma": [{"resolver": "sigma"}],
+        "md5": [{"resolver": "file-md5", "type": "File"}],
+        "sha1": [{"resolver": "file-sha1", "type": "File"}],
+        "sha256": [{"resolver": "file-sha256", "type": "File"}],
+        "filename": [{"resolver": "file-name", "type": "File"}],
+        "pdb": [{"resolver": "pdb-path", "type": "File"}],
+        "filename|md5": [
+            {"resolver": "file-name", "type": "File"},
+            {"resolver": "file-md5", "type": "File"},
+        ],
+        "filename|sha1": [
+            {"resolver": "file-name", "type": "File"},
+            {"resolver": "file-sha1", "type": "File"},
+        ],
+        "filename|sha256": [
+            {"resolver": "file-name", "type": "File"},
+            {"resolver": "file-sha256", "type": "File"},
+        ],
+        "ip-src": [{"resolver": "ipv4-addr", "type": "IPv4-Addr"}],
+        "ip-dst": [{"resolver": "ipv4-addr", "type": "IPv4-Addr"}],
+        "ip-src|port": [
+            {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
+            {"resolver": "text", "type": "Text"},
+        ],
+        "ip-dst|port": [
+            {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
+            {"resolver": "text", "type": "Text"},
+        ],
+        "hostname": [{"resolver": "hostname", "type": "Hostname"}],
+        "hostname|port": [
+            {"resolver": "hostname", "type": "Hostname"},
+            {"resolver": "text", "type": "Text"},
+        ],
+        "domain": [{"resolver": "domain", "type": "Domain-Name"}],
+        "domain|ip": [
+            {"resolver": "domain", "type": "Domain-Name"},
+            {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
+        ],
+        "email-subject": [{"resolver": "email-subject", "type": "Email-Message"}],
+        "email": [{"resolver": "email-address", "type": "Email-Addr"}],
+        "email-src": [{"resolver": "email-address", "type": "Email-Addr"}],
+        "email-dst": [{"resolver": "email-address", "type": "Email-Addr"}],
+        "url": [{"resolver": "url", "type": "Url"}],
+        "windows-scheduled-task": [
+            {"resolver": "windows-scheduled-task", "type": "Text"}
+        ],
+        "regkey": [{"resolver": "registry-key", "type": "Windows-Registry-Key"}],
+        "user-agent": [{"resolver": "user-agent", "type": "User-Agent"}],
+        "phone-number": [{"resolver": "phone-number", "type": "Phone-Number"}],
+        "whois-registrant-email": [{"resolver": "email-address", "type": "Email-Addr"}],
+        "text": [{"resolver": "text", "type": "Text"}],
+        "github-username": [
+            {"resolver": "user-account-github", "type": "User-Account"}
+        ],
+        "full-name": [{"resolver": "identity-individual", "type": "Identity"}],
+    }
+    if type in types:
+        resolved_types = types[type]
+        if len(resolved_types) == 2:
+            values = value.split("|")
+            if len(values) == 2:
+                if resolved_types[0]["resolver"] == "ipv4-addr":
+                    resolver_0 = previous_detect_ip_version(values[0])
+                    type_0 = previous_detect_ip_version(values[0], True)
+                else:
+                    resolver_0 = resolved_types[0]["resolver"]
+                    type_0 = resolved_types[0]["type"]
+                if resolved_types[1]["resolver"] == "ipv4-addr":
+                    resolver_1 = previous_detect_ip_version(values[1])
+                    type_1 = previous_detect_ip_version(values[1], True)
+                else:
+                    resolver_1 = resolved_types[1]["resolver"]
+                    type_1 = resolved_types[1]["type"]
+                return [
+                    {"resolver": resolver_0, "type": type_0, "value": values[0]},
+                    {"resolver": resolver_1, "type": type_1, "value": values[1]},
+                ]
+            else:
+                return None
+        else:
+            if (
+                "resolver" in resolved_types[0]
+                and resolved_types[0]["resolver"] == "ipv4-addr"
+                or resolved_types[0] == "ipv4-addr"
+            ):
+                resolver_0 = previous_detect_ip_version(value)
+                type_0 = previous_detect_ip_version(value, True)
+            else:
+                resolver_0 = resolved_types[0]["resolver"]
+                type_0 = (
+                    resolved_types[0]["type"] if "type" in resolved_types[0] else None
+                )
+            return [{"resolver": resolver_0, "type": type_0, "value": value}]
+    # If not found, return text observable as a fallback
+    if unsupported_as_text:
+        return [
+            {
+                "resolver": "text",
+                "type": "Text",
+                "value": value + " (type=" + type + ")",
+            }
+        ]
+    else:
+        return None
+
+
+def previous_build_observable(
+    observable_type,
+    observable_resolver,
+    observable_value,
+    attribute_markings,
+    custom_properties,
+    file_name,
+):
+    """Previous construction of the observables, by an if/elif chain"""
+
+    observable = None
+    if observable_type == "Autonomous-System":
+        observable = stix2.AutonomousSystem(
+            number=observable_value.replace("AS", ""),
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Mac-Addr":
+        observable = stix2.MACAddress(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Hostname":
+        observable = CustomObservableHostname(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Domain-Name":
+        observable = stix2.DomainName(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "IPv4-Addr":
+        observable = stix2.IPv4Address(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "IPv6-Addr":
+        observable = stix2.IPv6Address(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Url":
+        observable = stix2.URL(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Email-Addr":
+        observable = stix2.EmailAddress(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Email-Message":
+        observable = stix2.EmailMessage(
+            subject=observable_value,
+            is_multipart=True,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Mutex":
+        observable = stix2.Mutex(
+            name=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "User-Account":
+        if "account_type" in OPENCTISTIX2[observable_resolver]:
+            observable = stix2.UserAccount(
+                account_login=observable_value,
+                account_type=OPENCTISTIX2[observable_resolver]["account_type"],
+                object_marking_refs=attribute_markings,
+                custom_properties=custom_properties,
+            )
+        else:
+            observable = stix2.UserAccount(
+                account_login=observable_value,
+                object_marking_refs=attribute_markings,
+                custom_properties=custom_properties,
+            )
+    elif observable_type == "File":
+        if OPENCTISTIX2[observable_resolver]["path"][0] == "name":
+            observable = stix2.File(
+                name=observable_value,
+                object_marking_refs=attribute_markings,
+                custom_properties=custom_properties,
+            )
+        elif OPENCTISTIX2[observable_resolver]["path"][0] == "hashes":
+            hashes = {}
+            hashes[OPENCTISTIX2[observable_resolver]["path"][1]] = observable_value
+            observable = stix2.File(
+                name=file_name,
+                hashes=hashes,
+                object_marking_refs=attribute_markings,
+                custom_properties=custom_properties,
+            )
+    elif observable_type == "Directory":
+        observable = stix2.Directory(
+            path=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Windows-Registry-Key":
+        observable = stix2.WindowsRegistryKey(
+            key=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Windows-Registry-Value-Type":
+        observable = stix2.WindowsRegistryValueType(
+            data=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "X509-Certificate":
+        if OPENCTISTIX2[observable_resolver]["path"][0] == "issuer":
+            observable = stix2.File(
+                issuer=observable_value,
+                object_marking_refs=attribute_markings,
+                custom_properties=custom_properties,
+            )
+        elif OPENCTISTIX2[observable_resolver]["path"][1] == "serial_number":
+            observable = stix2.File(
+                serial_number=observable_value,
+                object_marking_refs=attribute_markings,
+                custom_properties=custom_properties,
+            )
+    elif observable_type == "Phone-Number":
+        observable = CustomObservablePhoneNumber(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Text":
+        observable = CustomObservableText(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Identity":
+        observable = stix2.Identity(
+            id=Identity.generate_id(
+                observable_value,
+                OPENCTISTIX2[observable_resolver]["identity_class"],
+            ),
+            name=observable_value,
+            identity_class=OPENCTISTIX2[observable_resolver]["identity_class"],
+            description=custom_properties["x_opencti_description"],
+            labels=custom_properties["labels"],
+            created_by_ref=custom_properties["created_by_ref"],
+            external_references=custom_properties["external_references"],
+        )
+    return observable
+
+
+@contextmanager
+def previous_engine():
+    """Convert through the previous type resolution and observable chain"""
+
+    resolve_type = misp_engine.resolve_type
+    build_observable = misp_engine.build_observable
+    misp_engine.resolve_type = previous_resolve_type
+    misp_engine.build_observable = previous_build_observable
+    try:
+        yield
+    finally:
+        misp_engine.resolve_type = resolve_type
+        misp_engine.build_observable = build_observable
+
+
+def generate_event(attributes: int) -> dict:
+    """Build a MISP event with attributes of the supported types"""
+
+    types = list(VALUES)
+    return {
+        "Event": {
+            "uuid": "5f2b8c1e-9f0e-4d3a-8b5e-3c1d2a4b6e7f",
+            "info": "Generated event",
+            "date": "2024-05-02",
+            "analysis": "2",
+            "threat_level_id": "2",
+            "published": True,
+            "timestamp": "1714640000",
+            "publish_timestamp": "1714640000",
+            "Orgc": {"name": "CIRCL"},
+            "Tag": [{"name": "tlp:white"}, {"name": "campaign"}],
+            "Attribute": [
+                {
+                    "uuid": str(uuid.UUID(int=i)),
+                    "type": types[i % len(types)],
+                    "category": "Network activity",
+                    "value": VALUES[types[i % len(types)]](i),
+                    "to_ids": i % 2 == 0,
+                    "comment": f"attribute {i}",
+                    "timestamp": "1714640000",
+                }
+                for i in range(attributes)
+            ],
+            "Object": [],
+        }
+    }
+
+
+class FakeHelper:
+    """Collect the bundles of the converters instead of sending them"""
+
+    connect_name = "MISP"
+    connect_confidence_level = 100
+
+    def __init__(self):
+        self.bundles = []
+        self.metric = type("Metric", (), {"inc": lambda *args: None})()
+
+    def send_stix2_bundle(self, bundle, **kwargs):
+        self.bundles.append(bundle)
+
+    def log_info(self, message):
+        pass
+
+    def log_debug(self, message):
+        pass
+
+    def log_error(self, message):
+        raise AssertionError(message)
+
+
+def load_module(name: str, *path: str):
+    """Load a connector module, whose file name may not be importable"""
+
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(REPOSITORY_DIR, *path)
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def configure(connector, prefix: str):
+    """Set the configuration shared by the converters with the given prefix"""
+
+    options = {
+        "author_from_tags": False,
+        "markings_from_tags": True,
+        "guess_threats_from_tags": False,
+        "create_tags_as_labels": True,
+        "import_unsupported_observables_as_text": False,
+        "import_unsupported_observables_as_text_transparent": True,
+        "import_to_ids_no_score": 40,
+        "create_indicators": True,
+        "create_observables": True,
+        "import_with_attachments": False,
+        "create_object_observables": False,
+        "create_reports": True,
+        "report_type": "misp-event",
+    }
+    for option, value in options.items():
+        setattr(connector, prefix + option, value)
+    connector.helper = FakeHelper()
+    return connector
+
+
+def misp_converter():
+    """Convert an event with the misp connector"""
+
+    connector = Misp.__new__(Misp)
+    configure(connector, "misp_")
+    connector.import_to_ids_no_score = 40
+    connector.import_with_attachments = False
+    connector.import_unsupported_observables_as_text = False
+    connector.import_unsupported_observables_as_text_transparent = True
+    connector.keep_original_tags_as_label = ""
+    connector.misp_propagate_labels = False
+    connector.misp_report_description_attribute_filter = {}
+    connector.misp_datetime_attribute = "timestamp"
+    connector.misp_reference_url = None
+    connector.misp_url = "https://misp.example.com"
+    connector.misp_cache_size = 1000
+    connector.elements_cache = OrderedDict()
+    connector.elements_cache_counters = {}
+    for option in (
+        "misp_import_creator_orgs",
+        "misp_import_creator_orgs_not",
+        "misp_import_owner_orgs",
+        "misp_import_owner_orgs_not",
+        "import_distribution_levels",
+        "import_threat_levels",
+        "import_only_published",
+    ):
+        setattr(connector, option, None)
+
+    def convert(event):
+        connector.process_events("work-id", [event])
+        return connector.helper.bundles.pop()
+
+    return convert
+
+
+def misp_feed_converter():
+    """Convert an event with the misp-feed connector"""
+
+    module = load_module(
+        "misp_feed", "external-import", "misp-feed", "src", "misp-feed.py"
+    )
+    connector = module.MispFeed.__new__(module.MispFeed)
+    configure(connector, "misp_feed_")
+    return connector._process_event
+
+
+def import_file_misp_converter():
+    """Convert an event with the import-file-misp connector"""
+
+    module = load_module(
+        "import_file_misp",
+        "internal-import-file",
+        "import-file-misp",
+        "src",
+        "import-file-misp.py",
+    )
+    connector = module.MispImportFile.__new__(module.MispImportFile)
+    configure(connector, "misp_import_file_")
+    return connector._process_event
+
+
+def flashpoint_converter():
+    """Convert an event with the flashpoint MISP converter"""
+
+    # The converter module is loaded alone, the package imports the client
+    module = load_module(
+        "misp_converter_to_stix",
+        "external-import",
+        "flashpoint",
+        "src",
+        "flashpoint_connector",
+        "misp_converter_to_stix.py",
+    )
+    config = type("Config", (), {"indicators_in_reports": True})()
+    converter = module.MISPConverterToStix(FakeHelper(), config)
+    # Guessing the threats from the tags queries the platform
+    converter.misp_feed_guess_threats_from_tags = False
+    return converter.convert_misp_event_to_stix
+
+
+CONVERTERS = {
+    "misp": misp_converter,
+    "misp-feed": misp_feed_converter,
+    "import-file-misp": import_file_misp_converter,
+    "flashpoint": flashpoint_converter,
+}
+
+
+def bundle_objects(bundle: str) -> list:
+    """Objects of a serialized bundle, without the times of their creation"""
+
+    volatile = ("created", "modified", "valid_from")
+    return [
+        {key: value for key, value in stix_object.items() if key not in volatile}
+        for stix_object in json.loads(bundle)["objects"]
+    ]
+
+
+def measure(convert, event: dict, events: int) -> tuple:
+    """Convert the event, return the events per second and the last bundle"""
+
+    start = time.perf_counter()
+    for _ in range(events):
+        bundle = convert(event)
+    elapsed = time.perf_counter() - start
+    return events / elapsed, bundle
+
+
+def resolve_and_build(event: dict) -> list:
+    """Resolve and build the observables of the event attributes alone"""
+
+    custom_properties = {
+        "x_opencti_description": "comment",
+        "x_opencti_score": 50,
+        "labels": [],
+        "created_by_ref": AUTHOR["id"],
+        "external_references": [],
+    }
+    observables = []
+    for attribute in event["Event"]["Attribute"]:
+        resolved_attributes = misp_engine.resolve_type(
+            attribute["type"], attribute["value"], False
+        )
+        for resolved_attribute in resolved_attributes:
+            observables.append(
+                misp_engine.build_observable(
+                    resolved_attribute["type"],
+                    resolved_attribute["resolver"],
+                    resolved_attribute["value"],
+                    [stix2.TLP_WHITE],
+                    custom_properties,
+                    None,
+                )
+            )
+    return observables
+
+
+def main() -> None:
+    """Run the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--attributes", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.events} events of {args.attributes} attributes")
+    event = generate_event(args.attributes)
+    with previous_engine():
+        previous_rate, previous_observables = measure(
+            resolve_and_build, event, args.events
+        )
+    rate, observables = measure(resolve_and_build, event, args.events)
+    assert [o and o["id"] for o in previous_observables] == [
+        o and o["id"] for o in observables
+    ], "The observables differ"
+    print(
+        f"{'observables only':>16}: {previous_rate:.2f} -> {rate:.2f} events/s "
+        f"({rate / previous_rate:.2f}x)"
+    )
+    for name, converter in CONVERTERS.items():
+        # Each run has its own converter, for its caches to start empty
+        with previous_engine():
+            previous_rate, previous_bundle = measure(converter(), event, args.events)
+        rate, bundle = measure(converter(), event, args.events)
+        assert bundle_objects(previous_bundle) == bundle_objects(
+            bundle
+        ), f"The {name} bundles differ"
+        print(
+            f"{name:>16}: {previous_rate:.2f} -> {rate:.2f} events/s "
+            f"({rate / previous_rate:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
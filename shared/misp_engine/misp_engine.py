@@ -0,0 +1,347 @@
+"""
+MISP to STIX conversion tables and observable builders shared by the misp,
+misp-feed, import-file-misp and flashpoint connectors.
+
+The tables are built once at import time: the STIX type and path of each
+OpenCTI resolver, the resolvers of each MISP attribute type and the builder
+of each OpenCTI observable type, so that converting an attribute is a few
+dictionary lookups.
+"""
+
+import re
+
+import stix2
+from pycti import (
+    CustomObservableHostname,
+    CustomObservablePhoneNumber,
+    CustomObservableText,
+    Identity,
+)
+
+PATTERNTYPES = ["yara", "sigma", "pcre", "snort", "suricata"]
+OPENCTISTIX2 = {
+    "autonomous-system": {
+        "type": "autonomous-system",
+        "path": ["number"],
+        "transform": {"operation": "remove_string", "value": "AS"},
+    },
+    "mac-addr": {"type": "mac-addr", "path": ["value"]},
+    "hostname": {"type": "hostname", "path": ["value"]},
+    "domain": {"type": "domain-name", "path": ["value"]},
+    "ipv4-addr": {"type": "ipv4-addr", "path": ["value"]},
+    "ipv6-addr": {"type": "ipv6-addr", "path": ["value"]},
+    "url": {"type": "url", "path": ["value"]},
+    "link": {"type": "url", "path": ["value"]},
+    "email-address": {"type": "email-addr", "path": ["value"]},
+    "email-subject": {"type": "email-message", "path": ["subject"]},
+    "mutex": {"type": "mutex", "path": ["name"]},
+    "file-name": {"type": "file", "path": ["name"]},
+    "file-path": {"type": "file", "path": ["name"]},
+    "file-md5": {"type": "file", "path": ["hashes", "MD5"]},
+    "file-sha1": {"type": "file", "path": ["hashes", "SHA-1"]},
+    "file-sha256": {"type": "file", "path": ["hashes", "SHA-256"]},
+    "directory": {"type": "directory", "path": ["path"]},
+    "registry-key": {"type": "windows-registry-key", "path": ["key"]},
+    "registry-key-value": {"type": "windows-registry-value-type", "path": ["data"]},
+    "pdb-path": {"type": "file", "path": ["name"]},
+    "x509-certificate-issuer": {"type": "x509-certificate", "path": ["issuer"]},
+    "x509-certificate-serial-number": {
+        "type": "x509-certificate",
+        "path": ["serial_number"],
+    },
+    "text": {"type": "text", "path": ["value"]},
+    "user-agent": {"type": "user-agent", "path": ["value"]},
+    "phone-number": {"type": "phone-number", "path": ["value"]},
+    "user-account": {"type": "user-account", "path": ["account_login"]},
+    "user-account-github": {
+        "type": "user-account",
+        "path": ["account_login"],
+        "account_type": "github",
+    },
+    "identity-individual": {"type": "identity", "identity_class": "individual"},
+}
+FILETYPES = ["file-name", "file-md5", "file-sha1", "file-sha256"]
+MISPTYPES = {
+    "yara": [{"resolver": "yara"}],
+    "sigma": [{"resolver": "sigma"}],
+    "md5": [{"resolver": "file-md5", "type": "File"}],
+    "sha1": [{"resolver": "file-sha1", "type": "File"}],
+    "sha256": [{"resolver": "file-sha256", "type": "File"}],
+    "filename": [{"resolver": "file-name", "type": "File"}],
+    "pdb": [{"resolver": "pdb-path", "type": "File"}],
+    "filename|md5": [
+        {"resolver": "file-name", "type": "File"},
+        {"resolver": "file-md5", "type": "File"},
+    ],
+    "filename|sha1": [
+        {"resolver": "file-name", "type": "File"},
+        {"resolver": "file-sha1", "type": "File"},
+    ],
+    "filename|sha256": [
+        {"resolver": "file-name", "type": "File"},
+        {"resolver": "file-sha256", "type": "File"},
+    ],
+    "ip-src": [{"resolver": "ipv4-addr", "type": "IPv4-Addr"}],
+    "ip-dst": [{"resolver": "ipv4-addr", "type": "IPv4-Addr"}],
+    "ip-src|port": [
+        {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
+        {"resolver": "text", "type": "Text"},
+    ],
+    "ip-dst|port": [
+        {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
+        {"resolver": "text", "type": "Text"},
+    ],
+    "hostname": [{"resolver": "hostname", "type": "Hostname"}],
+    "hostname|port": [
+        {"resolver": "hostname", "type": "Hostname"},
+        {"resolver": "text", "type": "Text"},
+    ],
+    "domain": [{"resolver": "domain", "type": "Domain-Name"}],
+    "domain|ip": [
+        {"resolver": "domain", "type": "Domain-Name"},
+        {"resolver": "ipv4-addr", "type": "IPv4-Addr"},
+    ],
+    "email-subject": [{"resolver": "email-subject", "type": "Email-Message"}],
+    "email": [{"resolver": "email-address", "type": "Email-Addr"}],
+    "email-src": [{"resolver": "email-address", "type": "Email-Addr"}],
+    "email-dst": [{"resolver": "email-address", "type": "Email-Addr"}],
+    "url": [{"resolver": "url", "type": "Url"}],
+    "windows-scheduled-task": [{"resolver": "windows-scheduled-task", "type": "Text"}],
+    "regkey": [{"resolver": "registry-key", "type": "Windows-Registry-Key"}],
+    "user-agent": [{"resolver": "user-agent", "type": "User-Agent"}],
+    "phone-number": [{"resolver": "phone-number", "type": "Phone-Number"}],
+    "whois-registrant-email": [{"resolver": "email-address", "type": "Email-Addr"}],
+    "text": [{"resolver": "text", "type": "Text"}],
+    "github-username": [{"resolver": "user-account-github", "type": "User-Account"}],
+    "full-name": [{"resolver": "identity-individual", "type": "Identity"}],
+}
+IPV4_REGEX = re.compile(
+    r"^((25[0-5]|(2[0-4]|1\d|[1-9]|)\d)\.?\b){4}(\/([1-9]|[1-2]\d|3[0-2]))?$"
+)
+
+
+def detect_ip_version(value, type=False):
+    if IPV4_REGEX.match(value):
+        if type:
+            return "IPv4-Addr"
+        return "ipv4-addr"
+    else:
+        if type:
+            return "IPv6-Addr"
+        return "ipv6-addr"
+
+
+def resolve_type(type, value, unsupported_as_text, misp_types=MISPTYPES):
+    """
+    Resolve a MISP attribute to its OpenCTI resolvers, observable types and
+    values, two of them for composite types such as `domain|ip`.
+
+    Unknown types are resolved as a text observable if `unsupported_as_text`
+    is set, otherwise None is returned.
+    """
+    if type in misp_types:
+        resolved_types = misp_types[type]
+        if len(resolved_types) == 2:
+            values = value.split("|")
+            if len(values) == 2:
+                if resolved_types[0]["resolver"] == "ipv4-addr":
+                    resolver_0 = detect_ip_version(values[0])
+                    type_0 = detect_ip_version(values[0], True)
+                else:
+                    resolver_0 = resolved_types[0]["resolver"]
+                    type_0 = resolved_types[0]["type"]
+                if resolved_types[1]["resolver"] == "ipv4-addr":
+                    resolver_1 = detect_ip_version(values[1])
+                    type_1 = detect_ip_version(values[1], True)
+                else:
+                    resolver_1 = resolved_types[1]["resolver"]
+                    type_1 = resolved_types[1]["type"]
+                return [
+                    {"resolver": resolver_0, "type": type_0, "value": values[0]},
+                    {"resolver": resolver_1, "type": type_1, "value": values[1]},
+                ]
+            else:
+                return None
+        else:
+            if resolved_types[0].get("resolver") == "ipv4-addr":
+                resolver_0 = detect_ip_version(value)
+                type_0 = detect_ip_version(value, True)
+            else:
+                resolver_0 = resolved_types[0]["resolver"]
+                type_0 = resolved_types[0].get("type")
+            return [{"resolver": resolver_0, "type": type_0, "value": value}]
+    # If not found, return text observable as a fallback
+    if unsupported_as_text:
+        return [
+            {
+                "resolver": "text",
+                "type": "Text",
+                "value": value + " (type=" + type + ")",
+            }
+        ]
+    else:
+        return None
+
+
+# Observable builders, by OpenCTI observable type. Each builder takes the
+# resolver, the value, the markings, the custom properties and the file name
+# of the attribute, and returns None if the value cannot be represented.
+def build_autonomous_system(resolver, value, markings, custom_properties, file_name):
+    return stix2.AutonomousSystem(
+        number=value.replace("AS", ""),
+        object_marking_refs=markings,
+        custom_properties=custom_properties,
+    )
+
+
+def build_value_observable(observable_class):
+    def build(resolver, value, markings, custom_properties, file_name):
+        return observable_class(
+            value=value,
+            object_marking_refs=markings,
+            custom_properties=custom_properties,
+        )
+
+    return build
+
+
+def build_email_message(resolver, value, markings, custom_properties, file_name):
+    return stix2.EmailMessage(
+        subject=value,
+        is_multipart=True,
+        object_marking_refs=markings,
+        custom_properties=custom_properties,
+    )
+
+
+def build_mutex(resolver, value, markings, custom_properties, file_name):
+    return stix2.Mutex(
+        name=value,
+        object_marking_refs=markings,
+        custom_properties=custom_properties,
+    )
+
+
+def build_user_account(resolver, value, markings, custom_properties, file_name):
+    if "account_type" in OPENCTISTIX2[resolver]:
+        return stix2.UserAccount(
+            account_login=value,
+            account_type=OPENCTISTIX2[resolver]["account_type"],
+            object_marking_refs=markings,
+            custom_properties=custom_properties,
+        )
+    return stix2.UserAccount(
+        account_login=value,
+        object_marking_refs=markings,
+        custom_properties=custom_properties,
+    )
+
+
+def build_file(resolver, value, markings, custom_properties, file_name):
+    path = OPENCTISTIX2[resolver]["path"]
+    if path[0] == "name":
+        return stix2.File(
+            name=value,
+            object_marking_refs=markings,
+            custom_properties=custom_properties,
+        )
+    if path[0] == "hashes":
+        return stix2.File(
+            name=file_name,
+            hashes={path[1]: value},
+            object_marking_refs=markings,
+            custom_properties=custom_properties,
+        )
+    return None
+
+
+def build_directory(resolver, value, markings, custom_properties, file_name):
+    return stix2.Directory(
+        path=value,
+        object_marking_refs=markings,
+        custom_properties=custom_properties,
+    )
+
+
+def build_windows_registry_key(resolver, value, markings, custom_properties, file_name):
+    return stix2.WindowsRegistryKey(
+        key=value,
+        object_marking_refs=markings,
+        custom_properties=custom_properties,
+    )
+
+
+def build_windows_registry_value_type(
+    resolver, value, markings, custom_properties, file_name
+):
+    return stix2.WindowsRegistryValueType(
+        data=value,
+        object_marking_refs=markings,
+        custom_properties=custom_properties,
+    )
+
+
+def build_x509_certificate(resolver, value, markings, custom_properties, file_name):
+    path = OPENCTISTIX2[resolver]["path"]
+    if path[0] == "issuer":
+        return stix2.File(
+            issuer=value,
+            object_marking_refs=markings,
+            custom_properties=custom_properties,
+        )
+    if path[1] == "serial_number":
+        return stix2.File(
+            serial_number=value,
+            object_marking_refs=markings,
+            custom_properties=custom_properties,
+        )
+    return None
+
+
+def build_identity(resolver, value, markings, custom_properties, file_name):
+    identity_class = OPENCTISTIX2[resolver]["identity_class"]
+    return stix2.Identity(
+        id=Identity.generate_id(value, identity_class),
+        name=value,
+        identity_class=identity_class,
+        description=custom_properties["x_opencti_description"],
+        labels=custom_properties["labels"],
+        created_by_ref=custom_properties["created_by_ref"],
+        external_references=custom_properties["external_references"],
+    )
+
+
+OBSERVABLE_BUILDERS = {
+    "Autonomous-System": build_autonomous_system,
+    "Mac-Addr": build_value_observable(stix2.MACAddress),
+    "Hostname": build_value_observable(CustomObservableHostname),
+    "Domain-Name": build_value_observable(stix2.DomainName),
+    "IPv4-Addr": build_value_observable(stix2.IPv4Address),
+    "IPv6-Addr": build_value_observable(stix2.IPv6Address),
+    "Url": build_value_observable(stix2.URL),
+    "Email-Addr": build_value_observable(stix2.EmailAddress),
+    "Email-Message": build_email_message,
+    "Mutex": build_mutex,
+    "User-Account": build_user_account,
+    "File": build_file,
+    "Directory": build_directory,
+    "Windows-Registry-Key": build_windows_registry_key,
+    "Windows-Registry-Value-Type": build_windows_registry_value_type,
+    "X509-Certificate": build_x509_certificate,
+    "Phone-Number": build_value_observable(CustomObservablePhoneNumber),
+    "Text": build_value_observable(CustomObservableText),
+    "Identity": build_identity,
+}
+
+
+def build_observable(
+    observable_type, resolver, value, markings, custom_properties, file_name
+):
+    """
+    Build the observable of a resolved attribute, None if its type has no
+    builder or its value cannot be represented.
+    """
+    build = OBSERVABLE_BUILDERS.get(observable_type)
+    if build is None:
+        return None
+    return build(resolver, value, markings, custom_properties, file_name)
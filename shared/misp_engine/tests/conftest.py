@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+engine_dir = str(Path(__file__).parent.parent.absolute())
+
+if engine_dir not in sys.path:
+    sys.path.insert(0, engine_dir)
@@ -0,0 +1,327 @@
+"""Offer parity tests of ../misp_engine.py builders with the previous chain"""
+
+import json
+
+import pytest
+import stix2
+from misp_engine import (
+    MISPTYPES,
+    OPENCTISTIX2,
+    build_observable,
+    resolve_type,
+)
+from pycti import (
+    CustomObservableHostname,
+    CustomObservablePhoneNumber,
+    CustomObservableText,
+    Identity,
+)
+
+AUTHOR = stix2.Identity(name="CIRCL", identity_class="organization")
+MARKINGS = [stix2.TLP_WHITE]
+SAMPLE_VALUES = {
+    "yara": "rule test { condition: true }",
+    "sigma": "title: test",
+    "md5": "d41d8cd98f00b204e9800998ecf8427e",
+    "sha1": "da39a3ee5e6b4b0d3255bfef95601890afd80709",
+    "sha256": "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855",
+    "filename": "invoice.exe",
+    "pdb": "C:\\build\\agent.pdb",
+    "filename|md5": "invoice.exe|d41d8cd98f00b204e9800998ecf8427e",
+    "filename|sha1": "invoice.exe|da39a3ee5e6b4b0d3255bfef95601890afd80709",
+    "filename|sha256": (
+        "invoice.exe|"
+        "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+    ),
+    "ip-src": "198.51.100.7",
+    "ip-dst": "2001:db8::1",
+    "ip-src|port": "198.51.100.7|443",
+    "ip-dst|port": "2001:db8::1|8080",
+    "hostname": "mail.example.com",
+    "hostname|port": "mail.example.com|25",
+    "domain": "example.com",
+    "domain|ip": "example.com|198.51.100.7",
+    "email-subject": "Your invoice",
+    "email": "alice@example.com",
+    "email-src": "bob@example.com",
+    "email-dst": "carol@example.com",
+    "url": "http://example.com/payload.exe",
+    "windows-scheduled-task": "\\Microsoft\\Updater",
+    "regkey": "HKLM\\Software\\Run",
+    "user-agent": "Mozilla/5.0",
+    "phone-number": "+33123456789",
+    "whois-registrant-email": "registrant@example.com",
+    "text": "free text",
+    "github-username": "octocat",
+    "full-name": "John Doe",
+}
+# Observable types which are not produced by the shared MISP types
+EXTRA_RESOLVED_ATTRIBUTES = [
+    {"resolver": "autonomous-system", "type": "Autonomous-System", "value": "AS64496"},
+    {"resolver": "mac-addr", "type": "Mac-Addr", "value": "00:00:5e:00:53:af"},
+    {"resolver": "mutex", "type": "Mutex", "value": "Global\\mutex"},
+    {"resolver": "user-account", "type": "User-Account", "value": "alice"},
+    {"resolver": "directory", "type": "Directory", "value": "C:\\Temp"},
+    {
+        "resolver": "registry-key-value",
+        "type": "Windows-Registry-Value-Type",
+        "value": "payload",
+    },
+    {
+        "resolver": "x509-certificate-issuer",
+        "type": "X509-Certificate",
+        "value": "CN=Example CA",
+    },
+    {
+        "resolver": "x509-certificate-serial-number",
+        "type": "X509-Certificate",
+        "value": "01:02:03",
+    },
+]
+
+
+def build_observable_with_chain(
+    observable_resolver,
+    observable_type,
+    observable_value,
+    attribute_markings,
+    custom_properties,
+    file_name,
+    attribute,
+    attribute_tags,
+    author,
+    attribute_external_references,
+):
+    """Previous construction of the observables, by an if/elif chain"""
+    observable = None
+    if observable_type == "Autonomous-System":
+        observable = stix2.AutonomousSystem(
+            number=observable_value.replace("AS", ""),
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Mac-Addr":
+        observable = stix2.MACAddress(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Hostname":
+        observable = CustomObservableHostname(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Domain-Name":
+        observable = stix2.DomainName(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "IPv4-Addr":
+        observable = stix2.IPv4Address(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "IPv6-Addr":
+        observable = stix2.IPv6Address(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Url":
+        observable = stix2.URL(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Email-Addr":
+        observable = stix2.EmailAddress(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Email-Message":
+        observable = stix2.EmailMessage(
+            subject=observable_value,
+            is_multipart=True,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Mutex":
+        observable = stix2.Mutex(
+            name=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "User-Account":
+        if "account_type" in OPENCTISTIX2[observable_resolver]:
+            observable = stix2.UserAccount(
+                account_login=observable_value,
+                account_type=OPENCTISTIX2[observable_resolver]["account_type"],
+                object_marking_refs=attribute_markings,
+                custom_properties=custom_properties,
+            )
+        else:
+            observable = stix2.UserAccount(
+                account_login=observable_value,
+                object_marking_refs=attribute_markings,
+                custom_properties=custom_properties,
+            )
+    elif observable_type == "File":
+        if OPENCTISTIX2[observable_resolver]["path"][0] == "name":
+            observable = stix2.File(
+                name=observable_value,
+                object_marking_refs=attribute_markings,
+                custom_properties=custom_properties,
+            )
+        elif OPENCTISTIX2[observable_resolver]["path"][0] == "hashes":
+            hashes = {}
+            hashes[OPENCTISTIX2[observable_resolver]["path"][1]] = observable_value
+            observable = stix2.File(
+                name=file_name,
+                hashes=hashes,
+                object_marking_refs=attribute_markings,
+                custom_properties=custom_properties,
+            )
+    elif observable_type == "Directory":
+        observable = stix2.Directory(
+            path=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Windows-Registry-Key":
+        observable = stix2.WindowsRegistryKey(
+            key=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Windows-Registry-Value-Type":
+        observable = stix2.WindowsRegistryValueType(
+            data=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "X509-Certificate":
+        if OPENCTISTIX2[observable_resolver]["path"][0] == "issuer":
+            observable = stix2.File(
+                issuer=observable_value,
+                object_marking_refs=attribute_markings,
+                custom_properties=custom_properties,
+            )
+        elif OPENCTISTIX2[observable_resolver]["path"][1] == "serial_number":
+            observable = stix2.File(
+                serial_number=observable_value,
+                object_marking_refs=attribute_markings,
+                custom_properties=custom_properties,
+            )
+    elif observable_type == "Phone-Number":
+        observable = CustomObservablePhoneNumber(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Text":
+        observable = CustomObservableText(
+            value=observable_value,
+            object_marking_refs=attribute_markings,
+            custom_properties=custom_properties,
+        )
+    elif observable_type == "Identity":
+        observable = stix2.Identity(
+            id=Identity.generate_id(
+                observable_value,
+                OPENCTISTIX2[observable_resolver]["identity_class"],
+            ),
+            name=observable_value,
+            identity_class=OPENCTISTIX2[observable_resolver]["identity_class"],
+            description=attribute["comment"],
+            labels=attribute_tags,
+            created_by_ref=author["id"],
+            external_references=attribute_external_references,
+        )
+    return observable
+
+
+def build(builder, resolved_attribute, file_name):
+    """Build the observable of a resolved attribute, as process_attribute does"""
+    custom_properties = {
+        "x_opencti_description": "comment",
+        "x_opencti_score": 50,
+        "labels": ["label"],
+        "created_by_ref": AUTHOR["id"],
+        "external_references": [],
+    }
+    try:
+        observable = builder(resolved_attribute, custom_properties, file_name)
+    except Exception as err:  # The errors are logged by process_attribute
+        return type(err)
+    if observable is None:
+        return None
+    # Timestamps are set when the objects are built
+    return {
+        key: value
+        for key, value in json.loads(observable.serialize()).items()
+        if key not in ("created", "modified")
+    }
+
+
+def chain_builder(resolved_attribute, custom_properties, file_name):
+    return build_observable_with_chain(
+        resolved_attribute["resolver"],
+        resolved_attribute["type"],
+        resolved_attribute["value"],
+        MARKINGS,
+        custom_properties,
+        file_name,
+        {"comment": custom_properties["x_opencti_description"]},
+        custom_properties["labels"],
+        AUTHOR,
+        custom_properties["external_references"],
+    )
+
+
+def dispatch_builder(resolved_attribute, custom_properties, file_name):
+    return build_observable(
+        resolved_attribute["type"],
+        resolved_attribute["resolver"],
+        resolved_attribute["value"],
+        MARKINGS,
+        custom_properties,
+        file_name,
+    )
+
+
+def resolved_attributes():
+    for misp_type in [*MISPTYPES, "unsupported-type"]:
+        resolved = resolve_type(misp_type, SAMPLE_VALUES.get(misp_type, "value"), True)
+        file_name = None
+        for resolved_attribute in resolved:
+            if resolved_attribute["resolver"] == "file-name":
+                file_name = resolved_attribute["value"]
+        for resolved_attribute in resolved:
+            yield misp_type, resolved_attribute, file_name
+    for resolved_attribute in EXTRA_RESOLVED_ATTRIBUTES:
+        yield resolved_attribute["resolver"], resolved_attribute, None
+
+
+def test_every_misp_type_has_a_sample_value():
+    assert set(MISPTYPES) == set(SAMPLE_VALUES)
+
+
+@pytest.mark.parametrize(
+    "resolved_attribute,file_name",
+    [(attribute, file_name) for _, attribute, file_name in resolved_attributes()],
+    ids=[
+        f"{name}-{attribute['resolver']}"
+        for name, attribute, _ in resolved_attributes()
+    ],
+)
+def test_builders_match_the_previous_chain(resolved_attribute, file_name):
+    if resolved_attribute["resolver"] not in OPENCTISTIX2:
+        # Pattern types and unknown resolvers never get an observable
+        return
+    assert build(dispatch_builder, resolved_attribute, file_name) == build(
+        chain_builder, resolved_attribute, file_name
+    )
@@ -0,0 +1,66 @@
+"""Offer unit tests of ../misp_engine.py type resolution"""
+
+import pytest
+from misp_engine import MISPTYPES, detect_ip_version, resolve_type
+
+
+@pytest.mark.parametrize(
+    "value,resolver,observable_type",
+    [
+        ("198.51.100.7", "ipv4-addr", "IPv4-Addr"),
+        ("198.51.100.0/24", "ipv4-addr", "IPv4-Addr"),
+        ("2001:db8::1", "ipv6-addr", "IPv6-Addr"),
+    ],
+)
+def test_detect_ip_version(value, resolver, observable_type):
+    assert detect_ip_version(value) == resolver
+    assert detect_ip_version(value, True) == observable_type
+
+
+def test_single_type():
+    assert resolve_type("domain", "example.com", False) == [
+        {"resolver": "domain", "type": "Domain-Name", "value": "example.com"}
+    ]
+
+
+def test_ip_type_follows_the_value():
+    assert resolve_type("ip-dst", "2001:db8::1", False) == [
+        {"resolver": "ipv6-addr", "type": "IPv6-Addr", "value": "2001:db8::1"}
+    ]
+
+
+def test_pattern_type_has_no_observable_type():
+    assert resolve_type("yara", "rule test { condition: true }", False) == [
+        {"resolver": "yara", "type": None, "value": "rule test { condition: true }"}
+    ]
+
+
+def test_composite_type():
+    assert resolve_type("domain|ip", "example.com|2001:db8::1", False) == [
+        {"resolver": "domain", "type": "Domain-Name", "value": "example.com"},
+        {"resolver": "ipv6-addr", "type": "IPv6-Addr", "value": "2001:db8::1"},
+    ]
+
+
+def test_composite_type_without_separator():
+    assert resolve_type("filename|md5", "invoice.exe", False) is None
+
+
+@pytest.mark.parametrize(
+    "unsupported_as_text,expected",
+    [
+        (True, [{"resolver": "text", "type": "Text", "value": "x (type=btc)"}]),
+        (False, None),
+    ],
+)
+def test_unsupported_type(unsupported_as_text, expected):
+    assert resolve_type("btc", "x", unsupported_as_text) == expected
+
+
+def test_connector_types():
+    misp_types = {**MISPTYPES, "snort": [{"resolver": "snort"}]}
+
+    assert resolve_type("snort", "alert", False, misp_types) == [
+        {"resolver": "snort", "type": None, "value": "alert"}
+    ]
+    assert resolve_type("snort", "alert", False) is None